@@ -1,20 +1,34 @@
+import time
+_INICIO_PROCESSO = time.perf_counter()
 import customtkinter as ctk
 import sqlite3
-from tkinter import ttk, messagebox, filedialog 
+from tkinter import ttk, messagebox, filedialog, TclError, Canvas
 import datetime
 import os
 import json
 from PIL import Image, ImageTk, UnidentifiedImageError 
 import webbrowser
-import matplotlib
-matplotlib.use('TkAgg') 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.ticker import MaxNLocator
 import sys
 import random 
 import traceback
 import shutil
+import threading
+import queue
+import contextlib
+import atexit
+import urllib.request
+import string
+import re
+import gzip
+import hashlib
+import mmap
+import struct
+import math
+import bisect
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+_FIM_IMPORTACOES = time.perf_counter()
 
 DB_NAME = "dbdbrina_stats.db"
 APP_NAME = "Ganchômetro"
@@ -23,6 +37,8 @@ IMAGE_ASSETS_PATH = "assets/"
 KILLER_PORTRAITS_PATH = os.path.join(IMAGE_ASSETS_PATH, "portraits", "killers")
 ITEM_ICONS_PATH = os.path.join(IMAGE_ASSETS_PATH, "icons", "items") 
 LOGO_FILENAME = "logo.png"
+ASSET_PACK_FILENAME = os.path.join(IMAGE_ASSETS_PATH, "ganchometro.pack")
+ASSET_PACK_MAGIC = b"GANCHPK2"
 
 PORTRAIT_SIZE_BUTTON_KILLER = (90, 90)
 KILLER_CARD_WIDTH = PORTRAIT_SIZE_BUTTON_KILLER[0] + 20
@@ -48,6 +64,108 @@ COLOR_PROGRESS_GREEN = "#00C851"
 COLOR_PROGRESS_ORANGE = "#ffbb33" 
 COLOR_PROGRESS_RED_BAR = "#CC0000" 
 SECRET_CODE = "stopassole"
+DB_READER_POOL_SIZE = 3
+DB_CACHE_SIZE_KIB = 16384
+DB_MMAP_SIZE_BYTES = 64 * 1024 * 1024
+DB_BUSY_TIMEOUT_MS = 5000
+DB_WORKER_THREADS = 2
+DB_WORKER_POLL_MS = 50
+THUMBNAIL_CACHE_DIR = "ganchometro_miniaturas"
+THUMBNAIL_WORKERS = 4
+THUMBNAIL_CACHE_MAX_BYTES = 16 * 1024 * 1024
+IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+IMAGE_CACHE_NEGATIVE_TTL_S = 30.0
+STARTUP_SLOW_THRESHOLD_S = 2.0
+IMPORT_BATCH_SIZE = 5000
+IMPORT_READ_CHUNK_CHARS = 64 * 1024
+EXPORT_FETCH_SIZE = 1000
+HISTORY_PAGE_SIZE = 200
+HISTORY_MAX_ROWS = 3 * HISTORY_PAGE_SIZE
+STATS_CARDS_PAGE_SIZE = 20
+STATS_CARDS_MIN_PARTIDAS = 1
+GRAFICO_TEAMMATES_TOP = 10
+INCREMENTAL_REFRESH_MAX_MATCHES = HISTORY_PAGE_SIZE
+WRITE_QUEUE_JOURNAL_FILENAME = "ganchometro_fila_gravacao.jsonl"
+WRITE_QUEUE_MAX_BATCH = 50
+WRITE_QUEUE_MAX_TENTATIVAS = 5
+WRITE_QUEUE_ESPERA_BASE_S = 0.2
+WRITE_QUEUE_REENVIO_ESPERA_S = 5.0
+WRITE_QUEUE_REENVIO_ESPERA_MAX_S = 120.0
+REGISTRO_STATUS_DURACAO_MS = 4000
+BACKUP_DIR = "ganchometro_backups"
+BACKUP_MAX_SNAPSHOTS = 10
+BACKUP_INTERVALO_S = 24 * 3600
+BACKUP_VERIFICACAO_MS = 30 * 60 * 1000
+BACKUP_PRIMEIRO_ATRASO_MS = 60 * 1000
+BACKUP_PAGINAS_POR_PASSO = 256
+BACKUP_PAUSA_ENTRE_PASSOS_S = 0.005
+BACKUP_MAX_REINICIOS = 3
+TEAMMATE_SUGESTOES_MAX = 8
+TEAMMATE_PREFIXO_PRECALCULADO = 2
+TEAMMATE_RECENCIA_MEIA_VIDA_PARTIDAS = 100
+
+SQL_TEAMMATE_POR_NICK = "SELECT id FROM teammates WHERE nickname = ? COLLATE NOCASE"
+SQL_HISTORICO_PARTIDAS = '''
+        SELECT m.id, strftime('%d/%m/%Y %H:%M', m.match_date) AS data_partida, k.name AS assassino, mp.name AS mapa,
+               iu.name AS item_usado, ig.name AS item_ganho, il.name AS item_perdido,
+               CASE m.escaped WHEN 1 THEN 'Sim' ELSE 'Não' END AS sobreviveu,
+               m.survivors_escaped AS qts_escaparam, IFNULL(m.game_mode, 'N/D') AS jogando_como,
+               (SELECT GROUP_CONCAT(t.nickname, ', ') FROM teammates t JOIN match_teammates mt ON t.id = mt.teammate_id WHERE mt.match_id = m.id) AS companheiros,
+               CASE m.jhones_sedex WHEN 1 THEN 'Sim' WHEN 0 THEN 'Não' ELSE 'N/D' END AS jhones_sedex_info,
+               m.notes AS notas_adicionais, m.match_date AS chave_data
+        FROM matches m LEFT JOIN killers k ON m.killer_id = k.id LEFT JOIN maps mp ON m.map_id = mp.id
+        LEFT JOIN items iu ON m.item_used_id = iu.id LEFT JOIN items ig ON m.item_gained_id = ig.id
+        LEFT JOIN items il ON m.item_lost_id = il.id
+'''
+# Paginação por chave (match_date, id): cada página continua de onde a anterior parou, sem OFFSET.
+SQL_HISTORICO_PRIMEIRA_PAGINA = SQL_HISTORICO_PARTIDAS + "ORDER BY m.match_date DESC, m.id DESC LIMIT ?"
+SQL_HISTORICO_MAIS_ANTIGAS = SQL_HISTORICO_PARTIDAS + "WHERE (m.match_date, m.id) < (?, ?) ORDER BY m.match_date DESC, m.id DESC LIMIT ?"
+SQL_HISTORICO_MAIS_RECENTES = SQL_HISTORICO_PARTIDAS + "WHERE (m.match_date, m.id) > (?, ?) ORDER BY m.match_date ASC, m.id ASC LIMIT ?"
+SQL_EXPORTAR_PARTIDAS = '''
+    SELECT m.match_date, k.name AS killer_name, mp.name AS map_name, iu.name AS item_used_name, ig.name AS item_gained_name,
+           il.name AS item_lost_name, m.escaped, m.survivors_escaped, m.game_mode, m.notes, m.jhones_sedex, g.nicks AS teammates_nicks
+    FROM matches m LEFT JOIN killers k ON m.killer_id = k.id LEFT JOIN maps mp ON m.map_id = mp.id
+    LEFT JOIN items iu ON m.item_used_id = iu.id LEFT JOIN items ig ON m.item_gained_id = ig.id
+    LEFT JOIN items il ON m.item_lost_id = il.id
+    LEFT JOIN (SELECT mt.match_id, GROUP_CONCAT(t.nickname, char(31)) AS nicks
+               FROM match_teammates mt JOIN teammates t ON t.id = mt.teammate_id GROUP BY mt.match_id) g ON g.match_id = m.id
+    ORDER BY m.match_date ASC
+'''
+SQL_STATS_GERAL = "SELECT total_partidas, escapes, jhones_sim, jhones_nao, jhones_respondidos FROM stats_geral WHERE id = 1"
+SQL_STATS_POR_KILLER = "SELECT k.name, sk.partidas AS count_killer, sk.escapes AS escapes_killer FROM stats_killer sk JOIN killers k ON k.id = sk.killer_id WHERE sk.partidas > 0 ORDER BY sk.partidas DESC"
+SQL_STATS_ITENS_LEVADOS = "SELECT i.name, si.partidas FROM stats_item_usado si JOIN items i ON i.id = si.item_id WHERE i.name != 'Nenhum' AND si.partidas > 0 ORDER BY si.partidas DESC"
+SQL_STATS_ITENS_PERDIDOS = "SELECT i.name, si.partidas FROM stats_item_perdido si JOIN items i ON i.id = si.item_id WHERE i.name != 'Nenhum' AND si.partidas > 0 ORDER BY si.partidas DESC"
+SQL_STATS_POR_MAPA = "SELECT mp.name, sm.partidas AS count_map FROM stats_map sm JOIN maps mp ON mp.id = sm.map_id WHERE sm.partidas > 0 ORDER BY sm.partidas DESC"
+SQL_STATS_POR_MODO = "SELECT game_mode, partidas, escapes FROM stats_modo WHERE partidas > 0"
+# Rankings paginados (top-K): o desempate (nome nos killers, id nos companheiros) mantém a ordem estável entre páginas;
+# nos companheiros o índice (partidas, teammate_id) serve o ORDER BY.
+SQL_RANKING_KILLERS = "SELECT k.name, sk.partidas, sk.escapes FROM stats_killer sk JOIN killers k ON k.id = sk.killer_id WHERE sk.partidas >= ? ORDER BY sk.partidas DESC, k.name LIMIT ? OFFSET ?"
+SQL_RANKING_TEAMMATES = "SELECT t.nickname, st.partidas, st.escapes FROM stats_teammate st JOIN teammates t ON t.id = st.teammate_id WHERE st.partidas >= ? ORDER BY st.partidas DESC, st.teammate_id DESC LIMIT ? OFFSET ?"
+# Frequência (rollup) e partida mais recente de cada companheiro; o MAX sai do índice (teammate_id, match_id).
+SQL_TEAMMATES_AUTOCOMPLETE = """SELECT t.nickname, COALESCE(st.partidas, 0),
+       (SELECT MAX(mt.match_id) FROM match_teammates mt WHERE mt.teammate_id = t.id)
+FROM teammates t LEFT JOIN stats_teammate st ON st.teammate_id = t.id"""
+# Top-N por taxa de escape para o gráfico; a expressão do ORDER BY é a mesma do índice idx_stats_teammate_taxa.
+SQL_TOP_TAXA_TEAMMATES = "SELECT t.nickname, st.partidas, st.escapes FROM stats_teammate st JOIN teammates t ON t.id = st.teammate_id WHERE st.partidas >= ? ORDER BY st.escapes * 1.0 / st.partidas DESC, st.partidas DESC, st.teammate_id DESC LIMIT ?"
+SQL_TEAMMATES_AUTOCOMPLETE_DAS_PARTIDAS = SQL_TEAMMATES_AUTOCOMPLETE + """
+WHERE t.id IN (SELECT teammate_id FROM match_teammates WHERE match_id IN ({marcadores}))"""
+CONSULTAS_CRITICAS = [
+    ("teammate_por_nick", SQL_TEAMMATE_POR_NICK, ("",), ()),
+    ("historico_primeira_pagina", SQL_HISTORICO_PRIMEIRA_PAGINA, (HISTORY_PAGE_SIZE,), ()),
+    ("historico_mais_antigas", SQL_HISTORICO_MAIS_ANTIGAS, ("", 0, HISTORY_PAGE_SIZE), ()),
+    ("historico_mais_recentes", SQL_HISTORICO_MAIS_RECENTES, ("", 0, HISTORY_PAGE_SIZE), ()),
+    ("stats_geral", SQL_STATS_GERAL, (), ()),
+    ("stats_por_killer", SQL_STATS_POR_KILLER, (), ("sk", "k")),
+    ("stats_itens_levados", SQL_STATS_ITENS_LEVADOS, (), ("si", "i")),
+    ("stats_itens_perdidos", SQL_STATS_ITENS_PERDIDOS, (), ("si", "i")),
+    ("stats_por_mapa", SQL_STATS_POR_MAPA, (), ("sm", "mp")),
+    ("stats_por_modo", SQL_STATS_POR_MODO, (), ("stats_modo",)),
+    ("ranking_killers", SQL_RANKING_KILLERS, (1, STATS_CARDS_PAGE_SIZE, 0), ("sk", "k")),
+    # Com poucos companheiros o planejador pode preferir varrer teammates e buscar stats_teammate pela chave.
+    ("ranking_teammates", SQL_RANKING_TEAMMATES, (1, STATS_CARDS_PAGE_SIZE, 0), ("t",)),
+    ("top_taxa_teammates", SQL_TOP_TAXA_TEAMMATES, (STATS_CARDS_MIN_PARTIDAS, GRAFICO_TEAMMATES_TOP), ()),
+    ("teammates_autocomplete", SQL_TEAMMATES_AUTOCOMPLETE, (), ("t",)),
+]
 
 def _get_log_path(log_filename):
     try:
@@ -94,32 +212,310 @@ def initialize_database():
     db_path = get_db_path()
     db_existed = os.path.exists(db_path)
     
-    criar_tabelas() 
+    try:
+        migrado = aplicar_migracoes()
+    except sqlite3.Error as e: 
+        print(f"Erro ao aplicar migrações: {e}")
+        _log_error(f"Erro SQLite em aplicar_migracoes: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        messagebox.showerror("Erro Crítico de Banco de Dados", f"Não foi possível inicializar o banco de dados: {e}\nA aplicação não pode continuar.")
+        sys.exit(1) 
+    if migrado: verificar_planos_consulta()
 
     if not db_existed:
         print(f"Banco de dados '{DB_NAME}' não existia e foi criado em: {db_path}")
-        conn_temp = None
         try:
-            conn_temp, cursor_temp = conectar_db() 
-            cursor_temp.execute("DELETE FROM matches")
-            cursor_temp.execute("DELETE FROM match_teammates")
-            conn_temp.commit()
+            with db_transacao() as (conn_temp, cursor_temp):
+                cursor_temp.execute("DELETE FROM matches")
+                cursor_temp.execute("DELETE FROM match_teammates")
             print(f"Tabelas 'matches' e 'match_teammates' garantidas como vazias no banco de dados recém-criado.")
         except sqlite3.Error as e:
             _log_error(f"Erro ao limpar tabelas de partidas no banco de dados recém-criado: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
-        finally:
-            if conn_temp:
-                conn_temp.close()
     else:
         print(f"Usando banco de dados existente em: {db_path}")
 
 
-def conectar_db():
-    db_path = get_db_path() 
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    return conn, cursor
+class _BackupReiniciado(Exception):
+    pass
+
+class DBConnectionManager:
+    def __init__(self, db_path, reader_pool_size=DB_READER_POOL_SIZE):
+        self.db_path = db_path
+        self._writer_lock = threading.RLock()
+        self._writer_conn = None
+        self._transaction_depth = 0
+        self._reader_pool = queue.LifoQueue()
+        self._reader_pool_size = reader_pool_size
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        self._all_readers = []
+        self._closed = False
+
+    def _configure_connection(self, conn, read_only=False):
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE_BYTES}")
+        if not read_only:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+
+    def _get_writer(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Gerenciador de conexões já foi fechado.")
+        if self._writer_conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            self._configure_connection(conn)
+            self._writer_conn = conn
+        return self._writer_conn
+
+    def _get_reader(self):
+        try:
+            return self._reader_pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            can_create = self._readers_created < self._reader_pool_size
+            if can_create:
+                self._readers_created += 1
+        if not can_create:
+            return self._reader_pool.get()
+        try:
+            with self._writer_lock:
+                self._get_writer()
+            db_uri = "file:" + urllib.request.pathname2url(os.path.abspath(self.db_path)) + "?mode=ro"
+            conn = sqlite3.connect(db_uri, uri=True, isolation_level=None, check_same_thread=False)
+            self._configure_connection(conn, read_only=True)
+        except Exception:
+            with self._readers_lock:
+                self._readers_created -= 1
+            raise
+        with self._readers_lock:
+            self._all_readers.append(conn)
+        return conn
+
+    def data_version(self):
+        with self._writer_lock:
+            conn = self._get_writer()
+            return conn.total_changes, conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def user_version(self):
+        with self._writer_lock:
+            return self._get_writer().execute("PRAGMA user_version").fetchone()[0]
+
+    def copiar_para(self, destino, paginas=BACKUP_PAGINAS_POR_PASSO, pausa=BACKUP_PAUSA_ENTRE_PASSOS_S, progress=None):
+        # Conexão própria (fora do pool) só para leitura: no WAL cada passo segura um snapshot curto e não bloqueia a escrita.
+        db_uri = "file:" + urllib.request.pathname2url(os.path.abspath(self.db_path)) + "?mode=ro"
+        origem = sqlite3.connect(db_uri, uri=True, check_same_thread=False)
+        alvo = sqlite3.connect(destino)
+        # Uma escrita de outra conexão entre dois passos faz o SQLite recomeçar a cópia. Com escritas seguidas isso
+        # pode não terminar nunca, então depois de alguns recomeços a cópia é feita num passo só (um único snapshot).
+        estado = {"restantes": None, "reinicios": 0}
+        def _progresso(status, restantes, total):
+            if estado["restantes"] is not None and restantes > estado["restantes"]:
+                estado["reinicios"] += 1
+                if estado["reinicios"] > BACKUP_MAX_REINICIOS: raise _BackupReiniciado()
+            estado["restantes"] = restantes
+            if progress: progress(status, restantes, total)
+        try:
+            try:
+                origem.backup(alvo, pages=paginas, progress=_progresso, sleep=pausa)
+            except _BackupReiniciado:
+                origem.backup(alvo, progress=progress)
+            # A cópia herda o modo WAL da origem; o snapshot fica em DELETE para ser um arquivo único, sem -wal/-shm.
+            alvo.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            alvo.close(); origem.close()
+
+    def restaurar_de(self, origem_path, paginas=BACKUP_PAGINAS_POR_PASSO, progress=None):
+        # A cópia entra pela conexão de escrita, com o lock dela: as demais escritas do app esperam a restauração terminar.
+        origem = sqlite3.connect("file:" + urllib.request.pathname2url(os.path.abspath(origem_path)) + "?mode=ro", uri=True)
+        try:
+            with self._writer_lock:
+                if self._transaction_depth:
+                    raise sqlite3.OperationalError("Restauração não pode rodar dentro de uma transação.")
+                origem.backup(self._get_writer(), pages=paginas, progress=progress)
+        finally:
+            origem.close()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._writer_lock:
+            conn = self._get_writer()
+            depth = self._transaction_depth
+            savepoint = f"sp_nivel_{depth}"
+            conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+            self._transaction_depth += 1
+            cursor = conn.cursor()
+            try:
+                yield conn, cursor
+            except BaseException:
+                cursor.close()
+                self._transaction_depth -= 1
+                if depth == 0:
+                    conn.execute("ROLLBACK")
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                cursor.close()
+                self._transaction_depth -= 1
+                conn.execute("COMMIT" if depth == 0 else f"RELEASE {savepoint}")
+
+    @contextlib.contextmanager
+    def read(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Gerenciador de conexões já foi fechado.")
+        conn = self._get_reader()
+        cursor = conn.cursor()
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+            self._reader_pool.put(conn)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        with self._readers_lock:
+            readers, self._all_readers = self._all_readers, []
+        for conn in readers:
+            try: conn.close()
+            except sqlite3.Error: pass
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                try:
+                    self._writer_conn.execute("PRAGMA optimize")
+                    self._writer_conn.close()
+                except sqlite3.Error as e:
+                    _log_error(f"Erro SQLite ao fechar a conexão de escrita: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+                self._writer_conn = None
+
+
+_db_manager = None
+_db_manager_lock = threading.Lock()
+
+def get_db_manager():
+    global _db_manager
+    if _db_manager is None:
+        with _db_manager_lock:
+            if _db_manager is None:
+                _db_manager = DBConnectionManager(get_db_path())
+                atexit.register(_db_manager.close)
+    return _db_manager
+
+def db_leitura():
+    return get_db_manager().read()
+
+def db_transacao():
+    return get_db_manager().transaction()
+
+class DBJob:
+    def __init__(self, worker, func, args, kwargs, on_done, on_error, on_progress, on_cancel, group):
+        self._worker = worker
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.on_done, self.on_error, self.on_progress, self.on_cancel = on_done, on_error, on_progress, on_cancel
+        self.group = group
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report_progress(self, value):
+        if not self.cancelled: self._worker._results.put(("progresso", self, value))
+
+
+class DBWorker:
+    # Executa consultas e operações longas fora da thread do Tk. Os resultados voltam por uma fila que a
+    # interface esvazia com after(), então todos os callbacks rodam na thread principal.
+    def __init__(self, num_threads=DB_WORKER_THREADS):
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._threads = [threading.Thread(target=self._run, name=f"ganchometro-db-{i}", daemon=True) for i in range(num_threads)]
+        for thread in self._threads: thread.start()
+
+    def submit(self, func, args=(), kwargs=None, on_done=None, on_error=None, on_progress=None, on_cancel=None, group=None):
+        job = DBJob(self, func, args, dict(kwargs or {}), on_done, on_error, on_progress, on_cancel, group)
+        if on_progress: job.kwargs["progress_callback"] = job.report_progress
+        with self._lock:
+            self._pending.add(job)
+        self._jobs.put(job)
+        return job
+
+    def cancel_group(self, group):
+        with self._lock:
+            for job in self._pending:
+                if job.group == group: job.cancel()
+
+    def has_pending(self, group=None):
+        with self._lock:
+            return any(group is None or job.group == group for job in self._pending)
+
+    def call_on_ui(self, func, *args):
+        self._results.put(("chamada", func, args))
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None: break
+            if job.cancelled:
+                resultado = ("cancelado", job, None)
+            else:
+                try:
+                    resultado = ("ok", job, job.func(*job.args, **job.kwargs))
+                except Exception as e:
+                    _log_error(f"Erro em tarefa de segundo plano {getattr(job.func, '__name__', job.func)}: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+                    resultado = ("erro", job, e)
+            with self._lock:
+                self._pending.discard(job)
+            self._results.put(resultado)
+
+    def process_results(self, max_items=50):
+        for _ in range(max_items):
+            try:
+                tipo, alvo, valor = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if tipo == "chamada":
+                callback, args = alvo, valor
+            elif alvo.cancelled:
+                if tipo == "progresso": continue
+                callback, args = alvo.on_cancel, ()
+            else:
+                callback = {"ok": alvo.on_done, "erro": alvo.on_error, "progresso": alvo.on_progress}.get(tipo)
+                args = (valor,)
+            if callback is None: continue
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Erro ao entregar resultado de tarefa em segundo plano: {e}")
+                _log_error(f"Erro em DBWorker.process_results ({callback}): {e}\n{traceback.format_exc()}", "ganchometro_ui_errors.txt")
+
+    def shutdown(self, timeout=2.0):
+        with self._lock:
+            for job in self._pending: job.cancel()
+        for _ in self._threads: self._jobs.put(None)
+        for thread in self._threads: thread.join(timeout)
+
+
+_db_worker = None
+
+def get_db_worker():
+    global _db_worker
+    if _db_worker is None:
+        with _db_manager_lock:
+            if _db_worker is None:
+                _db_worker = DBWorker()
+                atexit.register(_db_worker.shutdown)
+    return _db_worker
 
 def get_id_by_name(table_name, item_name, conn_cursor_tuple):
     conn, cursor = conn_cursor_tuple
@@ -133,86 +529,542 @@ def get_id_by_name(table_name, item_name, conn_cursor_tuple):
         return None
 
 def _add_db_columns_if_not_exists(conn, cursor):
+    # Roda dentro de uma migração: um erro aqui tem de subir para desfazer a transação e não avançar o user_version.
+    cursor.execute("PRAGMA table_info(matches)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if 'game_mode' not in columns:
+        cursor.execute("ALTER TABLE matches ADD COLUMN game_mode TEXT")
+    if 'jhones_sedex' not in columns:
+        cursor.execute("ALTER TABLE matches ADD COLUMN jhones_sedex BOOLEAN")
+    if 'content_hash' not in columns:
+        cursor.execute("ALTER TABLE matches ADD COLUMN content_hash TEXT")
+
+
+def _migracao_tabelas_base(cursor):
+    # Migração 1: o schema original. Tudo é IF NOT EXISTS para que bancos anteriores ao user_version passem por ela sem perda.
+    cursor.execute('CREATE TABLE IF NOT EXISTS killers (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS maps (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, match_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            killer_id INTEGER, map_id INTEGER, item_used_id INTEGER, item_gained_id INTEGER,
+            item_lost_id INTEGER, escaped BOOLEAN, survivors_escaped INTEGER, notes TEXT,
+            game_mode TEXT, jhones_sedex BOOLEAN,
+            FOREIGN KEY (killer_id) REFERENCES killers(id), FOREIGN KEY (map_id) REFERENCES maps(id),
+            FOREIGN KEY (item_used_id) REFERENCES items(id), FOREIGN KEY (item_gained_id) REFERENCES items(id),
+            FOREIGN KEY (item_lost_id) REFERENCES items(id)
+        )
+    ''')
+    cursor.execute('CREATE TABLE IF NOT EXISTS teammates (id INTEGER PRIMARY KEY AUTOINCREMENT, nickname TEXT UNIQUE NOT NULL)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS match_teammates (
+            match_id INTEGER NOT NULL, teammate_id INTEGER NOT NULL,
+            FOREIGN KEY(match_id) REFERENCES matches(id) ON DELETE CASCADE,
+            FOREIGN KEY(teammate_id) REFERENCES teammates(id) ON DELETE CASCADE,
+            PRIMARY KEY (match_id, teammate_id)
+        )
+    ''')
+    _add_db_columns_if_not_exists(cursor.connection, cursor)
+
+TABELAS_CATALOGO = ("killers", "maps", "items", "teammates")
+
+def _criar_versionamento_catalogo(cursor):
+    # Contador bumpado por trigger a cada escrita nas tabelas de referência; o ReferenceCatalog só recarrega quando ele muda.
+    cursor.execute("CREATE TABLE IF NOT EXISTS catalogo_versao (id INTEGER PRIMARY KEY CHECK (id = 1), versao INTEGER NOT NULL DEFAULT 0)")
+    cursor.execute("INSERT OR IGNORE INTO catalogo_versao (id, versao) VALUES (1, 0)")
+    for tabela in TABELAS_CATALOGO:
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{tabela}_catalogo_{evento.lower()} AFTER {evento} ON {tabela} BEGIN UPDATE catalogo_versao SET versao = versao + 1 WHERE id = 1; END")
+
+def _separar_versao_teammates(cursor):
+    # Nick novo é rotina: teammates ganham contador próprio para não forçar a recarga de killers, mapas e itens
+    # (e killers/mapas/itens não recarregam o roster inteiro).
+    cursor.execute("PRAGMA table_info(catalogo_versao)")
+    if "versao_teammates" not in {coluna[1] for coluna in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE catalogo_versao ADD COLUMN versao_teammates INTEGER NOT NULL DEFAULT 0")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_teammates_catalogo_{evento.lower()}")
+        cursor.execute(f"CREATE TRIGGER trg_teammates_catalogo_{evento.lower()} AFTER {evento} ON teammates BEGIN UPDATE catalogo_versao SET versao_teammates = versao_teammates + 1 WHERE id = 1; END")
+
+def _criar_indice_taxa_teammates(cursor):
+    # O top-N do gráfico de companheiros lê só as primeiras entradas deste índice, em vez de varrer o roster.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stats_teammate_taxa ON stats_teammate ((escapes * 1.0 / partidas), partidas, teammate_id)")
+
+def _criar_indices(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_killer ON matches (killer_id, escaped)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_map ON matches (map_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_item_used ON matches (item_used_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_item_lost ON matches (item_lost_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_game_mode ON matches (game_mode, escaped)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (match_date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_teammates_teammate ON match_teammates (teammate_id, match_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_teammates_nickname_nocase ON teammates (nickname COLLATE NOCASE)")
+
+def _criar_indice_hash_conteudo(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_matches_content_hash'")
+    if cursor.fetchone() is None:
+        duplicadas = _preencher_hashes_partidas(cursor)
+        if duplicadas: print(f"Aviso: {duplicadas} partida(s) duplicada(s) já existente(s) ficaram sem hash de conteúdo.")
+        cursor.execute("CREATE UNIQUE INDEX idx_matches_content_hash ON matches (content_hash)")
+
+def _hash_conteudo_partida(match_date, killer_name, map_name, item_used_name, item_gained_name, item_lost_name,
+                           escaped, survivors_escaped, game_mode, teammates_nicks):
+    chave = [str(match_date), killer_name, map_name, item_used_name, item_gained_name, item_lost_name,
+             None if escaped is None else bool(escaped), None if survivors_escaped is None else int(survivors_escaped),
+             game_mode or None, sorted({_chave_nick(nick) for nick in teammates_nicks})]
+    return hashlib.sha1(json.dumps(chave, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+def _preencher_hashes_partidas(cursor, match_id=None):
+    filtro = "m.id = ?" if match_id is not None else "m.content_hash IS NULL"
+    params = (match_id,) if match_id is not None else ()
+    cursor.execute(f'''
+        SELECT m.id, m.match_date, k.name, mp.name, iu.name, ig.name, il.name, m.escaped, m.survivors_escaped, m.game_mode,
+               (SELECT GROUP_CONCAT(t.nickname, char(31)) FROM match_teammates mt JOIN teammates t ON t.id = mt.teammate_id WHERE mt.match_id = m.id)
+        FROM matches m LEFT JOIN killers k ON m.killer_id = k.id LEFT JOIN maps mp ON m.map_id = mp.id
+        LEFT JOIN items iu ON m.item_used_id = iu.id LEFT JOIN items ig ON m.item_gained_id = ig.id
+        LEFT JOIN items il ON m.item_lost_id = il.id
+        WHERE {filtro} ORDER BY m.id
+    ''', params)
+    hashes_vistos = set(); atualizacoes = []; duplicadas = 0
+    for row in cursor.fetchall():
+        content_hash = _hash_conteudo_partida(*row[1:10], row[10].split("\x1f") if row[10] else [])
+        if content_hash in hashes_vistos: duplicadas += 1; continue
+        hashes_vistos.add(content_hash); atualizacoes.append((content_hash, row[0]))
+    cursor.executemany("UPDATE matches SET content_hash = ? WHERE id = ?", atualizacoes)
+    return duplicadas
+
+def _sql_contribuicao_partida(linha, sinal):
+    comandos = [f"""
+        UPDATE stats_geral SET total_partidas = total_partidas {sinal} 1, escapes = escapes {sinal} COALESCE({linha}.escaped, 0),
+               jhones_sim = jhones_sim {sinal} ({linha}.jhones_sedex IS 1), jhones_nao = jhones_nao {sinal} ({linha}.jhones_sedex IS 0),
+               jhones_respondidos = jhones_respondidos {sinal} ({linha}.jhones_sedex IS NOT NULL)
+        WHERE id = 1;"""]
+    rollups = [("stats_killer", "killer_id", f"{linha}.killer_id", True),
+               ("stats_map", "map_id", f"{linha}.map_id", False),
+               ("stats_item_usado", "item_id", f"{linha}.item_used_id", False),
+               ("stats_item_perdido", "item_id", f"{linha}.item_lost_id", False),
+               ("stats_modo", "game_mode", f"NULLIF({linha}.game_mode, '')", True)]
+    for tabela, coluna, valor, conta_escapes in rollups:
+        if sinal == "+":
+            comandos.append(f"INSERT OR IGNORE INTO {tabela} ({coluna}) SELECT {valor} WHERE {valor} IS NOT NULL;")
+        escapes_sql = f", escapes = escapes {sinal} COALESCE({linha}.escaped, 0)" if conta_escapes else ""
+        comandos.append(f"UPDATE {tabela} SET partidas = partidas {sinal} 1{escapes_sql} WHERE {coluna} = {valor};")
+    return "\n".join(comandos)
+
+def _sql_contribuicao_teammate(linha, sinal):
+    comandos = []
+    if sinal == "+":
+        comandos.append(f"INSERT OR IGNORE INTO stats_teammate (teammate_id) VALUES ({linha}.teammate_id);")
+    comandos.append(f"""
+        UPDATE stats_teammate SET partidas = partidas {sinal} 1,
+               escapes = escapes {sinal} COALESCE((SELECT escaped FROM matches WHERE id = {linha}.match_id), 0)
+        WHERE teammate_id = {linha}.teammate_id AND EXISTS (SELECT 1 FROM matches WHERE id = {linha}.match_id);""")
+    return "\n".join(comandos)
+
+def _criar_tabelas_estatisticas(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_geral (
+            id INTEGER PRIMARY KEY CHECK (id = 1), total_partidas INTEGER NOT NULL DEFAULT 0, escapes INTEGER NOT NULL DEFAULT 0,
+            jhones_sim INTEGER NOT NULL DEFAULT 0, jhones_nao INTEGER NOT NULL DEFAULT 0, jhones_respondidos INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_killer (killer_id INTEGER PRIMARY KEY, partidas INTEGER NOT NULL DEFAULT 0, escapes INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_map (map_id INTEGER PRIMARY KEY, partidas INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_item_usado (item_id INTEGER PRIMARY KEY, partidas INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_item_perdido (item_id INTEGER PRIMARY KEY, partidas INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_modo (game_mode TEXT PRIMARY KEY, partidas INTEGER NOT NULL DEFAULT 0, escapes INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_teammate (teammate_id INTEGER PRIMARY KEY, partidas INTEGER NOT NULL DEFAULT 0, escapes INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stats_teammate_partidas ON stats_teammate (partidas, teammate_id)")
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS stats_pausa (id INTEGER PRIMARY KEY CHECK (id = 1))')
+
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_matches_stats_insert AFTER INSERT ON matches WHEN NOT EXISTS (SELECT 1 FROM stats_pausa) BEGIN {_sql_contribuicao_partida('NEW', '+')} END")
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_matches_stats_before_delete BEFORE DELETE ON matches BEGIN DELETE FROM match_teammates WHERE match_id = OLD.id; END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_matches_stats_delete AFTER DELETE ON matches BEGIN {_sql_contribuicao_partida('OLD', '-')} END")
+    # Só as colunas que alimentam as estatísticas; atualizar content_hash não deve mexer nos rollups.
+    cursor.execute("DROP TRIGGER IF EXISTS trg_matches_stats_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_matches_stats_update AFTER UPDATE OF killer_id, map_id, item_used_id, item_lost_id, escaped, game_mode, jhones_sedex ON matches BEGIN
+            {_sql_contribuicao_partida('OLD', '-')}
+            {_sql_contribuicao_partida('NEW', '+')}
+            UPDATE stats_teammate SET escapes = escapes - COALESCE(OLD.escaped, 0) + COALESCE(NEW.escaped, 0)
+            WHERE teammate_id IN (SELECT teammate_id FROM match_teammates WHERE match_id = NEW.id);
+        END
+    """)
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_match_teammates_stats_insert AFTER INSERT ON match_teammates WHEN NOT EXISTS (SELECT 1 FROM stats_pausa) BEGIN {_sql_contribuicao_teammate('NEW', '+')} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_match_teammates_stats_delete AFTER DELETE ON match_teammates BEGIN {_sql_contribuicao_teammate('OLD', '-')} END")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_match_teammates_stats_update AFTER UPDATE ON match_teammates BEGIN
+            {_sql_contribuicao_teammate('OLD', '-')}
+            {_sql_contribuicao_teammate('NEW', '+')}
+        END
+    """)
+    cursor.execute("CREATE TRIGGER IF NOT EXISTS trg_teammates_stats_delete AFTER DELETE ON teammates BEGIN DELETE FROM stats_teammate WHERE teammate_id = OLD.id; END")
+
+    cursor.execute("SELECT 1 FROM stats_geral WHERE id = 1")
+    if cursor.fetchone() is None:
+        _reconstruir_estatisticas(cursor)
+
+def _aplicar_delta_estatisticas(cursor, a_partir_de_match_id=None):
+    filtro = "id > ?" if a_partir_de_match_id is not None else "1"
+    filtro_teammates = "m.id > ?" if a_partir_de_match_id is not None else "1"
+    params = (a_partir_de_match_id,) if a_partir_de_match_id is not None else ()
+    # NOT INDEXED força a busca por faixa de rowid; sem isso o planejador prefere varrer o índice inteiro a cada lote.
+    indice = " NOT INDEXED" if a_partir_de_match_id is not None else ""
+    cursor.execute(f'''
+        INSERT INTO stats_geral (id, total_partidas, escapes, jhones_sim, jhones_nao, jhones_respondidos)
+        SELECT 1, COUNT(*), COALESCE(SUM(COALESCE(escaped, 0)), 0), COALESCE(SUM(jhones_sedex IS 1), 0),
+               COALESCE(SUM(jhones_sedex IS 0), 0), COALESCE(SUM(jhones_sedex IS NOT NULL), 0)
+        FROM matches WHERE {filtro}
+        ON CONFLICT (id) DO UPDATE SET total_partidas = total_partidas + excluded.total_partidas, escapes = escapes + excluded.escapes,
+               jhones_sim = jhones_sim + excluded.jhones_sim, jhones_nao = jhones_nao + excluded.jhones_nao,
+               jhones_respondidos = jhones_respondidos + excluded.jhones_respondidos
+    ''', params)
+    rollups = [("stats_killer", "killer_id", "killer_id", True),
+               ("stats_map", "map_id", "map_id", False),
+               ("stats_item_usado", "item_id", "item_used_id", False),
+               ("stats_item_perdido", "item_id", "item_lost_id", False),
+               ("stats_modo", "game_mode", "NULLIF(game_mode, '')", True)]
+    for tabela, coluna, expressao, conta_escapes in rollups:
+        colunas_escapes = ", escapes" if conta_escapes else ""
+        soma_escapes = ", SUM(COALESCE(escaped, 0))" if conta_escapes else ""
+        atualiza_escapes = ", escapes = escapes + excluded.escapes" if conta_escapes else ""
+        cursor.execute(f'''
+            INSERT INTO {tabela} ({coluna}, partidas{colunas_escapes})
+            SELECT {expressao}, COUNT(*){soma_escapes} FROM matches{indice} WHERE {filtro} AND {expressao} IS NOT NULL GROUP BY {expressao}
+            ON CONFLICT ({coluna}) DO UPDATE SET partidas = partidas + excluded.partidas{atualiza_escapes}
+        ''', params)
+    cursor.execute(f'''
+        INSERT INTO stats_teammate (teammate_id, partidas, escapes)
+        SELECT mt.teammate_id, COUNT(*), SUM(COALESCE(m.escaped, 0)) FROM matches m{indice} CROSS JOIN match_teammates mt ON mt.match_id = m.id
+        WHERE {filtro_teammates} GROUP BY mt.teammate_id
+        ON CONFLICT (teammate_id) DO UPDATE SET partidas = partidas + excluded.partidas, escapes = escapes + excluded.escapes
+    ''', params)
+
+def _reconstruir_estatisticas(cursor):
+    for tabela in ("stats_geral", "stats_killer", "stats_map", "stats_item_usado", "stats_item_perdido", "stats_modo", "stats_teammate"):
+        cursor.execute(f"DELETE FROM {tabela}")
+    _aplicar_delta_estatisticas(cursor)
+
+def reconstruir_estatisticas():
     try:
-        cursor.execute("PRAGMA table_info(matches)")
-        columns = [info[1] for info in cursor.fetchall()]
-        if 'game_mode' not in columns:
-            cursor.execute("ALTER TABLE matches ADD COLUMN game_mode TEXT")
-        if 'jhones_sedex' not in columns:
-            cursor.execute("ALTER TABLE matches ADD COLUMN jhones_sedex BOOLEAN")
-        conn.commit()
+        with db_transacao() as (conn, cursor):
+            _reconstruir_estatisticas(cursor)
+        return True
     except sqlite3.Error as e:
-        print(f"Erro ao verificar/adicionar colunas: {e}")
-        _log_error(f"Erro SQLite em _add_db_columns_if_not_exists: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
-
+        print(f"Erro ao reconstruir estatísticas: {e}")
+        _log_error(f"Erro SQLite em reconstruir_estatisticas: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        return False
 
-def criar_tabelas():
-    conn, cursor = conectar_db()
+def verificar_planos_consulta():
+    scans_completos = []
     try:
-        cursor.execute('CREATE TABLE IF NOT EXISTS killers (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)')
-        cursor.execute('CREATE TABLE IF NOT EXISTS maps (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)')
-        cursor.execute('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL)')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS matches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, match_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                killer_id INTEGER, map_id INTEGER, item_used_id INTEGER, item_gained_id INTEGER,
-                item_lost_id INTEGER, escaped BOOLEAN, survivors_escaped INTEGER, notes TEXT,
-                game_mode TEXT, jhones_sedex BOOLEAN,
-                FOREIGN KEY (killer_id) REFERENCES killers(id), FOREIGN KEY (map_id) REFERENCES maps(id),
-                FOREIGN KEY (item_used_id) REFERENCES items(id), FOREIGN KEY (item_gained_id) REFERENCES items(id),
-                FOREIGN KEY (item_lost_id) REFERENCES items(id)
-            )
-        ''')
-        cursor.execute('CREATE TABLE IF NOT EXISTS teammates (id INTEGER PRIMARY KEY AUTOINCREMENT, nickname TEXT UNIQUE NOT NULL)')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS match_teammates (
-                match_id INTEGER NOT NULL, teammate_id INTEGER NOT NULL,
-                FOREIGN KEY(match_id) REFERENCES matches(id) ON DELETE CASCADE,
-                FOREIGN KEY(teammate_id) REFERENCES teammates(id) ON DELETE CASCADE,
-                PRIMARY KEY (match_id, teammate_id)
-            )
-        ''')
-        conn.commit()
-        _add_db_columns_if_not_exists(conn, cursor)
-        popular_dados_iniciais(conn, cursor)
-    except sqlite3.Error as e: 
-        print(f"Erro ao criar tabelas: {e}")
-        _log_error(f"Erro SQLite em criar_tabelas: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
-        messagebox.showerror("Erro Crítico de Banco de Dados", f"Não foi possível inicializar o banco de dados: {e}\nA aplicação não pode continuar.")
-        sys.exit(1) 
-    finally: 
-        if conn:
-            conn.close()
+        with db_leitura() as (conn, cursor):
+            for nome_consulta, sql, params, scans_permitidos in CONSULTAS_CRITICAS:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                for row in cursor.fetchall():
+                    detalhe = row[3]
+                    if not detalhe.startswith("SCAN ") or " USING " in detalhe or "CONSTANT ROW" in detalhe:
+                        continue
+                    if detalhe.split()[1] not in scans_permitidos:
+                        scans_completos.append(f"{nome_consulta}: {detalhe}")
+    except sqlite3.Error as e:
+        print(f"Erro ao verificar planos de consulta: {e}")
+        _log_error(f"Erro SQLite em verificar_planos_consulta: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        return []
+    if scans_completos:
+        print(f"Aviso: {len(scans_completos)} consulta(s) crítica(s) fazendo varredura completa de tabela.")
+        _log_error("Consultas críticas com varredura completa de tabela (EXPLAIN QUERY PLAN):\n" + "\n".join(scans_completos), "ganchometro_query_plan_log.txt")
+    return scans_completos
+
+DADOS_INICIAIS = { "killers": ["O Caçador", "O Espectro", "O Caipira", "A Enfermeira", "O Vulto", "A Bruxa", "O Médico", "A Caçadora", "O Canibal", "O Pesadelo", "A Porca", "O Palhaço", "O Espírito", "A Legião", "A Praga", "O Ghostface", "O Demogorgon", "O Oni", "O Mercenário", "O Carrasco", "O Flagelo", "Os Gêmeos", "O Trapaceiro", "O Nêmesis", "O Cenobita", "A Artista", "A Onryō", "A Draga", "O Vilão", "O Cavaleiro", "A Negociante de Crânios", "A Singularidade", "O Xenomorfo", "O Cara Legal", "O Desconhecido", "O Lich", "O Senhor das Trevas", "A Mestra da Matilha", "O Ghoul", "O Animatrônico"], "maps": ["Propriedade MacMillan – Torre de Carvão", "Propriedade MacMillan – Fábrica da Miséria", "Propriedade MacMillan – Abrigo Florestal", "Propriedade MacMillan – Fosso do Sufocamento", "Propriedade MacMillan – Armazém Rangente", "Destroços de Autohaven – Sepultura de Azarov", "Destroços de Autohaven – Paraíso do Combustível", "Destroços de Autohaven – Loja Desgraçada", "Destroços de Autohaven – Abrigo Sangrento", "Destroços de Autohaven – Quintal do Ferro Velho", "Fazenda Coldwind – Campos Pútridos", "Fazenda Coldwind – Casa dos Thompson", "Fazenda Coldwind – Estábulo Fraturado", "Fazenda Coldwind – Abatedouro Asqueroso", "Fazenda Coldwind – Córrego Atormentador", "Hospício Crotus Prenn – Capela do Padre Campbell", "Hospício Crotus Prenn – Enfermaria Conturbada", "Haddonfield – Travessa Lampkin", "Pântano do Remanso – A Rosa Lívida", "Pântano do Remanso – Despensa Cruel", "Instituto Memorial Léry – Centro de Tratamento", "Floresta Vermelha – Refúgio da Caçadora", "Floresta Vermelha – O Templo da Purgação", "Springwood – Escola Primária de Badham I", "Springwood – Escola Primária de Badham II", "Springwood – Escola Primária de Badham III", "Springwood – Escola Primária de Badham IV", "Springwood – Escola Primária de Badham V", "O Jogo – Fábrica de Embalagens de Carnes Gideon", "Propriedade dos Yamaoka – Residência da Família", "Propriedade dos Yamaoka – Santuário da Ira", "Ormond – Resort do Monte Ormond", "Ormond – Mina do Lago de Ormond", "Túmulo de Glenvale – Saloon do Cachorro Morto", "Raccoon City – Delegacia (Ala Leste)", "Raccoon City – Delegacia (Ala Oeste)", "Cemitério Renegado – Ninho dos Corvos", "Ilha sem Vida – Jardim da Alegria", "Ilha sem Vida – Praça de Greenville", "Ilha sem Vida – Freddy Fazbear's Pizza", "Floresta de Dvarka – Pouso do Lago Toba", "Floresta de Dvarka – Destroços da Nostromo", "Borgo Dizimado – Praça Arrasada", "Borgo Dizimado – Ruínas Esquecidas"], "items": ["Nenhum", "Caixa de Ferramentas Gasta", "Caixa de Ferramentas Comum", "Caixa de Ferramentas do Mecânico", "Caixa de Ferramentas Grande", "Caixa de Ferramentas de Alex", "Caixa de Ferramentas da Engenheira", "Kit Médico de Acampamento", "Kit de Primeiros Socorros", "Kit Médico de Emergência", "Kit Médico de Patrulheiro", "Lanterna Comum", "Lanterna Esportiva", "Lanterna Utilitária", "Chave Quebrada", "Chave Gasta", "Chave Esqueleto", "Mapa Comum", "Mapa Arco-Íris", "Fogos de Artifício (Evento)", "Lanterna Chinesa (Evento)", "Lanterna de Ano Novo Lunar (Evento)"] }
 
 def popular_dados_iniciais(conn, cursor):
-    initial_data = { "killers": ["O Caçador", "O Espectro", "O Caipira", "A Enfermeira", "O Vulto", "A Bruxa", "O Médico", "A Caçadora", "O Canibal", "O Pesadelo", "A Porca", "O Palhaço", "O Espírito", "A Legião", "A Praga", "O Ghostface", "O Demogorgon", "O Oni", "O Mercenário", "O Carrasco", "O Flagelo", "Os Gêmeos", "O Trapaceiro", "O Nêmesis", "O Cenobita", "A Artista", "A Onryō", "A Draga", "O Vilão", "O Cavaleiro", "A Negociante de Crânios", "A Singularidade", "O Xenomorfo", "O Cara Legal", "O Desconhecido", "O Lich", "O Senhor das Trevas", "A Mestra da Matilha", "O Ghoul", "O Animatrônico"], "maps": ["Propriedade MacMillan – Torre de Carvão", "Propriedade MacMillan – Fábrica da Miséria", "Propriedade MacMillan – Abrigo Florestal", "Propriedade MacMillan – Fosso do Sufocamento", "Propriedade MacMillan – Armazém Rangente", "Destroços de Autohaven – Sepultura de Azarov", "Destroços de Autohaven – Paraíso do Combustível", "Destroços de Autohaven – Loja Desgraçada", "Destroços de Autohaven – Abrigo Sangrento", "Destroços de Autohaven – Quintal do Ferro Velho", "Fazenda Coldwind – Campos Pútridos", "Fazenda Coldwind – Casa dos Thompson", "Fazenda Coldwind – Estábulo Fraturado", "Fazenda Coldwind – Abatedouro Asqueroso", "Fazenda Coldwind – Córrego Atormentador", "Hospício Crotus Prenn – Capela do Padre Campbell", "Hospício Crotus Prenn – Enfermaria Conturbada", "Haddonfield – Travessa Lampkin", "Pântano do Remanso – A Rosa Lívida", "Pântano do Remanso – Despensa Cruel", "Instituto Memorial Léry – Centro de Tratamento", "Floresta Vermelha – Refúgio da Caçadora", "Floresta Vermelha – O Templo da Purgação", "Springwood – Escola Primária de Badham I", "Springwood – Escola Primária de Badham II", "Springwood – Escola Primária de Badham III", "Springwood – Escola Primária de Badham IV", "Springwood – Escola Primária de Badham V", "O Jogo – Fábrica de Embalagens de Carnes Gideon", "Propriedade dos Yamaoka – Residência da Família", "Propriedade dos Yamaoka – Santuário da Ira", "Ormond – Resort do Monte Ormond", "Ormond – Mina do Lago de Ormond", "Túmulo de Glenvale – Saloon do Cachorro Morto", "Raccoon City – Delegacia (Ala Leste)", "Raccoon City – Delegacia (Ala Oeste)", "Cemitério Renegado – Ninho dos Corvos", "Ilha sem Vida – Jardim da Alegria", "Ilha sem Vida – Praça de Greenville", "Ilha sem Vida – Freddy Fazbear's Pizza", "Floresta de Dvarka – Pouso do Lago Toba", "Floresta de Dvarka – Destroços da Nostromo", "Borgo Dizimado – Praça Arrasada", "Borgo Dizimado – Ruínas Esquecidas"], "items": ["Nenhum", "Caixa de Ferramentas Gasta", "Caixa de Ferramentas Comum", "Caixa de Ferramentas do Mecânico", "Caixa de Ferramentas Grande", "Caixa de Ferramentas de Alex", "Caixa de Ferramentas da Engenheira", "Kit Médico de Acampamento", "Kit de Primeiros Socorros", "Kit Médico de Emergência", "Kit Médico de Patrulheiro", "Lanterna Comum", "Lanterna Esportiva", "Lanterna Utilitária", "Chave Quebrada", "Chave Gasta", "Chave Esqueleto", "Mapa Comum", "Mapa Arco-Íris", "Fogos de Artifício (Evento)", "Lanterna Chinesa (Evento)", "Lanterna de Ano Novo Lunar (Evento)"] }
-    try:
-        for table_name, data_list in initial_data.items():
-            for item_name in data_list: cursor.execute(f"INSERT OR IGNORE INTO {table_name} (name) VALUES (?)", (item_name,))
-        conn.commit()
-    except sqlite3.Error as e: 
-        print(f"Erro ao popular dados iniciais: {e}")
-        _log_error(f"Erro SQLite em popular_dados_iniciais: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+    # Como _add_db_columns_if_not_exists: erros sobem para a migração não gravar o checksum de dados que não entraram.
+    for table_name, data_list in DADOS_INICIAIS.items():
+        cursor.executemany(f"INSERT OR IGNORE INTO {table_name} (name) VALUES (?)", [(item_name,) for item_name in data_list])
+
+# Migrações numeradas, aplicadas em ordem. Só se acrescenta no fim: um número já publicado nunca muda de significado.
+MIGRACOES = [
+    (1, _migracao_tabelas_base),
+    (2, _criar_indices),
+    (3, _criar_tabelas_estatisticas),
+    (4, _criar_indice_hash_conteudo),
+    (5, _criar_versionamento_catalogo),
+    (6, _separar_versao_teammates),
+    (7, _criar_indice_taxa_teammates),
+]
+SCHEMA_VERSAO = MIGRACOES[-1][0]
+CHECKSUM_DADOS_INICIAIS = int(hashlib.sha1(json.dumps(DADOS_INICIAIS, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:4], 16)
+
+def _versao_banco_esperada():
+    # PRAGMA user_version = (versão do schema << 16) | checksum de 16 bits dos dados iniciais.
+    return (SCHEMA_VERSAO << 16) | CHECKSUM_DADOS_INICIAIS
+
+def aplicar_migracoes():
+    # Erros sobem (sqlite3.Error) com a transação desfeita; o tratamento fatal fica com initialize_database.
+    versao_esperada = _versao_banco_esperada()
+    if get_db_manager().user_version() == versao_esperada: return False
+    with db_transacao() as (conn, cursor):
+        # Relido dentro da transação: outra instância pode ter migrado o banco entre a leitura acima e o BEGIN.
+        versao_atual = cursor.execute("PRAGMA user_version").fetchone()[0]
+        versao_schema, checksum_dados = versao_atual >> 16, versao_atual & 0xFFFF
+        if versao_schema > SCHEMA_VERSAO:
+            print(f"Aviso: banco de dados na versão de schema {versao_schema}, mais nova que a suportada ({SCHEMA_VERSAO}).")
+            _log_error(f"Banco de dados com schema {versao_schema} mais novo que o suportado ({SCHEMA_VERSAO}); migrações não aplicadas.", "ganchometro_sqlite_errors.txt")
+            return False
+        if versao_atual == versao_esperada: return False
+        for numero, migracao in MIGRACOES:
+            if numero > versao_schema: migracao(cursor)
+        if checksum_dados != CHECKSUM_DADOS_INICIAIS: popular_dados_iniciais(conn, cursor)
+        cursor.execute(f"PRAGMA user_version = {versao_esperada}")
+    print(f"Banco de dados atualizado para a versão de schema {SCHEMA_VERSAO} (estava na {versao_schema}).")
+    return True
 
 def buscar_items_genericos(table_name, order_by_name=True):
-    conn, cursor = conectar_db()
     try:
-        order_clause = "ORDER BY name COLLATE NOCASE" if order_by_name else ""
-        cursor.execute(f"SELECT id, name FROM {table_name} {order_clause}")
-        return cursor.fetchall()
+        with db_leitura() as (conn, cursor):
+            order_clause = "ORDER BY name COLLATE NOCASE" if order_by_name else ""
+            cursor.execute(f"SELECT id, name FROM {table_name} {order_clause}")
+            return cursor.fetchall()
     except sqlite3.Error as e: 
         print(f"Erro ao buscar {table_name}: {e}")
         _log_error(f"Erro SQLite em buscar_items_genericos para '{table_name}': {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
         return []
-    finally: 
-        if conn:
-            conn.close()
+
+class ReferenceCatalog:
+    # Killers, mapas, itens e companheiros carregados uma vez em memória (id<->nome, listas ordenadas para a UI e o id
+    # de "Nenhum"). Cada acesso confere catalogo_versao numa leitura barata e só recarrega a parte que mudou; o roster
+    # de companheiros tem versão própria e só é lido por quem pede dados de companheiros.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versao = None
+        self._versao_teammates = None
+        self._listas = {}
+        self._ids_por_nome = {}
+        self._nomes_por_id = {}
+        self._teammates = ([], {}, {})
+
+    def _carregar_referencia(self, cursor):
+        listas, ids_por_nome, nomes_por_id = {}, {}, {}
+        for tabela in ("killers", "maps", "items"):
+            cursor.execute(f"SELECT id, name FROM {tabela} ORDER BY name COLLATE NOCASE")
+            listas[tabela] = [(row[0], row[1]) for row in cursor.fetchall()]
+            ids_por_nome[tabela] = {nome: item_id for item_id, nome in listas[tabela]}
+            nomes_por_id[tabela] = {item_id: nome for item_id, nome in listas[tabela]}
+        return listas, ids_por_nome, nomes_por_id
+
+    def _carregar_teammates(self, cursor):
+        cursor.execute("SELECT id, nickname FROM teammates ORDER BY nickname COLLATE NOCASE")
+        lista = [(row[0], row[1]) for row in cursor.fetchall()]
+        teammate_ids_por_chave = {}
+        for teammate_id, nickname in sorted(lista): teammate_ids_por_chave.setdefault(_chave_nick(nickname), teammate_id)
+        return lista, dict(lista), teammate_ids_por_chave
+
+    def _garantir_atualizado(self, teammates=False):
+        try:
+            with db_leitura() as (conn, cursor):
+                row = cursor.execute("SELECT versao, versao_teammates FROM catalogo_versao WHERE id = 1").fetchone()
+                versao, versao_teammates = row if row else (None, None)
+                with self._lock:
+                    recarregar_referencia = versao is None or versao != self._versao
+                    recarregar_teammates = teammates and (versao_teammates is None or versao_teammates != self._versao_teammates)
+                if not recarregar_referencia and not recarregar_teammates: return
+                referencia = self._carregar_referencia(cursor) if recarregar_referencia else None
+                dados_teammates = self._carregar_teammates(cursor) if recarregar_teammates else None
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar catálogo de referência: {e}")
+            _log_error(f"Erro SQLite em ReferenceCatalog._garantir_atualizado: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+            return
+        with self._lock:
+            if referencia is not None:
+                self._listas, self._ids_por_nome, self._nomes_por_id = referencia
+                self._versao = versao
+            if dados_teammates is not None:
+                self._teammates = dados_teammates
+                self._versao_teammates = versao_teammates
+
+    def invalidar(self):
+        with self._lock:
+            self._versao = None
+            self._versao_teammates = None
+
+    def lista(self, tabela):
+        if tabela == "teammates":
+            self._garantir_atualizado(teammates=True)
+            return self._teammates[0]
+        self._garantir_atualizado()
+        return self._listas.get(tabela, [])
+
+    def ids_por_nome(self, tabela):
+        self._garantir_atualizado()
+        return self._ids_por_nome.get(tabela, {})
+
+    def id_por_nome(self, tabela, nome):
+        return self.ids_por_nome(tabela).get(nome)
+
+    def nome_por_id(self, tabela, item_id):
+        if tabela == "teammates":
+            self._garantir_atualizado(teammates=True)
+            return self._teammates[1].get(item_id)
+        self._garantir_atualizado()
+        return self._nomes_por_id.get(tabela, {}).get(item_id)
+
+    def nenhum_item_id(self):
+        return self.id_por_nome("items", "Nenhum")
+
+    def nicks_teammates(self):
+        return [nickname for _, nickname in self.lista("teammates")]
+
+    def teammate_ids_por_chave(self):
+        self._garantir_atualizado(teammates=True)
+        return self._teammates[2]
+
+
+_catalogo_referencia = ReferenceCatalog()
+
+def obter_catalogo_referencia():
+    return _catalogo_referencia
+
+class TeammatePrefixIndex:
+    # Busca por prefixo dos nicks (casefold) para o autocomplete do assistente: as chaves ficam num array ordenado e
+    # o intervalo do prefixo sai de dois bisect. Cada nick tem uma ordem no ranking (frequência com decaimento pela
+    # recência); o top-N de prefixos curtos, que cobrem quase todo o roster, fica pré-calculado.
+    # Partidas novas entram como delta (só os companheiros delas); a reconstrução completa, depois de exclusões ou
+    # importações grandes, roda no DBWorker e as buscas seguem respondendo com os arrays antigos até a troca.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._construido = False
+        self._reconstruindo = False
+        self._pedidos = 0
+        self._pedidos_atendidos = 0
+        self._geracao = 0
+        self._deltas_pendentes = []
+        self._chaves = []
+        self._ordens = []
+        self._nicks = []
+        self._topo_por_prefixo = {}
+
+    @staticmethod
+    def _ordem(nickname, partidas, ultima):
+        # partidas * 0.5 ** ((ultima_global - ultima) / meia-vida), em log: o termo de ultima_global é igual para todos
+        # e não muda a ordem, então uma partida nova não mexe na posição de quem não jogou nela.
+        if partidas and ultima is not None:
+            peso = -(math.log2(partidas) + ultima / TEAMMATE_RECENCIA_MEIA_VIDA_PARTIDAS)
+        else:
+            peso = math.inf
+        return (peso, -(ultima or 0), nickname.casefold())
+
+    def _carregar(self):
+        with db_leitura() as (conn, cursor):
+            linhas = cursor.execute(SQL_TEAMMATES_AUTOCOMPLETE).fetchall()
+        entradas = sorted((nickname.strip().casefold(), self._ordem(nickname, partidas, ultima), nickname) for nickname, partidas, ultima in linhas)
+        chaves, ordens, nicks = [e[0] for e in entradas], [e[1] for e in entradas], [e[2] for e in entradas]
+        topo_por_prefixo = {}
+        for ordem, nickname in sorted(zip(ordens, nicks)):
+            chave = nickname.strip().casefold()
+            for tamanho in range(min(len(chave), TEAMMATE_PREFIXO_PRECALCULADO) + 1):
+                topo = topo_por_prefixo.setdefault(chave[:tamanho], [])
+                if len(topo) < TEAMMATE_SUGESTOES_MAX: topo.append((ordem, nickname))
+        return chaves, ordens, nicks, topo_por_prefixo
+
+    def _reconstruir(self):
+        with self._lock:
+            pedidos = self._pedidos
+        try:
+            dados = self._carregar()
+        except sqlite3.Error as e:
+            print(f"Erro ao montar índice de companheiros: {e}")
+            _log_error(f"Erro SQLite em TeammatePrefixIndex._reconstruir: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+            with self._lock:
+                self._reconstruindo = False
+            return
+        with self._lock:
+            self._chaves, self._ordens, self._nicks, self._topo_por_prefixo = dados
+            self._construido, self._reconstruindo = True, False
+            self._geracao += 1
+            self._pedidos_atendidos = pedidos
+            pendentes, self._deltas_pendentes = self._deltas_pendentes, []
+            desatualizado = pedidos != self._pedidos
+        # Partidas publicadas durante a leitura podem não ter entrado no snapshot: os deltas são refeitos sobre os arrays novos.
+        if pendentes: self.aplicar_partidas_novas(pendentes)
+        if desatualizado: self._agendar_reconstrucao()
+
+    def _agendar_reconstrucao(self):
+        with self._lock:
+            if self._reconstruindo: return
+            self._reconstruindo = True
+        get_db_worker().submit(self._reconstruir)
+
+    def invalidar(self):
+        with self._lock:
+            self._pedidos += 1
+            construido = self._construido
+        if construido: self._agendar_reconstrucao()
+
+    def aplicar_partidas_novas(self, match_ids):
+        if match_ids is None:
+            self.invalidar(); return
+        with self._lock:
+            if not self._construido: return
+            geracao = self._geracao
+            if self._reconstruindo: self._deltas_pendentes.extend(match_ids)
+        marcadores = ",".join("?" * len(match_ids))
+        try:
+            with db_leitura() as (conn, cursor):
+                linhas = cursor.execute(SQL_TEAMMATES_AUTOCOMPLETE_DAS_PARTIDAS.format(marcadores=marcadores), list(match_ids)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Erro ao atualizar índice de companheiros: {e}")
+            _log_error(f"Erro SQLite em TeammatePrefixIndex.aplicar_partidas_novas: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+            self.invalidar(); return
+        with self._lock:
+            # Arrays trocados por uma reconstrução no meio do caminho: ela já leu estes dados ou vai refazer o delta.
+            if geracao != self._geracao: return
+            for nickname, partidas, ultima in linhas:
+                self._atualizar_nick(nickname, self._ordem(nickname, partidas, ultima))
+
+    def _atualizar_nick(self, nickname, ordem):
+        # Chamado com o lock. Vale para partidas inseridas, em que a ordem de um companheiro só melhora.
+        chave = nickname.strip().casefold()
+        posicao = bisect.bisect_left(self._chaves, chave)
+        while posicao < len(self._chaves) and self._chaves[posicao] == chave and self._nicks[posicao] != nickname: posicao += 1
+        if posicao < len(self._chaves) and self._nicks[posicao] == nickname:
+            self._ordens[posicao] = ordem
+        else:
+            self._chaves.insert(posicao, chave); self._ordens.insert(posicao, ordem); self._nicks.insert(posicao, nickname)
+        for tamanho in range(min(len(chave), TEAMMATE_PREFIXO_PRECALCULADO) + 1):
+            topo = self._topo_por_prefixo.setdefault(chave[:tamanho], [])
+            topo[:] = [entrada for entrada in topo if entrada[1] != nickname]
+            bisect.insort(topo, (ordem, nickname))
+            del topo[TEAMMATE_SUGESTOES_MAX:]
+
+    def buscar(self, prefixo, limite=TEAMMATE_SUGESTOES_MAX):
+        with self._lock:
+            construido = self._construido
+            desatualizado = self._pedidos != self._pedidos_atendidos and not self._reconstruindo
+        # Só a primeira montagem é síncrona (normalmente já feita em segundo plano ao abrir o registro).
+        if not construido: self._reconstruir()
+        elif desatualizado: self._agendar_reconstrucao()
+        prefixo = prefixo.strip().casefold()
+        with self._lock:
+            if limite <= TEAMMATE_SUGESTOES_MAX and prefixo in self._topo_por_prefixo:
+                return [nickname for _, nickname in self._topo_por_prefixo[prefixo][:limite]]
+            inicio = bisect.bisect_left(self._chaves, prefixo)
+            fim = bisect.bisect_left(self._chaves, prefixo + "\U0010ffff", inicio)
+            return [nickname for _, nickname in heapq.nsmallest(limite, zip(self._ordens[inicio:fim], self._nicks[inicio:fim]))]
+
+
+_indice_teammates = TeammatePrefixIndex()
+
+def buscar_teammates_por_prefixo(prefixo, limite=TEAMMATE_SUGESTOES_MAX):
+    return _indice_teammates.buscar(prefixo, limite)
 
 def get_or_create_teammate_id(nickname, conn_cursor_tuple):
     conn, cursor = conn_cursor_tuple
     if not nickname or not nickname.strip(): return None
     try:
-        cursor.execute("SELECT id FROM teammates WHERE LOWER(nickname) = LOWER(?)", (nickname.strip(),))
+        cursor.execute(SQL_TEAMMATE_POR_NICK, (nickname.strip(),))
         result = cursor.fetchone()
         if result: return result[0]
         else:
@@ -223,166 +1075,1498 @@ def get_or_create_teammate_id(nickname, conn_cursor_tuple):
         _log_error(f"Erro SQLite em get_or_create_teammate_id para '{nickname}': {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
         return None
 
+def _inserir_partida(conn, cursor, killer_id, map_id, item_used_id, item_gained_id, item_lost_id,
+                     escaped, survivors_escaped, notes, game_mode, teammates_nicks=None, jhones_sedex=None, match_date=None):
+    p_killer_id = int(killer_id) if killer_id is not None else None
+    p_map_id = int(map_id) if map_id is not None else None
+    p_item_used_id = int(item_used_id) if item_used_id is not None else None
+    p_item_gained_id = int(item_gained_id) if item_gained_id is not None else None
+    p_item_lost_id = int(item_lost_id) if item_lost_id is not None else None
+    p_escaped = bool(escaped) if escaped is not None else None
+    p_survivors_escaped = int(survivors_escaped) if survivors_escaped is not None else None
+    p_notes = str(notes) if notes is not None else ""
+    p_game_mode = str(game_mode) if game_mode is not None else None
+    p_jhones_sedex = bool(jhones_sedex) if jhones_sedex is not None else None
+    p_match_date = str(match_date if match_date else datetime.datetime.now().isoformat())
+
+    params_sql = (
+        p_killer_id, p_map_id, p_item_used_id, p_item_gained_id, p_item_lost_id,
+        p_escaped, p_survivors_escaped, p_notes, p_game_mode,
+        p_jhones_sedex, p_match_date
+    )
+    cursor.execute('''
+        INSERT INTO matches (killer_id, map_id, item_used_id, item_gained_id, item_lost_id,
+                                escaped, survivors_escaped, notes, game_mode, jhones_sedex, match_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', params_sql)
+    match_id = cursor.lastrowid
+    if match_id and teammates_nicks:
+        for nick in teammates_nicks:
+            if nick and nick.strip():
+                teammate_id = get_or_create_teammate_id(nick, (conn, cursor))
+                if teammate_id:
+                    cursor.execute("INSERT OR IGNORE INTO match_teammates (match_id, teammate_id) VALUES (?, ?)", (match_id, teammate_id))
+    _preencher_hashes_partidas(cursor, match_id)
+    return match_id
+
 def registrar_partida(killer_id, map_id, item_used_id, item_gained_id, item_lost_id,
                         escaped, survivors_escaped, notes, game_mode,
                         teammates_nicks=None, jhones_sedex=None, match_date_str=None):
-    conn, cursor = conectar_db()
-    match_date_to_insert = match_date_str if match_date_str else datetime.datetime.now().isoformat()
-    match_id = None
-    try:
-        p_killer_id = int(killer_id) if killer_id is not None else None
-        p_map_id = int(map_id) if map_id is not None else None
-        p_item_used_id = int(item_used_id) if item_used_id is not None else None
-        p_item_gained_id = int(item_gained_id) if item_gained_id is not None else None
-        p_item_lost_id = int(item_lost_id) if item_lost_id is not None else None
-        p_escaped = bool(escaped) if escaped is not None else None
-        p_survivors_escaped = int(survivors_escaped) if survivors_escaped is not None else None
-        p_notes = str(notes) if notes is not None else ""
-        p_game_mode = str(game_mode) if game_mode is not None else None
-        p_jhones_sedex = bool(jhones_sedex) if jhones_sedex is not None else None
-        p_match_date = str(match_date_to_insert)
-
-        params_sql = (
-            p_killer_id, p_map_id, p_item_used_id, p_item_gained_id, p_item_lost_id,
-            p_escaped, p_survivors_escaped, p_notes, p_game_mode,
-            p_jhones_sedex, p_match_date
-        )
-        cursor.execute('''
-            INSERT INTO matches (killer_id, map_id, item_used_id, item_gained_id, item_lost_id,
-                                    escaped, survivors_escaped, notes, game_mode, jhones_sedex, match_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', params_sql)
-        match_id = cursor.lastrowid
-        if match_id and teammates_nicks:
-            for nick in teammates_nicks:
-                if nick and nick.strip():
-                    teammate_id = get_or_create_teammate_id(nick, (conn, cursor))
-                    if teammate_id:
-                        cursor.execute("INSERT OR IGNORE INTO match_teammates (match_id, teammate_id) VALUES (?, ?)", (match_id, teammate_id))
-        conn.commit()
-        if not match_date_str: messagebox.showinfo("Sucesso", "Partida registrada com sucesso!")
-        return True
-    except TypeError as te:
-        if conn: conn.rollback()
-        print(f"TypeError em registrar_partida: {te}")
-        _log_error(f"TypeError em registrar_partida: {te}\n{traceback.format_exc()}", "ganchometro_save_error.txt")
-        if not match_date_str: messagebox.showerror("Erro de Tipo ao Salvar", f"Erro de tipo ao salvar: {te}\nVerifique o console e o log 'ganchometro_save_error.txt'.")
-        return False
-    except sqlite3.Error as e:
-        if conn: conn.rollback()
-        print(f"Erro ao registrar partida no DB: {e}")
-        _log_error(f"Erro SQLite em registrar_partida: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
-        if not match_date_str: messagebox.showerror("Erro de BD", f"Erro ao registrar partida: {e}\nVerifique o console e o log 'ganchometro_sqlite_errors.txt'.")
-        return False
-    finally: 
-        if conn:
-            conn.close()
+    # Gravação síncrona, sem interface: erros (sqlite3.IntegrityError para partida duplicada, TypeError/ValueError para
+    # dados inválidos) sobem para quem chamou. O assistente usa a MatchWriteQueue.
+    with db_transacao() as (conn, cursor):
+        match_id = _inserir_partida(conn, cursor, killer_id, map_id, item_used_id, item_gained_id, item_lost_id, escaped,
+                                    survivors_escaped, notes, game_mode, teammates_nicks, jhones_sedex, match_date_str)
+    notificar_partidas_inseridas([match_id])
+    return match_id
+
+def _banco_ocupado(erro):
+    return isinstance(erro, sqlite3.OperationalError) and ("locked" in str(erro) or "busy" in str(erro))
+
+class MatchWriteQueue:
+    # Gravação das partidas do assistente em segundo plano (write-behind). Cada partida é anotada num diário JSONL ao
+    # lado do banco antes de entrar na fila, então um fechamento no meio do caminho não a perde: o diário é reaplicado
+    # na próxima abertura e o índice único de content_hash torna a reaplicação idempotente. A thread gravadora junta as
+    # partidas acumuladas numa só transação (um savepoint por partida) e tenta de novo quando o banco está travado.
+    def __init__(self, caminho_diario):
+        self._caminho_diario = caminho_diario
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._ouvintes = []
+        self._proximo_seq = 1
+        self._pendentes = set()
+        # Partidas que esgotaram as tentativas: seguem anotadas no diário (sem "feito") e voltam para a fila depois de
+        # uma espera que dobra a cada lote que falha de novo; saem daqui quando são reenfileiradas.
+        self._adiadas = {}
+        self._falhas_seguidas = 0
+        self._reenvio_em = None
+        self._diario = None
+        self._thread = threading.Thread(target=self._run, name="ganchometro-gravacao", daemon=True)
+        self._recuperar_diario()
+        self._thread.start()
+
+    def _recuperar_diario(self):
+        pendentes = {}
+        if os.path.exists(self._caminho_diario):
+            with open(self._caminho_diario, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # última linha truncada por um fechamento abrupto
+                    if "partida" in registro: pendentes[registro["seq"]] = registro["partida"]
+                    elif "feito" in registro: pendentes.pop(registro["feito"], None)
+        # Reescreve o diário só com o que ainda falta gravar, para ele não crescer entre sessões.
+        caminho_temporario = self._caminho_diario + ".tmp"
+        with open(caminho_temporario, "w", encoding="utf-8") as f:
+            for seq in sorted(pendentes):
+                f.write(json.dumps({"seq": seq, "partida": pendentes[seq]}, ensure_ascii=False) + "\n")
+        os.replace(caminho_temporario, self._caminho_diario)
+        self._diario = open(self._caminho_diario, "a", encoding="utf-8")
+        if pendentes:
+            print(f"Reaplicando {len(pendentes)} partida(s) pendente(s) do diário de gravação.")
+            self._proximo_seq = max(pendentes) + 1
+        for seq in sorted(pendentes):
+            self._pendentes.add(seq)
+            self._fila.put((seq, pendentes[seq], True))
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._ouvintes.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._ouvintes: self._ouvintes.remove(callback)
+
+    def enfileirar(self, partida):
+        partida = dict(partida)
+        if not partida.get("match_date"): partida["match_date"] = datetime.datetime.now().isoformat()
+        with self._lock:
+            seq = self._proximo_seq; self._proximo_seq += 1
+            self._diario.write(json.dumps({"seq": seq, "partida": partida}, ensure_ascii=False) + "\n")
+            self._diario.flush()
+            self._pendentes.add(seq)
+        self._fila.put((seq, partida, False))
+        return seq
+
+    def pendentes(self):
+        with self._lock:
+            return len(self._pendentes) + len(self._adiadas)
+
+    def _reenfileirar_adiadas(self):
+        with self._lock:
+            adiadas, self._adiadas = self._adiadas, {}
+            self._pendentes.update(adiadas)
+        for seq in sorted(adiadas):
+            partida, recuperada = adiadas[seq]
+            self._fila.put((seq, partida, recuperada))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                espera = max(0.0, self._reenvio_em - time.monotonic()) if self._adiadas else None
+            try:
+                item = self._fila.get(timeout=espera)
+            except queue.Empty:
+                self._reenfileirar_adiadas()
+                continue
+            if item is None: break
+            lote = [item]
+            while len(lote) < WRITE_QUEUE_MAX_BATCH:
+                try:
+                    proximo = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if proximo is None:
+                    self._fila.put(None)
+                    break
+                lote.append(proximo)
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote):
+        for tentativa in range(WRITE_QUEUE_MAX_TENTATIVAS):
+            try:
+                resultados = self._tentar_lote(lote)
+                break
+            except Exception as e:
+                if _banco_ocupado(e) and tentativa + 1 < WRITE_QUEUE_MAX_TENTATIVAS:
+                    time.sleep(WRITE_QUEUE_ESPERA_BASE_S * 2 ** tentativa)
+                    continue
+                print(f"Erro ao gravar partidas em segundo plano: {e}")
+                _log_error(f"Erro SQLite em MatchWriteQueue._gravar_lote ({len(lote)} partida(s)): {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+                # Continuam no diário e voltam para a fila depois da espera (ou na próxima abertura).
+                resultados = [{"seq": seq, "match_id": None, "erro": str(e), "duplicada": False, "recuperada": recuperada, "pendente": True}
+                              for seq, _, recuperada in lote]
+                break
+        concluidos = [resultado["seq"] for resultado in resultados if not resultado.get("pendente")]
+        adiadas = {seq: (partida, recuperada) for (seq, partida, recuperada), resultado in zip(lote, resultados) if resultado.get("pendente")}
+        with self._lock:
+            for seq in concluidos: self._diario.write(json.dumps({"feito": seq}) + "\n")
+            if adiadas:
+                self._adiadas.update(adiadas)
+                self._reenvio_em = time.monotonic() + min(WRITE_QUEUE_REENVIO_ESPERA_S * 2 ** self._falhas_seguidas, WRITE_QUEUE_REENVIO_ESPERA_MAX_S)
+                self._falhas_seguidas += 1
+            else:
+                self._falhas_seguidas = 0
+            self._pendentes.difference_update(seq for seq, _, _ in lote)
+            self._diario.flush()
+            # Só zera o diário quando toda partida anotada nele já tem o seu "feito".
+            if not self._pendentes and not self._adiadas: self._diario.truncate(0)
+            ouvintes = list(self._ouvintes)
+        match_ids = [resultado["match_id"] for resultado in resultados if resultado["match_id"]]
+        if match_ids: notificar_partidas_inseridas(match_ids)
+        for callback in ouvintes:
+            try:
+                callback(resultados)
+            except Exception as e:
+                print(f"Erro ao notificar gravação de partidas: {e}")
+                _log_error(f"Erro em MatchWriteQueue._gravar_lote ({callback}): {e}\n{traceback.format_exc()}", "ganchometro_ui_errors.txt")
+
+    def _tentar_lote(self, lote):
+        resultados = []
+        with db_transacao() as (conn, cursor):
+            for seq, partida, recuperada in lote:
+                resultado = {"seq": seq, "match_id": None, "erro": None, "duplicada": False, "recuperada": recuperada}
+                try:
+                    with db_transacao() as (conn_sp, cursor_sp):
+                        resultado["match_id"] = _inserir_partida(conn_sp, cursor_sp, **partida)
+                except sqlite3.IntegrityError:
+                    resultado["duplicada"] = True
+                except sqlite3.Error as e:
+                    if _banco_ocupado(e): raise
+                    resultado["erro"] = str(e)
+                    _log_error(f"Erro SQLite ao gravar partida {seq} da fila: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+                except (TypeError, ValueError) as e:
+                    resultado["erro"] = str(e)
+                    _log_error(f"Dados inválidos na partida {seq} da fila: {e}\n{traceback.format_exc()}", "ganchometro_save_error.txt")
+                resultados.append(resultado)
+        return resultados
+
+    def fechar(self, timeout=5.0):
+        self._fila.put(None)
+        self._thread.join(timeout)
+        with self._lock:
+            if self._diario is not None:
+                self._diario.close(); self._diario = None
+
+
+_fila_gravacao = None
+
+def obter_fila_gravacao():
+    global _fila_gravacao
+    if _fila_gravacao is None:
+        get_db_manager()  # criado antes para que o atexit feche a fila antes das conexões
+        with _db_manager_lock:
+            if _fila_gravacao is None:
+                _fila_gravacao = MatchWriteQueue(os.path.join(os.path.dirname(get_db_path()), WRITE_QUEUE_JOURNAL_FILENAME))
+                atexit.register(_fila_gravacao.fechar)
+    return _fila_gravacao
+
+_NOCASE_TABLE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def _chave_nick(nickname):
+    return nickname.strip().translate(_NOCASE_TABLE)
+
+def _normalizar_partida_importada(partida_data, killer_ids, map_ids, item_ids):
+    killer_id = killer_ids.get(partida_data.get("killer_name")); map_id = map_ids.get(partida_data.get("map_name"))
+    item_used_id = item_ids.get(partida_data.get("item_used_name")); item_gained_id = item_ids.get(partida_data.get("item_gained_name"))
+    item_lost_id = item_ids.get(partida_data.get("item_lost_name"))
+    if None in [killer_id, map_id, item_used_id, item_gained_id, item_lost_id]: return None
+    game_mode = partida_data.get("game_mode")
+    if game_mode not in GAME_MODES: game_mode = None
+    escaped_val = partida_data.get("escaped")
+    escaped = escaped_val.lower() == 'true' if isinstance(escaped_val, str) else bool(escaped_val)
+    survivors_escaped = int(partida_data.get("survivors_escaped", 0))
+    notes = partida_data.get("notes", "")
+    notes = str(notes) if notes is not None else ""
+    jhones_sedex = partida_data.get("jhones_sedex")
+    jhones_sedex = bool(jhones_sedex) if jhones_sedex is not None else None
+    match_date = str(partida_data.get("match_date") or datetime.datetime.now().isoformat())
+    teammates_nicks = [str(nick).strip() for nick in (partida_data.get("teammates_nicks") or []) if nick and str(nick).strip()]
+    content_hash = _hash_conteudo_partida(match_date, partida_data.get("killer_name"), partida_data.get("map_name"),
+                                          partida_data.get("item_used_name"), partida_data.get("item_gained_name"),
+                                          partida_data.get("item_lost_name"), escaped, survivors_escaped, game_mode, teammates_nicks)
+    params_sql = (killer_id, map_id, item_used_id, item_gained_id, item_lost_id, escaped, survivors_escaped,
+                  notes, game_mode, jhones_sedex, match_date, content_hash)
+    return params_sql, teammates_nicks
+
+def _gravar_lote_importacao(cursor, lote, teammate_ids):
+    # teammate_ids não é alterado aqui: os ids novos só valem depois do commit (num rollback o AUTOINCREMENT volta atrás
+    # e os mesmos ids seriam reaproveitados por outros nicks). Quem chama junta o retorno depois que a transação fecha.
+    novos_nicks = {}
+    novos_teammate_ids = {}
+    for _, teammates_nicks in lote:
+        for nick in teammates_nicks:
+            chave = _chave_nick(nick)
+            if chave not in teammate_ids and chave not in novos_nicks: novos_nicks[chave] = nick
+    if novos_nicks:
+        cursor.execute("SELECT IFNULL(MAX(id), 0) FROM teammates")
+        ultimo_teammate_id = cursor.fetchone()[0]
+        cursor.executemany("INSERT OR IGNORE INTO teammates (nickname) VALUES (?)", [(nick,) for nick in novos_nicks.values()])
+        cursor.execute("SELECT id, nickname FROM teammates WHERE id > ?", (ultimo_teammate_id,))
+        for teammate_id, nickname in cursor.fetchall(): novos_teammate_ids[_chave_nick(nickname)] = teammate_id
+
+    cursor.execute("SELECT IFNULL(MAX(id), 0) FROM matches")
+    ultimo_match_id = cursor.fetchone()[0]
+    cursor.execute("INSERT INTO stats_pausa (id) VALUES (1)")
+    cursor.executemany('''
+        INSERT OR IGNORE INTO matches (killer_id, map_id, item_used_id, item_gained_id, item_lost_id,
+                                escaped, survivors_escaped, notes, game_mode, jhones_sedex, match_date, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [params_sql for params_sql, _ in lote])
+    cursor.execute("SELECT id, content_hash FROM matches WHERE id > ? ORDER BY id", (ultimo_match_id,))
+    novos_match_ids = {content_hash: match_id for match_id, content_hash in cursor.fetchall()}
+
+    pares_teammates = []
+    for params_sql, teammates_nicks in lote:
+        match_id = novos_match_ids.get(params_sql[-1])
+        if match_id is None: continue
+        for nick in teammates_nicks:
+            chave = _chave_nick(nick)
+            teammate_id = teammate_ids.get(chave) or novos_teammate_ids.get(chave)
+            if teammate_id: pares_teammates.append((match_id, teammate_id))
+    if pares_teammates:
+        cursor.executemany("INSERT OR IGNORE INTO match_teammates (match_id, teammate_id) VALUES (?, ?)", pares_teammates)
+    cursor.execute("DELETE FROM stats_pausa")
+    _aplicar_delta_estatisticas(cursor, ultimo_match_id)
+    return list(novos_match_ids.values()), novos_teammate_ids
+
+def importar_partidas_em_lote(partidas, progress_callback=None, tamanho_lote=IMPORT_BATCH_SIZE):
+    resultado = {"importadas": 0, "duplicadas": 0, "puladas": 0, "erros": 0, "processadas": 0}
+    ids_importados = []
+    killer_ids = _catalogo_referencia.ids_por_nome("killers")
+    map_ids = _catalogo_referencia.ids_por_nome("maps")
+    item_ids = _catalogo_referencia.ids_por_nome("items")
+    # Cópia: o lote acrescenta os companheiros novos e o catálogo recarrega sozinho pela versão depois do commit.
+    teammate_ids = dict(_catalogo_referencia.teammate_ids_por_chave())
+
+    def _gravar(lote):
+        try:
+            with db_transacao() as (conn, cursor):
+                novos_ids, novos_teammate_ids = _gravar_lote_importacao(cursor, lote, teammate_ids)
+            teammate_ids.update(novos_teammate_ids)
+            resultado["importadas"] += len(novos_ids)
+            if len(ids_importados) <= INCREMENTAL_REFRESH_MAX_MATCHES: ids_importados.extend(novos_ids)
+            resultado["duplicadas"] += len(lote) - len(novos_ids)
+        except sqlite3.Error as e:
+            resultado["erros"] += len(lote)
+            _log_error(f"Erro SQLite ao gravar lote de {len(lote)} partidas importadas: {e}\n{traceback.format_exc()}", "ganchometro_import_error.txt")
+        if progress_callback: progress_callback(resultado["processadas"])
 
-def buscar_historico_partidas():
-    conn, cursor = conectar_db()
+    lote = []
+    iterador_partidas = iter(partidas)
+    while True:
+        try:
+            partida_data = next(iterador_partidas)
+        except StopIteration:
+            break
+        except (ValueError, OSError, EOFError) as e:
+            resultado["erro_leitura"] = str(e)
+            _log_error(f"Erro ao ler arquivo de importação após {resultado['processadas']} partidas: {e}\n{traceback.format_exc()}", "ganchometro_import_error.txt")
+            break
+        resultado["processadas"] += 1
+        try:
+            partida_normalizada = _normalizar_partida_importada(partida_data, killer_ids, map_ids, item_ids)
+        except Exception as e:
+            _log_error(f"Erro ao importar partida: {e} - Dados: {partida_data}\n{traceback.format_exc()}", "ganchometro_import_error.txt")
+            resultado["erros"] += 1; continue
+        if partida_normalizada is None: resultado["puladas"] += 1; continue
+        lote.append(partida_normalizada)
+        if len(lote) >= tamanho_lote:
+            _gravar(lote); lote = []
+    if lote: _gravar(lote)
+    if resultado["importadas"] > INCREMENTAL_REFRESH_MAX_MATCHES: notificar_partidas_invalidadas()
+    else: notificar_partidas_inseridas(ids_importados)
+    return resultado
+
+_ESPACOS_JSON = re.compile(r'[ \t\n\r]*')
+
+def _iterar_lista_json(f, buffer, tamanho_bloco):
+    decoder = json.JSONDecoder()
+    pos, fim_arquivo = 0, False
+    def _ler_mais():
+        nonlocal buffer, pos, fim_arquivo
+        bloco = f.read(tamanho_bloco)
+        if not bloco: fim_arquivo = True
+        buffer, pos = buffer[pos:] + bloco, 0
+    def _proximo_caractere():
+        nonlocal pos
+        while True:
+            pos = _ESPACOS_JSON.match(buffer, pos).end()
+            if pos < len(buffer): return buffer[pos]
+            if fim_arquivo: return None
+            _ler_mais()
+
+    primeiro = True
+    while True:
+        caractere = _proximo_caractere()
+        if caractere is None: raise ValueError("Arquivo JSON terminou antes do fechamento da lista.")
+        if caractere == ']': return
+        if not primeiro:
+            if caractere != ',': raise ValueError(f"Esperado ',' ou ']' na lista JSON, encontrado {caractere!r}.")
+            pos += 1
+            if _proximo_caractere() is None: raise ValueError("Arquivo JSON terminou antes do fechamento da lista.")
+        primeiro = False
+        while True:
+            try:
+                valor, fim_valor = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fim_arquivo: raise
+                _ler_mais(); continue
+            # Um valor que encosta no fim do buffer pode ter sido cortado no meio (ex.: um número).
+            if fim_valor == len(buffer) and not fim_arquivo:
+                _ler_mais(); continue
+            pos = fim_valor
+            break
+        yield valor
+
+def _abrir_arquivo_dados(filepath, modo, compactado=False):
+    if modo == 'r':
+        with open(filepath, 'rb') as f_bin: compactado = f_bin.read(2) == b'\x1f\x8b'
+    encoding = 'utf-8-sig' if modo == 'r' else 'utf-8'
+    if compactado: return gzip.open(filepath, modo + 't', encoding=encoding)
+    return open(filepath, modo, encoding=encoding)
+
+def iterar_partidas_arquivo(filepath, tamanho_bloco=IMPORT_READ_CHUNK_CHARS):
+    with _abrir_arquivo_dados(filepath, 'r') as f:
+        buffer = f.read(tamanho_bloco)
+        while buffer and not buffer.strip():
+            buffer = f.read(tamanho_bloco)
+        inicio = _ESPACOS_JSON.match(buffer).end()
+        if buffer[inicio:inicio + 1] == '[':
+            yield from _iterar_lista_json(f, buffer[inicio + 1:], tamanho_bloco)
+            return
+        f.seek(0)
+        for numero_linha, linha in enumerate(f, start=1):
+            if not linha.strip(): continue
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Linha {numero_linha} não é um JSON válido: {e}") from e
+
+def formato_exportacao_por_extensao(filepath):
+    nome = filepath.lower()
+    if nome.endswith(".gz"): return "ndjson.gz"
+    if nome.endswith((".ndjson", ".jsonl")): return "ndjson"
+    return "json"
+
+def iterar_partidas_exportacao(tamanho_lote=EXPORT_FETCH_SIZE):
+    with db_leitura() as (conn, cursor):
+        cursor.execute(SQL_EXPORTAR_PARTIDAS)
+        column_names = [desc[0] for desc in cursor.description]
+        while True:
+            linhas = cursor.fetchmany(tamanho_lote)
+            if not linhas: break
+            for row in linhas:
+                match_data = dict(zip(column_names, row))
+                nicks = match_data["teammates_nicks"]
+                match_data["teammates_nicks"] = nicks.split("\x1f") if nicks else []
+                yield match_data
+
+def exportar_partidas(filepath, formato=None):
+    formato = formato or formato_exportacao_por_extensao(filepath)
+    caminho_temporario = filepath + ".tmp"
+    total = 0
+    try:
+        with _abrir_arquivo_dados(caminho_temporario, 'w', compactado=(formato == "ndjson.gz")) as f:
+            if formato == "json":
+                f.write("[")
+                for match_data in iterar_partidas_exportacao():
+                    f.write(",\n" if total else "\n"); f.write(json.dumps(match_data, ensure_ascii=False)); total += 1
+                f.write("\n]\n")
+            else:
+                for match_data in iterar_partidas_exportacao():
+                    f.write(json.dumps(match_data, ensure_ascii=False)); f.write("\n"); total += 1
+        os.replace(caminho_temporario, filepath)
+    except BaseException:
+        if os.path.exists(caminho_temporario): os.remove(caminho_temporario)
+        raise
+    return total
+
+def _pasta_backups():
+    return os.path.join(os.path.dirname(get_db_path()), BACKUP_DIR)
+
+def listar_backups():
+    # Snapshots "<nome do banco>-AAAAMMDD-HHMMSS.db", do mais recente para o mais antigo.
+    prefixo = os.path.splitext(DB_NAME)[0] + "-"
+    pasta = _pasta_backups()
+    if not os.path.isdir(pasta): return []
+    backups = []
+    for entrada in os.scandir(pasta):
+        if not (entrada.is_file() and entrada.name.startswith(prefixo) and entrada.name.endswith(".db")): continue
+        try:
+            momento = datetime.datetime.strptime(entrada.name[len(prefixo):-len(".db")], "%Y%m%d-%H%M%S")
+        except ValueError:
+            continue
+        backups.append((entrada.path, momento))
+    backups.sort(key=lambda backup: backup[1], reverse=True)
+    return backups
+
+def _rotacionar_backups(maximo=BACKUP_MAX_SNAPSHOTS):
+    for caminho, _ in listar_backups()[maximo:]:
+        try:
+            os.remove(caminho)
+            # Snapshots antigos (ainda em WAL) podem ter deixado arquivos auxiliares ao lado.
+            for sufixo in ("-wal", "-shm"):
+                if os.path.exists(caminho + sufixo): os.remove(caminho + sufixo)
+        except OSError as e:
+            _log_error(f"Erro ao remover backup antigo '{caminho}': {e}\n{traceback.format_exc()}", "ganchometro_backup_log.txt")
+
+def criar_backup(progress_callback=None):
+    pasta = _pasta_backups()
+    os.makedirs(pasta, exist_ok=True)
+    momento = datetime.datetime.now().replace(microsecond=0)
+    caminho = os.path.join(pasta, f"{os.path.splitext(DB_NAME)[0]}-{momento.strftime('%Y%m%d-%H%M%S')}.db")
+    while os.path.exists(caminho):
+        momento += datetime.timedelta(seconds=1)
+        caminho = os.path.join(pasta, f"{os.path.splitext(DB_NAME)[0]}-{momento.strftime('%Y%m%d-%H%M%S')}.db")
+    caminho_temporario = caminho + ".tmp"
+    def _progresso(status, restantes, total):
+        if progress_callback: progress_callback((total - restantes, total))
+    inicio = time.perf_counter()
     try:
-        cursor.execute('''
-            SELECT m.id, strftime('%d/%m/%Y %H:%M', m.match_date) AS data_partida, k.name AS assassino, mp.name AS mapa,
-                   iu.name AS item_usado, ig.name AS item_ganho, il.name AS item_perdido,
-                   CASE m.escaped WHEN 1 THEN 'Sim' ELSE 'Não' END AS sobreviveu,
-                   m.survivors_escaped AS qts_escaparam, IFNULL(m.game_mode, 'N/D') AS jogando_como,
-                   (SELECT GROUP_CONCAT(t.nickname, ', ') FROM teammates t JOIN match_teammates mt ON t.id = mt.teammate_id WHERE mt.match_id = m.id) AS companheiros,
-                   CASE m.jhones_sedex WHEN 1 THEN 'Sim' WHEN 0 THEN 'Não' ELSE 'N/D' END AS jhones_sedex_info,
-                   m.notes AS notas_adicionais
-            FROM matches m LEFT JOIN killers k ON m.killer_id = k.id LEFT JOIN maps mp ON m.map_id = mp.id
-            LEFT JOIN items iu ON m.item_used_id = iu.id LEFT JOIN items ig ON m.item_gained_id = ig.id
-            LEFT JOIN items il ON m.item_lost_id = il.id ORDER BY m.match_date DESC
-        ''')
-        return [tuple(row) for row in cursor.fetchall()]
+        if os.path.exists(caminho_temporario): os.remove(caminho_temporario)
+        get_db_manager().copiar_para(caminho_temporario, progress=_progresso)
+        os.replace(caminho_temporario, caminho)
+    except BaseException:
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(caminho_temporario + sufixo): os.remove(caminho_temporario + sufixo)
+        raise
+    _rotacionar_backups()
+    print(f"Backup criado em '{caminho}' ({time.perf_counter() - inicio:.2f}s).")
+    return caminho
+
+def backup_vencido(intervalo_s=BACKUP_INTERVALO_S):
+    backups = listar_backups()
+    return not backups or (datetime.datetime.now() - backups[0][1]).total_seconds() >= intervalo_s
+
+def restaurar_backup(caminho, progress_callback=None):
+    # Antes de sobrescrever, guarda o estado atual como mais um snapshot: a restauração também pode ser desfeita.
+    caminho_seguranca = criar_backup()
+    def _progresso(status, restantes, total):
+        if progress_callback: progress_callback((total - restantes, total))
+    get_db_manager().restaurar_de(caminho, progress=_progresso)
+    # Um snapshot antigo pode estar num schema anterior; as migrações o trazem para a versão atual.
+    aplicar_migracoes()
+    _catalogo_referencia.invalidar()
+    invalidar_cache_estatisticas()
+    notificar_partidas_invalidadas()
+    return caminho_seguranca
+
+def buscar_pagina_historico(antes_de=None, depois_de=None, limite=HISTORY_PAGE_SIZE):
+    try:
+        with db_leitura() as (conn, cursor):
+            if antes_de is not None: cursor.execute(SQL_HISTORICO_MAIS_ANTIGAS, (*antes_de, limite))
+            elif depois_de is not None: cursor.execute(SQL_HISTORICO_MAIS_RECENTES, (*depois_de, limite))
+            else: cursor.execute(SQL_HISTORICO_PRIMEIRA_PAGINA, (limite,))
+            partidas = [tuple(row) for row in cursor.fetchall()]
+        if depois_de is not None: partidas.reverse()
+        return partidas
     except sqlite3.Error as e: 
         print(f"Erro ao buscar histórico: {e}")
-        _log_error(f"Erro SQLite em buscar_historico_partidas: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        _log_error(f"Erro SQLite em buscar_pagina_historico: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
         return []
-    finally: 
-        if conn:
-            conn.close()
 
-def calcular_estatisticas_gerais():
-    conn, cursor = conectar_db()
-    stats = { "total_partidas": 0, "escapes_totais": 0, "taxa_sobrevivencia_geral": 0.0, 
+def buscar_partidas_historico_por_ids(match_ids):
+    if not match_ids: return []
+    try:
+        with db_leitura() as (conn, cursor):
+            cursor.execute(SQL_HISTORICO_PARTIDAS + f"WHERE m.id IN ({','.join('?' * len(match_ids))})", list(match_ids))
+            return [tuple(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Erro ao buscar partidas do histórico: {e}")
+        _log_error(f"Erro SQLite em buscar_partidas_historico_por_ids: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        return []
+
+def _estatisticas_vazias():
+    return { "total_partidas": 0, "escapes_totais": 0, "taxa_sobrevivencia_geral": 0.0, 
               "partidas_por_killer": {}, "sobrevivencia_por_killer": {}, 
               "itens_levados_count": {}, "itens_perdidos_count": {}, 
               "jogos_por_mapa": {}, "partidas_por_modo": {}, "sobrevivencia_por_modo": {}, 
-              "sobrevivencia_com_teammate": {}, 
               "jhones_sedex_sim": 0, "jhones_sedex_nao": 0, "partidas_com_jhones_respondido":0,
               "killer_mais_enfrentado": {"nome": "N/A", "contagem": 0}, 
               "mapa_mais_jogado": {"nome": "N/A", "contagem": 0} 
             }
+
+def _congelar_estatisticas(stats):
+    # Snapshot somente leitura, compartilhado por todos os leitores do cache sem cópia. Quem precisa alterar copia
+    # (dict(stats) para acrescentar chaves, _copiar_estatisticas para mexer nos dicts internos).
+    return MappingProxyType({chave: MappingProxyType(valor) if isinstance(valor, dict) else valor for chave, valor in stats.items()})
+
+def _copiar_estatisticas(stats):
+    return {chave: dict(valor) if isinstance(valor, (dict, MappingProxyType)) else valor for chave, valor in stats.items()}
+
+def calcular_estatisticas_gerais():
+    # Devolve None se a leitura falhar, para o StatsCache não guardar (nem aplicar deltas sobre) um resultado zerado.
+    stats = _estatisticas_vazias()
     try:
-        cursor.execute("SELECT COUNT(*), SUM(escaped) FROM matches"); res = cursor.fetchone()
-        if res: stats["total_partidas"], stats["escapes_totais"] = (res[0] or 0), (res[1] or 0)
-        if stats["total_partidas"] > 0: stats["taxa_sobrevivencia_geral"] = (stats["escapes_totais"] / stats["total_partidas"]) * 100
-        
-        cursor.execute('SELECT k.name, COUNT(m.id) AS count_killer, SUM(m.escaped) FROM matches m JOIN killers k ON m.killer_id = k.id GROUP BY k.name ORDER BY count_killer DESC')
-        killer_details = cursor.fetchall()
-        if killer_details:
-            stats["killer_mais_enfrentado"]["nome"] = killer_details[0]["name"]
-            stats["killer_mais_enfrentado"]["contagem"] = killer_details[0]["count_killer"]
-            for r_killer in killer_details:
-                killer_name = r_killer["name"]
-                count_killer = r_killer["count_killer"] or 0
-                escapes_killer = r_killer["SUM(m.escaped)"] or 0
-                stats["partidas_por_killer"][killer_name] = count_killer
-                stats["sobrevivencia_por_killer"][killer_name] = (escapes_killer / count_killer) * 100 if count_killer > 0 else 0.0
-        
-        cursor.execute("SELECT i.name, COUNT(m.id) FROM matches m JOIN items i ON m.item_used_id = i.id WHERE i.name != 'Nenhum' GROUP BY i.name ORDER BY COUNT(m.id) DESC")
-        for r in cursor.fetchall(): stats["itens_levados_count"][r[0]] = r[1] 
+        with db_leitura() as (conn, cursor):
+            cursor.execute(SQL_STATS_GERAL); res = cursor.fetchone()
+            if res:
+                stats["total_partidas"], stats["escapes_totais"] = (res["total_partidas"] or 0), (res["escapes"] or 0)
+                stats["jhones_sedex_sim"], stats["jhones_sedex_nao"], stats["partidas_com_jhones_respondido"] = (res["jhones_sim"] or 0), (res["jhones_nao"] or 0), (res["jhones_respondidos"] or 0)
+            if stats["total_partidas"] > 0: stats["taxa_sobrevivencia_geral"] = (stats["escapes_totais"] / stats["total_partidas"]) * 100
         
-        cursor.execute("SELECT i.name, COUNT(m.id) FROM matches m JOIN items i ON m.item_lost_id = i.id WHERE i.name != 'Nenhum' GROUP BY i.name ORDER BY COUNT(m.id) DESC")
-        for r in cursor.fetchall(): stats["itens_perdidos_count"][r[0]] = r[1] 
+            cursor.execute(SQL_STATS_POR_KILLER)
+            killer_details = cursor.fetchall()
+            if killer_details:
+                stats["killer_mais_enfrentado"]["nome"] = killer_details[0]["name"]
+                stats["killer_mais_enfrentado"]["contagem"] = killer_details[0]["count_killer"]
+                for r_killer in killer_details:
+                    killer_name = r_killer["name"]
+                    count_killer = r_killer["count_killer"] or 0
+                    escapes_killer = r_killer["escapes_killer"] or 0
+                    stats["partidas_por_killer"][killer_name] = count_killer
+                    stats["sobrevivencia_por_killer"][killer_name] = (escapes_killer / count_killer) * 100 if count_killer > 0 else 0.0
         
-        cursor.execute("SELECT mp.name, COUNT(m.id) AS count_map FROM matches m JOIN maps mp ON m.map_id = mp.id GROUP BY mp.name ORDER BY COUNT(m.id) DESC")
-        map_details = cursor.fetchall()
-        if map_details:
-            stats["mapa_mais_jogado"]["nome"] = map_details[0]["name"]
-            stats["mapa_mais_jogado"]["contagem"] = map_details[0]["count_map"]
-            for r_map in map_details: stats["jogos_por_mapa"][r_map["name"]] = r_map["count_map"]
-
-        cursor.execute("SELECT game_mode, COUNT(id), SUM(escaped) FROM matches WHERE game_mode IS NOT NULL AND game_mode != '' GROUP BY game_mode")
-        for r in cursor.fetchall(): stats["partidas_por_modo"][r[0]], stats["sobrevivencia_por_modo"][r[0]] = r[1] or 0, (((r[2] or 0) / (r[1] or 1)) * 100) 
+            cursor.execute(SQL_STATS_ITENS_LEVADOS)
+            for r in cursor.fetchall(): stats["itens_levados_count"][r[0]] = r[1] 
         
-        cursor.execute('SELECT t.nickname, COUNT(mt.match_id), SUM(m.escaped) FROM teammates t JOIN match_teammates mt ON t.id = mt.teammate_id JOIN matches m ON mt.match_id = m.id GROUP BY t.nickname')
-        for nick, count, esc in cursor.fetchall(): stats["sobrevivencia_com_teammate"][nick] = {"partidas": count, "escapes": esc or 0, "taxa_escape": ((esc or 0) / count) * 100 if count > 0 else 0.0}
+            cursor.execute(SQL_STATS_ITENS_PERDIDOS)
+            for r in cursor.fetchall(): stats["itens_perdidos_count"][r[0]] = r[1] 
         
-        cursor.execute("SELECT SUM(CASE WHEN jhones_sedex = 1 THEN 1 ELSE 0 END), SUM(CASE WHEN jhones_sedex = 0 THEN 1 ELSE 0 END), COUNT(CASE WHEN jhones_sedex IS NOT NULL THEN 1 END) FROM matches")
-        res_jhones = cursor.fetchone()
-        if res_jhones: stats["jhones_sedex_sim"], stats["jhones_sedex_nao"], stats["partidas_com_jhones_respondido"] = (res_jhones[0] or 0), (res_jhones[1] or 0), (res_jhones[2] or 0)
+            cursor.execute(SQL_STATS_POR_MAPA)
+            map_details = cursor.fetchall()
+            if map_details:
+                stats["mapa_mais_jogado"]["nome"] = map_details[0]["name"]
+                stats["mapa_mais_jogado"]["contagem"] = map_details[0]["count_map"]
+                for r_map in map_details: stats["jogos_por_mapa"][r_map["name"]] = r_map["count_map"]
+
+            cursor.execute(SQL_STATS_POR_MODO)
+            for r in cursor.fetchall(): stats["partidas_por_modo"][r[0]], stats["sobrevivencia_por_modo"][r[0]] = r[1] or 0, (((r[2] or 0) / (r[1] or 1)) * 100) 
     except sqlite3.Error as e: 
         print(f"Erro ao calcular estatísticas: {e}")
         _log_error(f"Erro SQLite em calcular_estatisticas_gerais: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
-    finally: 
-        if conn:
-            conn.close()
+        return None
+    return stats
+
+def buscar_ranking_estatisticas(tipo, limite, offset=0, minimo_partidas=STATS_CARDS_MIN_PARTIDAS):
+    # Retorna (linhas, tem_mais) com linhas = [(nome, partidas, taxa_escape)]; busca uma linha extra para saber se há mais.
+    sql = SQL_RANKING_KILLERS if tipo == "killers" else SQL_RANKING_TEAMMATES
+    try:
+        with db_leitura() as (conn, cursor):
+            cursor.execute(sql, (minimo_partidas, limite + 1, offset))
+            rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Erro ao buscar ranking de {tipo}: {e}")
+        _log_error(f"Erro SQLite em buscar_ranking_estatisticas ({tipo}): {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        return [], False
+    linhas = [(nome, partidas, ((escapes or 0) / partidas) * 100 if partidas else 0.0) for nome, partidas, escapes in rows[:limite]]
+    return linhas, len(rows) > limite
+
+def buscar_top_taxa_teammates(limite=GRAFICO_TEAMMATES_TOP, minimo_partidas=STATS_CARDS_MIN_PARTIDAS):
+    # [(nick, taxa_escape)] dos companheiros com maior taxa; consulta própria, fora do cache de estatísticas.
+    try:
+        with db_leitura() as (conn, cursor):
+            cursor.execute(SQL_TOP_TAXA_TEAMMATES, (minimo_partidas, limite))
+            rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        print(f"Erro ao buscar taxa de escape com companheiros: {e}")
+        _log_error(f"Erro SQLite em buscar_top_taxa_teammates: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        return []
+    return [(nome, ((escapes or 0) / partidas) * 100) for nome, partidas, escapes in rows]
+
+def obter_estatisticas_para_graficos():
+    stats = dict(obter_estatisticas())
+    stats["top_taxa_teammates"] = buscar_top_taxa_teammates()
+    return stats
+
+def obter_estatisticas_com_rankings(limite_killers, limite_teammates):
+    stats = dict(obter_estatisticas())
+    stats["ranking_killers"] = buscar_ranking_estatisticas("killers", limite_killers)
+    stats["ranking_teammates"] = buscar_ranking_estatisticas("teammates", limite_teammates)
+    return stats
+
+def _atualizar_estatisticas_com_partidas(stats, match_ids):
+    # Relê só as linhas de rollup tocadas pelas partidas novas e as aplica sobre uma cópia das estatísticas em cache.
+    stats = _copiar_estatisticas(stats)
+    marcadores = ",".join("?" * len(match_ids))
+    partidas_novas = f"(SELECT {{coluna}} FROM matches WHERE id IN ({marcadores}))"
+    with db_leitura() as (conn, cursor):
+        cursor.execute(SQL_STATS_GERAL); res = cursor.fetchone()
+        stats["total_partidas"], stats["escapes_totais"] = (res["total_partidas"] or 0), (res["escapes"] or 0)
+        stats["jhones_sedex_sim"], stats["jhones_sedex_nao"], stats["partidas_com_jhones_respondido"] = (res["jhones_sim"] or 0), (res["jhones_nao"] or 0), (res["jhones_respondidos"] or 0)
+        stats["taxa_sobrevivencia_geral"] = (stats["escapes_totais"] / stats["total_partidas"]) * 100 if stats["total_partidas"] > 0 else 0.0
+
+        cursor.execute(f"SELECT k.name, sk.partidas, sk.escapes FROM stats_killer sk JOIN killers k ON k.id = sk.killer_id WHERE sk.killer_id IN {partidas_novas.format(coluna='killer_id')}", match_ids)
+        for killer_name, count_killer, escapes_killer in cursor.fetchall():
+            if count_killer > 0:
+                stats["partidas_por_killer"][killer_name] = count_killer
+                stats["sobrevivencia_por_killer"][killer_name] = ((escapes_killer or 0) / count_killer) * 100
+            else:
+                stats["partidas_por_killer"].pop(killer_name, None); stats["sobrevivencia_por_killer"].pop(killer_name, None)
+        for tabela, coluna, chave_stats in (("stats_item_usado", "item_used_id", "itens_levados_count"), ("stats_item_perdido", "item_lost_id", "itens_perdidos_count")):
+            cursor.execute(f"SELECT i.name, si.partidas FROM {tabela} si JOIN items i ON i.id = si.item_id WHERE i.name != 'Nenhum' AND si.item_id IN {partidas_novas.format(coluna=coluna)}", match_ids)
+            for item_name, count_item in cursor.fetchall():
+                if count_item > 0: stats[chave_stats][item_name] = count_item
+                else: stats[chave_stats].pop(item_name, None)
+        cursor.execute(f"SELECT mp.name, sm.partidas FROM stats_map sm JOIN maps mp ON mp.id = sm.map_id WHERE sm.map_id IN {partidas_novas.format(coluna='map_id')}", match_ids)
+        for map_name, count_map in cursor.fetchall():
+            if count_map > 0: stats["jogos_por_mapa"][map_name] = count_map
+            else: stats["jogos_por_mapa"].pop(map_name, None)
+        cursor.execute(f"SELECT game_mode, partidas, escapes FROM stats_modo WHERE game_mode IN {partidas_novas.format(coluna='game_mode')}", match_ids)
+        for mode, count_mode, escapes_mode in cursor.fetchall():
+            if count_mode > 0:
+                stats["partidas_por_modo"][mode], stats["sobrevivencia_por_modo"][mode] = count_mode, ((escapes_mode or 0) / count_mode) * 100
+            else:
+                stats["partidas_por_modo"].pop(mode, None); stats["sobrevivencia_por_modo"].pop(mode, None)
+
+    for chave_destaque, chave_contagens in (("killer_mais_enfrentado", "partidas_por_killer"), ("mapa_mais_jogado", "jogos_por_mapa")):
+        contagens = stats[chave_contagens]
+        if contagens:
+            nome = max(contagens, key=contagens.get)
+            stats[chave_destaque] = {"nome": nome, "contagem": contagens[nome]}
+        else:
+            stats[chave_destaque] = {"nome": "N/A", "contagem": 0}
     return stats
 
+class StatsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = None
+        self._version = None
+        self._generation = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def get(self):
+        with self._lock:
+            generation = self._generation
+        version = (generation,) + get_db_manager().data_version()
+        with self._lock:
+            if self._stats is not None and self._version == version:
+                return self._stats
+        stats = calcular_estatisticas_gerais()
+        if stats is None: return None
+        stats = _congelar_estatisticas(stats)
+        with self._lock:
+            self._stats, self._version = stats, version
+        return stats
+
+    def apply_new_matches(self, match_ids):
+        if match_ids is None:
+            self.invalidate(); return
+        with self._lock:
+            stats, version, generation = self._stats, self._version, self._generation
+        if stats is None: return
+        current_version = (generation,) + get_db_manager().data_version()
+        # O delta só vale se nada além das nossas próprias escritas mudou desde o cálculo: mesma geração e mesmo
+        # PRAGMA data_version (que só muda com commits de outras conexões). Caso contrário, recalcula tudo.
+        if version[0] != generation or version[2] != current_version[2]:
+            self.invalidate(); return
+        stats = _congelar_estatisticas(_atualizar_estatisticas_com_partidas(stats, match_ids))
+        with self._lock:
+            if self._version == version and self._generation == generation:
+                self._stats, self._version = stats, current_version
+
+
+_stats_cache = StatsCache()
+
+class MatchChangeNotifier:
+    def __init__(self, max_incremental=INCREMENTAL_REFRESH_MAX_MATCHES):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._max_incremental = max_incremental
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers: self._subscribers.remove(callback)
+
+    def publish_inserted(self, match_ids):
+        match_ids = list(match_ids)
+        if not match_ids: return
+        # Lotes grandes (importações) não compensam atualização incremental: viram invalidação completa.
+        self._notify(match_ids if len(match_ids) <= self._max_incremental else None)
+
+    def publish_invalidated(self):
+        self._notify(None)
+
+    def _notify(self, match_ids):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(match_ids)
+            except Exception as e:
+                print(f"Erro ao notificar alteração de partidas: {e}")
+                _log_error(f"Erro em MatchChangeNotifier._notify ({callback}): {e}\n{traceback.format_exc()}", "ganchometro_ui_errors.txt")
+
+
+_notificador_partidas = MatchChangeNotifier()
+_notificador_partidas.subscribe(_stats_cache.apply_new_matches)
+_notificador_partidas.subscribe(_indice_teammates.aplicar_partidas_novas)
+
+def obter_estatisticas():
+    # Sempre um snapshot somente leitura (ver _congelar_estatisticas). Numa falha a interface recebe estatísticas
+    # zeradas, mas nada fica em cache: a próxima chamada tenta de novo.
+    try:
+        stats = _stats_cache.get()
+    except sqlite3.Error as e:
+        print(f"Erro ao verificar versão do banco de dados: {e}")
+        _log_error(f"Erro SQLite em obter_estatisticas: {e}\n{traceback.format_exc()}", "ganchometro_sqlite_errors.txt")
+        stats = calcular_estatisticas_gerais()
+        if stats is not None: stats = _congelar_estatisticas(stats)
+    return stats if stats is not None else _congelar_estatisticas(_estatisticas_vazias())
+
+def invalidar_cache_estatisticas():
+    _stats_cache.invalidate()
+
+def notificar_partidas_inseridas(match_ids):
+    _notificador_partidas.publish_inserted(match_ids)
+
+def notificar_partidas_invalidadas():
+    _notificador_partidas.publish_invalidated()
+
+_matplotlib_modulos = None
+
+def _importar_matplotlib():
+    # O matplotlib (e o backend TkAgg) só é carregado quando a visão de gráficos é aberta pela primeira vez.
+    global _matplotlib_modulos
+    if _matplotlib_modulos is None:
+        inicio = time.perf_counter()
+        import matplotlib
+        matplotlib.use('TkAgg')
+        import matplotlib.style
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.ticker import MaxNLocator
+        _matplotlib_modulos = (matplotlib, Figure, FigureCanvasTkAgg, MaxNLocator)
+        print(f"matplotlib carregado em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return _matplotlib_modulos
+
+ABAS_GRAFICOS = ("Por Assassino", "Por 'Jogando'", "Mapas mais jogados", "Itens Mais Levados", "Itens Mais Perdidos", "Sobrev. c/ Companheiros", "Jhones Sedex")
+
+def _especificacao_barras_contagem(dados, titulo, cor_barra, top_n=5):
+    dados = dados[:top_n]
+    if not dados: return {"mensagem": "Sem dados suficientes para este gráfico."}
+    return {"tipo": "barras_h", "titulo": titulo, "rotulos": [item[0] for item in dados], "valores": [item[1] for item in dados],
+            "cor": cor_barra, "rotulo_eixo": "Contagem", "limite": None, "anotacoes": [f"{item[1]}" for item in dados], "deslocamento_anotacao": 0.1}
+
+def _especificacoes_graficos(stats):
+    # Descreve cada gráfico só com dados (tipo, rótulos, valores, cores); quem desenha é o renderizador.
+    especificacoes = {}
+
+    if stats["partidas_por_killer"]:
+        killers_top = [item[0] for item in sorted(stats["partidas_por_killer"].items(), key=lambda item: item[1], reverse=True)[:10]]
+        taxas = [stats["sobrevivencia_por_killer"].get(k, 0) for k in killers_top]
+        especificacoes["Por Assassino"] = {"tipo": "barras_v", "titulo": "Top Assassinos vs Taxa de Sobrevivência", "rotulos": killers_top, "valores": taxas,
+                                           "cor": COLOR_SECONDARY_RED, "rotulo_eixo": "Taxa de Sobrevivência (%)", "limite": 100,
+                                           "anotacoes": [f"{stats['partidas_por_killer'].get(k, 0)}p\n{taxa:.0f}%" for k, taxa in zip(killers_top, taxas)]}
+    else:
+        especificacoes["Por Assassino"] = {"mensagem": "Sem dados de partidas por assassino."}
+
+    if stats["partidas_por_modo"]:
+        modos = [modo for modo in GAME_MODES if stats["partidas_por_modo"].get(modo, 0) > 0]
+        if modos:
+            especificacoes["Por 'Jogando'"] = {"tipo": "pizza", "titulo": "Distribuição de Partidas por 'Jogando'", "rotulos": modos,
+                                               "valores": [stats["partidas_por_modo"][modo] for modo in modos],
+                                               "cores": [COLOR_SECONDARY_RED, "#5A0000", "#C04000", "#777777"][:len(modos)]}
+        else:
+            especificacoes["Por 'Jogando'"] = {"mensagem": "Sem dados suficientes (modos com 0 partidas não são exibidos)."}
+    else:
+        especificacoes["Por 'Jogando'"] = {"mensagem": "Sem dados de partidas por modo de jogo."}
+
+    especificacoes["Mapas mais jogados"] = _especificacao_barras_contagem(sorted(stats["jogos_por_mapa"].items(), key=lambda item: item[1], reverse=True), "Top Mapas Mais Jogados", COLOR_PROGRESS_GREEN)
+    especificacoes["Itens Mais Levados"] = _especificacao_barras_contagem(sorted(stats["itens_levados_count"].items(), key=lambda item: item[1], reverse=True), "Top Itens Mais Levados", COLOR_PROGRESS_ORANGE)
+    especificacoes["Itens Mais Perdidos"] = _especificacao_barras_contagem(sorted(stats["itens_perdidos_count"].items(), key=lambda item: item[1], reverse=True), "Top Itens Mais Perdidos", COLOR_PROGRESS_RED_BAR)
+
+    dados_companheiros = stats.get("top_taxa_teammates", [])
+    if dados_companheiros:
+        especificacoes["Sobrev. c/ Companheiros"] = {"tipo": "barras_h", "titulo": "Taxa de Escape com Companheiros", "rotulos": [item[0] for item in dados_companheiros],
+                                                     "valores": [item[1] for item in dados_companheiros], "cor": COLOR_PROGRESS_GREEN, "rotulo_eixo": "Taxa de Escape (%)",
+                                                     "limite": 100, "anotacoes": [f"{item[1]:.1f}%" for item in dados_companheiros], "deslocamento_anotacao": 1}
+    else:
+        especificacoes["Sobrev. c/ Companheiros"] = {"mensagem": "Sem dados de partidas com companheiros."}
+
+    if stats["partidas_com_jhones_respondido"] > 0:
+        if stats["jhones_sedex_sim"] > 0 or stats["jhones_sedex_nao"] > 0:
+            especificacoes["Jhones Sedex"] = {"tipo": "pizza", "titulo": "Jhones deu Sedex?", "rotulos": ["Sim", "Não"],
+                                              "valores": [stats["jhones_sedex_sim"], stats["jhones_sedex_nao"]], "cores": [COLOR_PROGRESS_GREEN, COLOR_PROGRESS_RED_BAR]}
+        else:
+            especificacoes["Jhones Sedex"] = {"mensagem": "Sem dados de 'Sim' ou 'Não' para o Jhones Sedex."}
+    else:
+        especificacoes["Jhones Sedex"] = {"mensagem": "Nenhuma partida com informação 'Jhones Sedex' registrada."}
+    return especificacoes
+
+def _passo_escala_inteira(maximo, divisoes=5):
+    if maximo <= 0: return 1
+    bruto = maximo / divisoes
+    magnitude = 10 ** int(math.floor(math.log10(bruto))) if bruto >= 1 else 1
+    for fator in (1, 2, 5, 10):
+        if bruto <= fator * magnitude: return max(1, fator * magnitude)
+    return max(1, 10 * magnitude)
+
+class TkCanvasChartRenderer:
+    # Desenha barras e pizzas direto num Canvas do Tk, sem matplotlib. Cada aba tem um Canvas persistente; a
+    # especificação atual fica guardada e é redesenhada quando o Canvas muda de tamanho.
+    FONTE = ("Arial", 9)
+    FONTE_PEQUENA = ("Arial", 8)
+    FONTE_TITULO = ("Arial", 12)
+    MARGEM = 12
+    ALTURA_TITULO = 30
+
+    def criar(self, master):
+        canvas = Canvas(master, bg=COLOR_BACKGROUND, highlightthickness=0, width=700, height=500)
+        grafico = {"canvas": canvas, "widget": canvas, "spec": None}
+        canvas.bind("<Configure>", lambda event: self._redesenhar(grafico))
+        return grafico
+
+    def desenhar(self, grafico, spec):
+        grafico["spec"] = spec
+        self._redesenhar(grafico)
+
+    def _redesenhar(self, grafico):
+        canvas, spec = grafico["canvas"], grafico["spec"]
+        largura, altura = canvas.winfo_width(), canvas.winfo_height()
+        if spec is None or largura <= 1 or altura <= 1: return
+        canvas.delete("all")
+        canvas.create_text(largura / 2, self.MARGEM + self.ALTURA_TITULO / 2, text=spec["titulo"], fill=COLOR_TEXT, font=self.FONTE_TITULO)
+        area = (self.MARGEM, self.MARGEM + self.ALTURA_TITULO, largura - self.MARGEM, altura - self.MARGEM)
+        if spec["tipo"] == "pizza": self._desenhar_pizza(canvas, spec, area)
+        elif spec["tipo"] == "barras_h": self._desenhar_barras_horizontais(canvas, spec, area)
+        else: self._desenhar_barras_verticais(canvas, spec, area)
+
+    def _largura_texto(self, canvas, texto, fonte, angulo=0):
+        item = canvas.create_text(0, 0, text=texto, font=fonte, angle=angulo, anchor="nw")
+        x0, y0, x1, y1 = canvas.bbox(item)
+        canvas.delete(item)
+        return x1 - x0, y1 - y0
+
+    def _escala(self, spec):
+        maximo = spec["limite"] or max(spec["valores"]) * 1.05
+        return maximo or 1, (20 if spec["limite"] else _passo_escala_inteira(maximo))
+
+    def _desenhar_barras_horizontais(self, canvas, spec, area):
+        x0, y0, x1, y1 = area
+        largura_rotulos = max(self._largura_texto(canvas, rotulo, self.FONTE)[0] for rotulo in spec["rotulos"])
+        largura_anotacao = max(self._largura_texto(canvas, anotacao, self.FONTE_PEQUENA)[0] for anotacao in spec["anotacoes"])
+        x0 += largura_rotulos + 8; x1 -= largura_anotacao + 6; y1 -= 36
+        maximo, passo = self._escala(spec)
+        canvas.create_rectangle(x0, y0, x1, y1, fill=COLOR_FRAME_BG, outline=COLOR_TEXT_SUBTLE)
+        valor_marca = passo
+        while valor_marca < maximo:
+            x = x0 + (x1 - x0) * valor_marca / maximo
+            canvas.create_line(x, y1, x, y1 + 4, fill=COLOR_TEXT)
+            canvas.create_text(x, y1 + 6, text=f"{valor_marca:g}", fill=COLOR_TEXT, font=self.FONTE, anchor="n")
+            valor_marca += passo
+        canvas.create_text((x0 + x1) / 2, y1 + 24, text=spec["rotulo_eixo"], fill=COLOR_TEXT, font=("Arial", 10), anchor="n")
+        altura_linha = (y1 - y0) / len(spec["valores"])
+        for indice, (rotulo, valor, anotacao) in enumerate(zip(spec["rotulos"], spec["valores"], spec["anotacoes"])):
+            centro = y0 + altura_linha * (indice + 0.5)
+            fim = x0 + (x1 - x0) * min(valor, maximo) / maximo
+            canvas.create_rectangle(x0, centro - altura_linha * 0.4, fim, centro + altura_linha * 0.4, fill=spec["cor"], outline=COLOR_TEXT)
+            canvas.create_text(x0 - 6, centro, text=rotulo, fill=COLOR_TEXT, font=self.FONTE, anchor="e")
+            canvas.create_text(fim + 4, centro, text=anotacao, fill=COLOR_TEXT, font=self.FONTE_PEQUENA, anchor="w")
+
+    def _desenhar_barras_verticais(self, canvas, spec, area):
+        x0, y0, x1, y1 = area
+        altura_rotulos = max(self._largura_texto(canvas, rotulo, self.FONTE, angulo=45)[1] for rotulo in spec["rotulos"])
+        x0 += 44; y1 -= altura_rotulos + 8
+        maximo, passo = self._escala(spec)
+        canvas.create_rectangle(x0, y0, x1, y1, fill=COLOR_FRAME_BG, outline=COLOR_TEXT_SUBTLE)
+        canvas.create_text(self.MARGEM, (y0 + y1) / 2, text=spec["rotulo_eixo"], fill=COLOR_TEXT, font=("Arial", 10), angle=90, anchor="n")
+        valor_marca = passo
+        while valor_marca < maximo:
+            y = y1 - (y1 - y0) * valor_marca / maximo
+            canvas.create_line(x0 - 4, y, x0, y, fill=COLOR_TEXT)
+            canvas.create_text(x0 - 6, y, text=f"{valor_marca:g}", fill=COLOR_TEXT, font=self.FONTE, anchor="e")
+            valor_marca += passo
+        largura_coluna = (x1 - x0) / len(spec["valores"])
+        for indice, (rotulo, valor, anotacao) in enumerate(zip(spec["rotulos"], spec["valores"], spec["anotacoes"])):
+            centro = x0 + largura_coluna * (indice + 0.5)
+            topo = y1 - (y1 - y0) * min(valor, maximo) / maximo
+            canvas.create_rectangle(centro - largura_coluna * 0.3, topo, centro + largura_coluna * 0.3, y1, fill=spec["cor"], outline=COLOR_TEXT)
+            canvas.create_text(centro, y1 + 4, text=rotulo, fill=COLOR_TEXT, font=self.FONTE, angle=45, anchor="ne")
+            if valor > 20:
+                canvas.create_text(centro, (topo + y1) / 2, text=anotacao, fill="white", font=("Arial", 7, "bold"), justify="center")
+            else:
+                canvas.create_text(centro, topo - 3, text=anotacao, fill=COLOR_TEXT, font=("Arial", 7, "bold"), justify="center", anchor="s")
+
+    def _desenhar_pizza(self, canvas, spec, area):
+        x0, y0, x1, y1 = area
+        raio = max(10, min(x1 - x0, y1 - y0) / 2 - 40)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        total = sum(spec["valores"])
+        if not total: return
+        angulo = 90.0
+        for rotulo, valor, cor in zip(spec["rotulos"], spec["valores"], spec["cores"]):
+            extensao = 360.0 * valor / total
+            if extensao >= 359.99: canvas.create_oval(cx - raio, cy - raio, cx + raio, cy + raio, fill=cor, outline=COLOR_BACKGROUND)
+            elif extensao > 0: canvas.create_arc(cx - raio, cy - raio, cx + raio, cy + raio, start=angulo, extent=extensao, fill=cor, outline=COLOR_BACKGROUND)
+            meio = math.radians(angulo + extensao / 2)
+            # No Canvas o eixo y cresce para baixo, por isso o seno entra negativo.
+            canvas.create_text(cx + math.cos(meio) * raio * 0.6, cy - math.sin(meio) * raio * 0.6, text=f"{100.0 * valor / total:.1f}%", fill="white", font=("Arial", 9, "bold"))
+            canvas.create_text(cx + math.cos(meio) * raio * 1.1, cy - math.sin(meio) * raio * 1.1, text=rotulo, fill=COLOR_TEXT, font=("Arial", 10, "bold"),
+                               anchor="w" if math.cos(meio) >= 0 else "e")
+            angulo += extensao
+
+class MatplotlibChartRenderer:
+    # Uma Figure e um FigureCanvasTkAgg por aba, criados uma vez. Quando a quantidade de barras não muda, os artistas
+    # existentes são atualizados no lugar; caso contrário só o eixo é repovoado. O redesenho é sempre via draw_idle.
+    def __init__(self):
+        self._matplotlib, self._Figure, self._FigureCanvasTkAgg, self._MaxNLocator = _importar_matplotlib()
+
+    def criar(self, master):
+        with self._matplotlib.style.context('dark_background'):
+            figura = self._Figure(figsize=(7, 5))
+            figura.patch.set_facecolor(COLOR_BACKGROUND)
+            eixo = figura.add_subplot(111)
+        canvas = self._FigureCanvasTkAgg(figura, master=master)
+        return {"figura": figura, "eixo": eixo, "canvas": canvas, "widget": canvas.get_tk_widget(), "forma": None, "barras": [], "textos": []}
+
+    def desenhar(self, grafico, spec):
+        forma = (spec["tipo"], len(spec["valores"]))
+        with self._matplotlib.style.context('dark_background'):
+            if forma == grafico["forma"] and spec["tipo"] != "pizza":
+                self._atualizar_barras(grafico, spec)
+            else:
+                grafico["eixo"].clear()
+                if spec["tipo"] == "pizza": self._desenhar_pizza(grafico, spec)
+                else: self._desenhar_barras(grafico, spec)
+                grafico["figura"].tight_layout(pad=2.0 if spec["tipo"] == "barras_v" else 1.5)
+        grafico["forma"] = forma
+        grafico["canvas"].draw_idle()
+
+    def _posicao_anotacao(self, spec, indice, barra):
+        valor = spec["valores"][indice]
+        if spec["tipo"] == "barras_h":
+            return (valor + spec["deslocamento_anotacao"], barra.get_y() + barra.get_height() / 2), COLOR_TEXT, "center"
+        if valor > 20: return (barra.get_x() + barra.get_width() / 2.0, valor / 2), "white", "center"
+        return (barra.get_x() + barra.get_width() / 2.0, valor + 3), COLOR_TEXT, "bottom"
+
+    def _desenhar_barras(self, grafico, spec):
+        eixo = grafico["eixo"]; posicoes = range(len(spec["valores"]))
+        if spec["tipo"] == "barras_h":
+            grafico["barras"] = list(eixo.barh(posicoes, spec["valores"], color=spec["cor"], edgecolor=COLOR_TEXT))
+            eixo.set_xlabel(spec["rotulo_eixo"], color=COLOR_TEXT, fontsize=10)
+            eixo.xaxis.set_major_locator(self._MaxNLocator(integer=True, nbins=5, prune='both'))
+            eixo.invert_yaxis()
+        else:
+            grafico["barras"] = list(eixo.bar(posicoes, spec["valores"], color=spec["cor"], edgecolor=COLOR_TEXT, width=0.6))
+            eixo.set_ylabel(spec["rotulo_eixo"], color=COLOR_TEXT, fontsize=10)
+            eixo.yaxis.set_major_locator(self._MaxNLocator(integer=True, nbins=5, prune='both'))
+        eixo.tick_params(axis='x', colors=COLOR_TEXT, labelsize=9)
+        eixo.tick_params(axis='y', colors=COLOR_TEXT, labelsize=9)
+        eixo.set_facecolor(COLOR_FRAME_BG)
+        grafico["textos"] = []
+        for indice, barra in enumerate(grafico["barras"]):
+            posicao, cor, va = self._posicao_anotacao(spec, indice, barra)
+            if spec["tipo"] == "barras_h":
+                texto = eixo.text(*posicao, spec["anotacoes"][indice], ha='left', va=va, color=cor, fontsize=8)
+            else:
+                texto = eixo.text(*posicao, spec["anotacoes"][indice], ha='center', va=va, fontsize=7, color=cor, weight='bold')
+            grafico["textos"].append(texto)
+        self._aplicar_rotulos_e_limites(grafico, spec)
+
+    def _atualizar_barras(self, grafico, spec):
+        for indice, (barra, texto) in enumerate(zip(grafico["barras"], grafico["textos"])):
+            if spec["tipo"] == "barras_h": barra.set_width(spec["valores"][indice])
+            else: barra.set_height(spec["valores"][indice])
+            posicao, cor, va = self._posicao_anotacao(spec, indice, barra)
+            texto.set_position(posicao); texto.set_color(cor); texto.set_va(va); texto.set_text(spec["anotacoes"][indice])
+        self._aplicar_rotulos_e_limites(grafico, spec)
+
+    def _aplicar_rotulos_e_limites(self, grafico, spec):
+        eixo = grafico["eixo"]; posicoes = range(len(spec["valores"]))
+        eixo.set_title(spec["titulo"], color=COLOR_TEXT, fontsize=12)
+        if spec["tipo"] == "barras_h":
+            eixo.set_yticks(posicoes, labels=spec["rotulos"])
+            if spec["limite"]: eixo.set_xlim(0, spec["limite"])
+            else: eixo.relim(); eixo.autoscale_view(scaley=False)
+        else:
+            eixo.set_xticks(posicoes, labels=spec["rotulos"], rotation=45, ha="right", color=COLOR_TEXT, fontsize=9)
+            eixo.set_ylim(0, spec["limite"])
+
+    def _desenhar_pizza(self, grafico, spec):
+        eixo = grafico["eixo"]
+        grafico["barras"], grafico["textos"] = [], []
+        _, _, autotexts = eixo.pie(spec["valores"], labels=spec["rotulos"], autopct='%1.1f%%', startangle=90, colors=spec["cores"], textprops={'color': COLOR_TEXT, 'fontsize': 10, 'weight': 'bold'})
+        for autotext in autotexts: autotext.set_color('white'); autotext.set_fontsize(9)
+        eixo.axis('equal'); eixo.set_title(spec["titulo"], color=COLOR_TEXT, fontsize=12)
+
+CHART_BACKENDS = {"Simples": TkCanvasChartRenderer, "Matplotlib": MatplotlibChartRenderer}
+CHART_BACKEND_PADRAO = "Simples"
+
 def _formatar_contagem_vezes(contagem):
     return "vez" if contagem == 1 else "vezes"
 
+def _resolver_caminho_imagem(base_dir, filename_or_basename, is_killer_portrait=False, base_folder_override=None):
+    actual_base_folder = base_folder_override if base_folder_override else (KILLER_PORTRAITS_PATH if is_killer_portrait else IMAGE_ASSETS_PATH)
+    full_base_path = os.path.join(base_dir, actual_base_folder)
+    name_part, ext_part = os.path.splitext(filename_or_basename)
+    cleaned_name_part = name_part.replace(":", "") 
+    if is_killer_portrait or not ext_part: 
+        potential_files_to_check = [cleaned_name_part + ".png", cleaned_name_part + ".jpg", cleaned_name_part + ".jpeg"]
+    else: 
+        potential_files_to_check = [filename_or_basename]
+    for fname_to_check in potential_files_to_check:
+        p_path = os.path.join(full_base_path, fname_to_check)
+        if os.path.exists(p_path): return p_path
+    return None
+
+def _redimensionar_imagem(pil_image, target_size_or_height):
+    if isinstance(target_size_or_height, int):
+        original_width, original_height = pil_image.size
+        if original_height == 0: return None
+        new_width = int(target_size_or_height * (original_width / original_height))
+        return pil_image.resize((new_width, target_size_or_height), Image.Resampling.LANCZOS)
+    return pil_image.resize(tuple(target_size_or_height), Image.Resampling.LANCZOS)
+
+def _chave_pacote_assets(filename_or_basename, target_size_or_height, is_killer_portrait=False, base_folder_override=None):
+    pasta = base_folder_override if base_folder_override else (KILLER_PORTRAITS_PATH if is_killer_portrait else IMAGE_ASSETS_PATH)
+    pasta = pasta.replace(os.sep, "/").strip("/")
+    nome = os.path.splitext(filename_or_basename)[0].replace(":", "")
+    tamanho = f"h{target_size_or_height}" if isinstance(target_size_or_height, int) else "x".join(str(v) for v in target_size_or_height)
+    return f"{pasta}/{nome}|{tamanho}"
+
+class AssetPack:
+    # Formato: ASSET_PACK_MAGIC, tamanho do índice (uint32 little-endian), índice JSON
+    # {chave: [offset, largura, altura, origem relativa, tamanho da origem, mtime_ns da origem]} e os pixels RGBA já
+    # redimensionados, lidos via mmap sem tocar na pasta de assets. Com base_dir, entradas cuja imagem original mudou
+    # desde a geração do pacote são ignoradas (e carregadas da origem); um formato antigo muda a assinatura.
+    def __init__(self, caminho, base_dir=None):
+        self.caminho = caminho
+        with open(caminho, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            cabecalho = len(ASSET_PACK_MAGIC) + 4
+            if self._mmap[:len(ASSET_PACK_MAGIC)] != ASSET_PACK_MAGIC:
+                raise ValueError("assinatura inválida")
+            (tamanho_indice,) = struct.unpack("<I", self._mmap[len(ASSET_PACK_MAGIC):cabecalho])
+            self._indice = json.loads(self._mmap[cabecalho:cabecalho + tamanho_indice].decode("utf-8"))
+            if base_dir is not None: self._descartar_desatualizadas(base_dir)
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _descartar_desatualizadas(self, base_dir):
+        # Só stat, sem ler as imagens. Origem ausente mantém a entrada (o pacote pode ser distribuído sem os originais).
+        # No .exe onefile os assets são extraídos de novo a cada abertura com mtime novo, então ali só o tamanho conta;
+        # de qualquer forma, pacote e imagens saem do mesmo build.
+        comparar_mtime = not hasattr(sys, '_MEIPASS')
+        situacao_origens = {}
+        desatualizadas = []
+        for chave, (_, _, _, origem, tamanho, mtime_ns) in self._indice.items():
+            if origem not in situacao_origens:
+                try:
+                    st = os.stat(os.path.join(base_dir, origem))
+                    situacao_origens[origem] = st.st_size == tamanho and (not comparar_mtime or st.st_mtime_ns == mtime_ns)
+                except OSError:
+                    situacao_origens[origem] = True
+            if not situacao_origens[origem]: desatualizadas.append(chave)
+        for chave in desatualizadas: del self._indice[chave]
+        if desatualizadas:
+            print(f"Pacote de assets: {len(desatualizadas)} imagens desatualizadas serão carregadas dos originais "
+                  f"(gere de novo com --build-asset-pack).")
+
+    @classmethod
+    def abrir(cls, caminho, base_dir=None):
+        if not os.path.isfile(caminho): return None
+        try:
+            return cls(caminho, base_dir)
+        except (OSError, ValueError, TypeError, struct.error) as e:
+            print(f"Pacote de assets ignorado ('{caminho}'): {e}")
+            _log_error(f"Pacote de assets inválido '{caminho}': {e}\n{traceback.format_exc()}", "ganchometro_image_errors.txt")
+            return None
+
+    def __contains__(self, chave):
+        return chave in self._indice
+
+    def obter(self, chave):
+        entrada = self._indice.get(chave)
+        if entrada is None: return None
+        offset, largura, altura = entrada[:3]
+        return Image.frombytes("RGBA", (largura, altura), self._mmap[offset:offset + largura * altura * 4])
+
+def construir_pacote_assets(base_dir, destino=None):
+    destino = destino or os.path.join(base_dir, ASSET_PACK_FILENAME)
+    trabalhos = []
+    pasta_retratos = os.path.join(base_dir, KILLER_PORTRAITS_PATH)
+    if os.path.isdir(pasta_retratos):
+        for entrada in sorted(os.scandir(pasta_retratos), key=lambda e: e.name):
+            if entrada.is_file() and entrada.name.lower().endswith((".png", ".jpg", ".jpeg")):
+                for tamanho in (PORTRAIT_SIZE_BUTTON_KILLER, PORTRAIT_SIZE_STATS):
+                    trabalhos.append((entrada.path, _chave_pacote_assets(entrada.name, tamanho, is_killer_portrait=True), tamanho))
+    caminho_logo = _resolver_caminho_imagem(base_dir, LOGO_FILENAME)
+    if caminho_logo: trabalhos.append((caminho_logo, _chave_pacote_assets(LOGO_FILENAME, LOGO_TARGET_HEIGHT), LOGO_TARGET_HEIGHT))
+
+    indice, blocos, offset_relativo = {}, [], 0
+    for src_path, chave, tamanho in trabalhos:
+        st = os.stat(src_path)
+        with Image.open(src_path) as pil_image:
+            miniatura = _redimensionar_imagem(pil_image, tamanho)
+        if miniatura is None: continue
+        pixels = miniatura.convert("RGBA").tobytes()
+        origem = os.path.relpath(src_path, base_dir).replace(os.sep, "/")
+        indice[chave] = [offset_relativo, miniatura.width, miniatura.height, origem, st.st_size, st.st_mtime_ns]
+        blocos.append(pixels); offset_relativo += len(pixels)
+
+    # Os offsets no índice são absolutos; como o tamanho do índice depende deles, ajusta até estabilizar.
+    inicio_dados = 0
+    while True:
+        indice_absoluto = {chave: [offset + inicio_dados, *resto] for chave, (offset, *resto) in indice.items()}
+        indice_bytes = json.dumps(indice_absoluto, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        novo_inicio = len(ASSET_PACK_MAGIC) + 4 + len(indice_bytes)
+        if novo_inicio == inicio_dados: break
+        inicio_dados = novo_inicio
+
+    caminho_temporario = destino + ".tmp"
+    with open(caminho_temporario, "wb") as f:
+        f.write(ASSET_PACK_MAGIC); f.write(struct.pack("<I", len(indice_bytes))); f.write(indice_bytes)
+        for pixels in blocos: f.write(pixels)
+    os.replace(caminho_temporario, destino)
+    return destino, len(indice)
+
+class ThumbnailCache:
+    # Miniaturas já redimensionadas ficam em disco, com nome derivado do caminho relativo à pasta de assets, do hash do
+    # conteúdo da imagem original e do tamanho. Não depende de mtime nem de caminho absoluto, então continua valendo no
+    # .exe onefile (que extrai os assets numa pasta temporária nova a cada abertura). Trocar a imagem gera outra chave;
+    # as miniaturas que sobram são podadas pelo acesso mais antigo quando a pasta passa do limite.
+    def __init__(self, diretorio, raiz):
+        self._diretorio = diretorio
+        self._raiz = os.path.abspath(raiz)
+        self._lock = threading.Lock()
+        self._pendentes = {}
+        self._hashes_origem = {}
+
+    def _chave(self, src_path, target_size_or_height):
+        return (os.path.abspath(src_path), target_size_or_height if isinstance(target_size_or_height, int) else tuple(target_size_or_height))
+
+    def _hash_origem(self, src_path):
+        stat = os.stat(src_path)
+        chave_stat = (os.path.abspath(src_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            conteudo_hash = self._hashes_origem.get(chave_stat)
+        if conteudo_hash is None:
+            with open(src_path, "rb") as f: conteudo_hash = hashlib.sha1(f.read()).hexdigest()
+            with self._lock:
+                self._hashes_origem[chave_stat] = conteudo_hash
+        return conteudo_hash
+
+    def _caminho_miniatura(self, src_path, target_size_or_height):
+        try:
+            relativo = os.path.relpath(os.path.abspath(src_path), self._raiz).replace(os.sep, "/")
+        except ValueError:
+            relativo = os.path.basename(src_path)  # outra unidade no Windows
+        tamanho = f"h{target_size_or_height}" if isinstance(target_size_or_height, int) else "x".join(str(v) for v in target_size_or_height)
+        chave = f"{relativo}|{self._hash_origem(src_path)}|{tamanho}"
+        return os.path.join(self._diretorio, hashlib.sha1(chave.encode("utf-8")).hexdigest() + ".png")
+
+    def _ler_miniatura(self, caminho_miniatura):
+        if not os.path.exists(caminho_miniatura): return None
+        try:
+            miniatura = Image.open(caminho_miniatura); miniatura.load()
+        except (OSError, UnidentifiedImageError):
+            return None
+        try:
+            os.utime(caminho_miniatura, None)  # marca o uso para a poda por acesso mais antigo
+        except OSError:
+            pass
+        return miniatura
+
+    def podar(self, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        if not os.path.isdir(self._diretorio): return 0
+        miniaturas, total, removidos = [], 0, 0
+        for entrada in os.scandir(self._diretorio):
+            try:
+                if not entrada.is_file(): continue
+                stat = entrada.stat()
+                if entrada.name.endswith(".tmp"):
+                    # Sobra de uma gravação interrompida.
+                    if time.time() - stat.st_mtime > 3600: os.remove(entrada.path); removidos += 1
+                elif entrada.name.endswith(".png"):
+                    miniaturas.append((stat.st_mtime, stat.st_size, entrada.path)); total += stat.st_size
+            except OSError:
+                continue
+        for _, tamanho, caminho in sorted(miniaturas):
+            if total <= max_bytes: break
+            try:
+                os.remove(caminho); total -= tamanho; removidos += 1
+            except OSError:
+                pass
+        return removidos
+
+    def _gravar_miniatura(self, miniatura, caminho_miniatura):
+        try:
+            os.makedirs(self._diretorio, exist_ok=True)
+            caminho_temporario = f"{caminho_miniatura}.{os.getpid()}.{threading.get_ident()}.tmp"
+            miniatura.save(caminho_temporario, "PNG")
+            os.replace(caminho_temporario, caminho_miniatura)
+        except OSError as e:
+            _log_error(f"Não foi possível gravar miniatura em cache '{caminho_miniatura}': {e}", "ganchometro_image_errors.txt")
+
+    def _gerar(self, src_path, tamanhos):
+        # Decodifica a imagem original no máximo uma vez para todos os tamanhos pedidos.
+        miniaturas, faltantes = {}, []
+        for target_size_or_height in tamanhos:
+            caminho_miniatura = self._caminho_miniatura(src_path, target_size_or_height)
+            miniatura = self._ler_miniatura(caminho_miniatura)
+            if miniatura is not None: miniaturas[target_size_or_height] = miniatura
+            else: faltantes.append((target_size_or_height, caminho_miniatura))
+        if faltantes:
+            with Image.open(src_path) as pil_image:
+                pil_image.load()
+                for target_size_or_height, caminho_miniatura in faltantes:
+                    miniatura = _redimensionar_imagem(pil_image, target_size_or_height)
+                    miniaturas[target_size_or_height] = miniatura
+                    if miniatura is not None: self._gravar_miniatura(miniatura, caminho_miniatura)
+        return miniaturas
+
+    def obter(self, src_path, target_size_or_height):
+        chave = self._chave(src_path, target_size_or_height)
+        with self._lock:
+            futuro = self._pendentes.pop(chave, None)
+        if futuro is not None: return futuro.result()[chave[1]]
+        return self._gerar(src_path, [chave[1]])[chave[1]]
+
+    def preaquecer(self, trabalhos, max_workers=THUMBNAIL_WORKERS):
+        tamanhos_por_origem = {}
+        for src_path, target_size_or_height in trabalhos:
+            src_path, tamanho = self._chave(src_path, target_size_or_height)
+            tamanhos_por_origem.setdefault(src_path, []).append(tamanho)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ganchometro-miniaturas")
+        with self._lock:
+            for src_path, tamanhos in tamanhos_por_origem.items():
+                tamanhos = [tamanho for tamanho in tamanhos if (src_path, tamanho) not in self._pendentes]
+                if not tamanhos: continue
+                futuro = executor.submit(self._gerar, src_path, tamanhos)
+                for tamanho in tamanhos: self._pendentes[(src_path, tamanho)] = futuro
+        # Entra por último na fila do executor: as miniaturas desta abertura já terão o acesso marcado.
+        executor.submit(self.podar)
+        executor.shutdown(wait=False)
+
+class ImageCache:
+    # LRU de PhotoImages com orçamento em bytes (RGBA descomprimido). Imagens fixadas por widgets vivos nunca são
+    # descartadas; falhas de carregamento ficam em cache só por alguns segundos para não repetir a busca em disco.
+    def __init__(self, max_bytes=IMAGE_CACHE_MAX_BYTES, ttl_ausentes=IMAGE_CACHE_NEGATIVE_TTL_S):
+        self.max_bytes = max_bytes
+        self.ttl_ausentes = ttl_ausentes
+        self._entradas = {}
+        self._ausentes = {}
+        self._fixacoes = {}
+        self._chave_por_imagem = {}
+        self.bytes_em_uso = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.acertos_ausentes = 0
+        self.descartes = 0
+
+    def _tamanho_bytes(self, imagem):
+        try:
+            return imagem.width() * imagem.height() * 4
+        except (TclError, AttributeError):
+            return 0
+
+    def obter(self, chave):
+        # Retorna (encontrado, imagem); imagem é None quando a chave está marcada como ausente.
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self._entradas[chave] = entrada
+            self.acertos += 1
+            return True, entrada[0]
+        expira_em = self._ausentes.get(chave)
+        if expira_em is not None:
+            if time.monotonic() < expira_em:
+                self.acertos_ausentes += 1
+                return True, None
+            del self._ausentes[chave]
+        self.falhas += 1
+        return False, None
+
+    def guardar(self, chave, imagem):
+        self._remover(chave)
+        self._ausentes.pop(chave, None)
+        tamanho = self._tamanho_bytes(imagem)
+        self._entradas[chave] = (imagem, tamanho)
+        self._chave_por_imagem[id(imagem)] = chave
+        self.bytes_em_uso += tamanho
+        self._descartar_excedente()
+
+    def guardar_ausente(self, chave):
+        self._ausentes[chave] = time.monotonic() + self.ttl_ausentes
+
+    def fixar(self, imagem, widget):
+        chave = self._chave_por_imagem.get(id(imagem))
+        if chave is None or widget is None: return
+        # Refixar o mesmo widget não duplica a entrada, e os widgets já destruídos saem aqui mesmo, sem esperar o orçamento estourar.
+        vivos = [fixado for fixado in self._fixacoes.get(chave, ()) if fixado is not widget and self._widget_vivo(fixado)]
+        vivos.append(widget)
+        self._fixacoes[chave] = vivos
+
+    @staticmethod
+    def _widget_vivo(widget):
+        try:
+            return bool(widget.winfo_exists())
+        except TclError:
+            return False
+
+    def _esta_fixada(self, chave):
+        widgets = self._fixacoes.get(chave)
+        if not widgets: return False
+        vivos = [widget for widget in widgets if self._widget_vivo(widget)]
+        if vivos: self._fixacoes[chave] = vivos
+        else: del self._fixacoes[chave]
+        return bool(vivos)
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None: return
+        self._chave_por_imagem.pop(id(entrada[0]), None)
+        self._fixacoes.pop(chave, None)
+        self.bytes_em_uso -= entrada[1]
+
+    def _descartar_excedente(self):
+        if self.bytes_em_uso <= self.max_bytes: return
+        for chave in list(self._entradas):
+            if self.bytes_em_uso <= self.max_bytes: break
+            if self._esta_fixada(chave): continue
+            self._remover(chave)
+            self.descartes += 1
+
+    def estatisticas(self):
+        return {"acertos": self.acertos, "falhas": self.falhas, "acertos_ausentes": self.acertos_ausentes, "descartes": self.descartes,
+                "entradas": len(self._entradas), "ausentes": len(self._ausentes), "fixadas": len(self._fixacoes),
+                "bytes_em_uso": self.bytes_em_uso, "max_bytes": self.max_bytes}
+
+    def resumo(self):
+        e = self.estatisticas()
+        return (f"Cache de imagens: {e['acertos']} acertos, {e['falhas']} falhas, {e['acertos_ausentes']} ausentes em cache, "
+                f"{e['descartes']} descartes; {e['entradas']} imagens ({e['fixadas']} fixadas), {e['bytes_em_uso'] / 1024:.0f} KiB de {e['max_bytes'] / 1024:.0f} KiB")
+
+def _cor_barra_progresso(taxa):
+    if taxa >= 60: return COLOR_PROGRESS_GREEN
+    if taxa >= 30: return COLOR_PROGRESS_ORANGE
+    return COLOR_PROGRESS_RED_BAR
+
+class StatCardGrid:
+    # Mantém um card por chave (killer, companheiro) numa grade. A cada atualização os cards existentes só recebem
+    # os dados novos; cards são criados ou destruídos apenas quando a chave aparece ou some, e só são re-posicionados
+    # na grade quando a ordem muda.
+    def __init__(self, container, criar_card, atualizar_card, texto_vazio, colunas=2, ao_carregar_mais=None):
+        self._criar_card = criar_card
+        self._atualizar_card = atualizar_card
+        self._colunas = colunas
+        self._grade = ctk.CTkFrame(container, fg_color="transparent")
+        for coluna in range(colunas): self._grade.grid_columnconfigure(coluna, weight=1)
+        self._vazio_label = ctk.CTkLabel(container, text=texto_vazio, text_color=COLOR_TEXT)
+        self._mais_button = None
+        if ao_carregar_mais:
+            self._mais_button = ctk.CTkButton(container, text="Carregar mais", command=ao_carregar_mais, width=140, fg_color=COLOR_BUTTON_SECONDARY, hover_color=COLOR_BUTTON_HOVER_SECONDARY)
+        self._cards = {}
+
+    def reconciliar(self, itens):
+        chaves_novas = {chave for chave, _ in itens}
+        for chave in [chave for chave in self._cards if chave not in chaves_novas]:
+            self._cards.pop(chave)["frame"].destroy()
+        for posicao, (chave, dados) in enumerate(itens):
+            card = self._cards.get(chave)
+            if card is None:
+                card = self._criar_card(self._grade, chave)
+                card["dados"], card["posicao"] = None, None
+                self._cards[chave] = card
+            if card["dados"] != dados:
+                self._atualizar_card(card, dados)
+                card["dados"] = dados
+            if card["posicao"] != posicao:
+                card["frame"].grid(row=posicao // self._colunas, column=posicao % self._colunas, padx=5, pady=5, sticky="nsew")
+                card["posicao"] = posicao
+        if itens:
+            self._vazio_label.pack_forget()
+            if not self._grade.winfo_manager():
+                if self._mais_button is not None and self._mais_button.winfo_manager(): self._grade.pack(fill="x", before=self._mais_button)
+                else: self._grade.pack(fill="x")
+        else:
+            self._grade.pack_forget()
+            if not self._vazio_label.winfo_manager(): self._vazio_label.pack()
+
+    def definir_tem_mais(self, tem_mais):
+        if self._mais_button is None: return
+        if tem_mais:
+            self._mais_button.configure(state="normal")
+            if not self._mais_button.winfo_manager(): self._mais_button.pack(pady=(0,5))
+        else:
+            self._mais_button.pack_forget()
+
+    def definir_carregando(self):
+        if self._mais_button is not None: self._mais_button.configure(state="disabled")
+
 class DBDTrackerApp(ctk.CTk):
     def __init__(self):
         super().__init__()
+        self._marcos_inicializacao = [("importações", _FIM_IMPORTACOES - _INICIO_PROCESSO)]
+        self._ultimo_marco_inicializacao = time.perf_counter()
+        self._marcar_inicializacao("módulo e janela")
         self.title(APP_NAME)
         self.geometry("1100x800")
         self.resizable(False, False) 
         ctk.set_appearance_mode("Dark")
         self.configure(fg_color=COLOR_BACKGROUND)
 
-        self._image_references = []
-        self._portraits_cache = {} 
+        self._image_cache = ImageCache()
         self._killer_buttons_ui = {} 
         self._selected_killer_button_ui = None 
+        self._killer_grid_assinatura = None
+        self._selection_grids = {}
 
         if hasattr(sys, '_MEIPASS'):
             self.base_dir = sys._MEIPASS
         else:
             self.base_dir = os.path.dirname(os.path.abspath(__file__))
         
+        self._asset_pack = AssetPack.abrir(os.path.join(self.base_dir, ASSET_PACK_FILENAME), self.base_dir)
+        self._thumbnail_cache = ThumbnailCache(os.path.join(os.path.dirname(get_db_path()), THUMBNAIL_CACHE_DIR), self.base_dir)
+        self._preaquecer_miniaturas()
+        self._marcar_inicializacao("cache de imagens")
         initialize_database()
+        self._marcar_inicializacao("banco de dados")
 
         os.makedirs(os.path.join(self.base_dir, IMAGE_ASSETS_PATH), exist_ok=True) 
         os.makedirs(os.path.join(self.base_dir, KILLER_PORTRAITS_PATH), exist_ok=True) 
@@ -391,6 +2575,16 @@ class DBDTrackerApp(ctk.CTk):
         self._current_match_data = {}
         self._current_step_frame = None 
         self._registration_step_history = [] 
+        self._paginas_desatualizadas = {"Histórico", "Estatísticas"}
+        self._indicadores_carregando = {}
+        self._operacao_dados_em_andamento = False
+        self._db_worker = get_db_worker()
+        _notificador_partidas.subscribe(lambda match_ids: self._db_worker.call_on_ui(self._on_partidas_alteradas, match_ids))
+        self._fila_gravacao = obter_fila_gravacao()
+        self._fila_gravacao.subscribe(lambda resultados: self._db_worker.call_on_ui(self._on_partidas_gravadas, resultados))
+        self._status_registro_after = None
+        self.after(BACKUP_PRIMEIRO_ATRASO_MS, self._backup_agendado)
+        self.after(DB_WORKER_POLL_MS, self._processar_resultados_db)
         
         self.main_header_frame = ctk.CTkFrame(self, fg_color=COLOR_BACKGROUND, height=LOGO_TARGET_HEIGHT + 10) 
         self.main_header_frame.pack(side="top", fill="x", padx=10, pady=(10,0))
@@ -399,6 +2593,7 @@ class DBDTrackerApp(ctk.CTk):
         self.logo_image_ctk = self._load_image(LOGO_FILENAME, LOGO_TARGET_HEIGHT) 
         if self.logo_image_ctk:
             self.logo_label = ctk.CTkLabel(self.main_header_frame, image=self.logo_image_ctk, text="")
+            self._image_cache.fixar(self.logo_image_ctk, self.logo_label)
             self.logo_label.grid(row=0, column=0, padx=(10,0), pady=5, sticky="w")
         else:
             self.logo_label = ctk.CTkLabel(self.main_header_frame, text="[LOGO]", width=int(LOGO_TARGET_HEIGHT * (3047/1027)), height=LOGO_TARGET_HEIGHT, fg_color="gray30") 
@@ -449,21 +2644,17 @@ class DBDTrackerApp(ctk.CTk):
         self.content_container = ctk.CTkFrame(self, fg_color=COLOR_BACKGROUND)
         self.content_container.pack(side="top", fill="both", expand=True, padx=10, pady=(0,10))
         
-        self.page_frames = {}
-        self.page_frames["Registrar Partida"] = ctk.CTkFrame(self.content_container, fg_color=COLOR_FRAME_BG)
-        self.criar_aba_registrar_steps_content(self.page_frames["Registrar Partida"])
-
-        self.page_frames["Histórico"] = ctk.CTkFrame(self.content_container, fg_color=COLOR_FRAME_BG)
-        self.criar_aba_historico_content(self.page_frames["Histórico"])
-
-        self.page_frames["Estatísticas"] = ctk.CTkFrame(self.content_container, fg_color=COLOR_FRAME_BG)
-        self.criar_aba_estatisticas_content(self.page_frames["Estatísticas"]) 
-
-        self.page_frames["Gerenciar Dados"] = ctk.CTkFrame(self.content_container, fg_color=COLOR_FRAME_BG)
-        self.criar_aba_gerenciar_dados_content(self.page_frames["Gerenciar Dados"])
+        self._marcar_inicializacao("cabeçalho")
         
-        self.page_frames["Sobre"] = ctk.CTkFrame(self.content_container, fg_color=COLOR_FRAME_BG)
-        self.criar_aba_sobre_content(self.page_frames["Sobre"])
+        # Só "Registrar Partida" é construída agora; as demais páginas são criadas na primeira visita (_obter_pagina).
+        self.page_frames = {}
+        self._construtores_paginas = {
+            "Registrar Partida": self.criar_aba_registrar_steps_content,
+            "Histórico": self.criar_aba_historico_content,
+            "Estatísticas": self.criar_aba_estatisticas_content,
+            "Gerenciar Dados": self.criar_aba_gerenciar_dados_content,
+            "Sobre": self.criar_aba_sobre_content,
+        }
         
         self.tab_view.add("Registrar Partida")
         self.tab_view.add("Histórico")
@@ -477,6 +2668,31 @@ class DBDTrackerApp(ctk.CTk):
         self._current_page_name = None
         self._is_settings_view_active = False
         self.show_page("Registrar Partida")
+        self._marcar_inicializacao("página Registrar Partida")
+        self.after_idle(self._relatar_inicializacao)
+
+    def _marcar_inicializacao(self, etapa):
+        agora = time.perf_counter()
+        self._marcos_inicializacao.append((etapa, agora - self._ultimo_marco_inicializacao))
+        self._ultimo_marco_inicializacao = agora
+
+    def _relatar_inicializacao(self):
+        self._marcar_inicializacao("primeira pintura")
+        total = time.perf_counter() - _INICIO_PROCESSO
+        relatorio = f"Inicialização em {total * 1000:.0f} ms:\n" + "\n".join(f"  {etapa}: {duracao * 1000:.0f} ms" for etapa, duracao in self._marcos_inicializacao)
+        print(relatorio)
+        if total > STARTUP_SLOW_THRESHOLD_S:
+            _log_error(relatorio, "ganchometro_startup_log.txt")
+
+    def _obter_pagina(self, page_name):
+        frame = self.page_frames.get(page_name)
+        if frame is None and page_name in self._construtores_paginas:
+            inicio = time.perf_counter()
+            frame = ctk.CTkFrame(self.content_container, fg_color=COLOR_FRAME_BG)
+            self.page_frames[page_name] = frame
+            self._construtores_paginas[page_name](frame)
+            print(f"Página '{page_name}' construída em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return frame
     
     def _on_tab_change_v074(self): 
         selected_tab_name = self.tab_view.get()
@@ -506,20 +2722,18 @@ class DBDTrackerApp(ctk.CTk):
 
     def show_page(self, page_name):
         if self._current_page_name == page_name and not self._is_settings_view_active and page_name in ["Registrar Partida", "Histórico", "Estatísticas"]:
-            if page_name == "Histórico":
-                self.carregar_historico()
-            elif page_name == "Estatísticas":
-                self.carregar_estatisticas_view() 
+            self._recarregar_pagina_se_desatualizada(page_name)
             return
 
         if self._current_page_name == page_name and self._is_settings_view_active and page_name in ["Gerenciar Dados", "Sobre"]:
             return
 
         if self._current_page_name and self._current_page_name in self.page_frames:
+            self._db_worker.cancel_group(self._current_page_name)
             if self.page_frames[self._current_page_name] and self.page_frames[self._current_page_name].winfo_exists():
                 self.page_frames[self._current_page_name].pack_forget()
 
-        frame_to_show = self.page_frames.get(page_name)
+        frame_to_show = self._obter_pagina(page_name)
         if frame_to_show:
             frame_to_show.pack(in_=self.content_container, fill="both", expand=True)
             self._current_page_name = page_name
@@ -527,10 +2741,8 @@ class DBDTrackerApp(ctk.CTk):
             if page_name == "Registrar Partida":
                 if hasattr(self, '_step_killer_frame') and self._current_step_frame != self._step_killer_frame: 
                     self.reset_match_registration()
-            elif page_name == "Histórico":
-                self.carregar_historico()
-            elif page_name == "Estatísticas":
-                self.carregar_estatisticas_view() 
+            else:
+                self._recarregar_pagina_se_desatualizada(page_name)
             
             if page_name in ["Registrar Partida", "Histórico", "Estatísticas"] and not self._is_settings_view_active:
                 if self.tab_view.get() != page_name:
@@ -540,6 +2752,64 @@ class DBDTrackerApp(ctk.CTk):
             _log_error(f"Tentativa de mostrar página não existente: {page_name}", "ganchometro_ui_errors.txt")
 
 
+    def _processar_resultados_db(self):
+        self._db_worker.process_results()
+        self.after(DB_WORKER_POLL_MS, self._processar_resultados_db)
+
+    def _executar_em_segundo_plano(self, grupo, func, args=(), kwargs=None, on_done=None, on_error=None, on_progress=None, indicador_em=None, texto_indicador="Carregando..."):
+        if grupo is not None: self._db_worker.cancel_group(grupo)
+        if indicador_em is not None: self._mostrar_indicador_carregando(indicador_em, texto_indicador)
+        def _finalizar(callback):
+            def _callback(*args):
+                if indicador_em is not None: self._esconder_indicador_carregando(indicador_em)
+                if callback: callback(*args)
+            return _callback
+        return self._db_worker.submit(func, args=args, kwargs=kwargs, on_done=_finalizar(on_done), on_error=_finalizar(on_error),
+                                      on_progress=on_progress, on_cancel=_finalizar(None), group=grupo)
+
+    def _mostrar_indicador_carregando(self, frame, texto):
+        indicador, contagem = self._indicadores_carregando.get(frame, (None, 0))
+        if indicador is None or not indicador.winfo_exists():
+            indicador = ctk.CTkLabel(frame, text=texto, fg_color=COLOR_BUTTON_SECONDARY, corner_radius=8, text_color=COLOR_TEXT, font=ctk.CTkFont(size=14, weight="bold"), padx=20, pady=10)
+        indicador.configure(text=texto)
+        indicador.place(relx=0.5, rely=0.5, anchor="center"); indicador.lift()
+        self._indicadores_carregando[frame] = (indicador, contagem + 1)
+
+    def _esconder_indicador_carregando(self, frame):
+        indicador, contagem = self._indicadores_carregando.get(frame, (None, 0))
+        contagem = max(0, contagem - 1)
+        self._indicadores_carregando[frame] = (indicador, contagem)
+        if contagem == 0 and indicador is not None and indicador.winfo_exists(): indicador.place_forget()
+
+    def _recarregar_pagina_se_desatualizada(self, page_name):
+        if page_name not in self._paginas_desatualizadas: return
+        if page_name == "Histórico": self.carregar_historico()
+        elif page_name == "Estatísticas": self.carregar_estatisticas_view()
+
+    def _on_partidas_alteradas(self, match_ids):
+        if match_ids is None:
+            self._paginas_desatualizadas.update(("Histórico", "Estatísticas"))
+        else:
+            if "Histórico" not in self._paginas_desatualizadas: self._inserir_partidas_novas_historico(match_ids)
+            self._paginas_desatualizadas.add("Estatísticas")
+        if not self._is_settings_view_active and self._current_page_name in ("Histórico", "Estatísticas"):
+            self._recarregar_pagina_se_desatualizada(self._current_page_name)
+
+    def _preaquecer_miniaturas(self):
+        trabalhos = []
+        pasta_retratos = os.path.join(self.base_dir, KILLER_PORTRAITS_PATH)
+        if os.path.isdir(pasta_retratos):
+            for entrada in os.scandir(pasta_retratos):
+                if entrada.is_file() and entrada.name.lower().endswith((".png", ".jpg", ".jpeg")):
+                    trabalhos.extend((entrada.path, tamanho) for tamanho in (PORTRAIT_SIZE_BUTTON_KILLER, PORTRAIT_SIZE_STATS)
+                                     if not self._no_pacote_assets(_chave_pacote_assets(entrada.name, tamanho, is_killer_portrait=True)))
+        caminho_logo = None if self._no_pacote_assets(_chave_pacote_assets(LOGO_FILENAME, LOGO_TARGET_HEIGHT)) else _resolver_caminho_imagem(self.base_dir, LOGO_FILENAME)
+        if caminho_logo: trabalhos.append((caminho_logo, LOGO_TARGET_HEIGHT))
+        if trabalhos: self._thumbnail_cache.preaquecer(trabalhos)
+
+    def _no_pacote_assets(self, chave_pacote):
+        return self._asset_pack is not None and chave_pacote in self._asset_pack
+
     def _load_image(self, filename_or_basename, target_size_or_height, is_killer_portrait=False, base_folder_override=None):
         if isinstance(target_size_or_height, int): 
             size_key = target_size_or_height
@@ -548,46 +2818,24 @@ class DBDTrackerApp(ctk.CTk):
             
         cache_key = (filename_or_basename, size_key, is_killer_portrait, base_folder_override)
 
-        if cache_key in self._portraits_cache and self._portraits_cache[cache_key] is not None:
-             return self._portraits_cache[cache_key]
+        encontrada, ctk_image = self._image_cache.obter(cache_key)
+        if encontrada: return ctk_image
 
-        actual_base_folder = base_folder_override if base_folder_override else (KILLER_PORTRAITS_PATH if is_killer_portrait else IMAGE_ASSETS_PATH)
-        full_base_path = os.path.join(self.base_dir, actual_base_folder)
-        
-        name_part, ext_part = os.path.splitext(filename_or_basename)
-        potential_files_to_check = []
-        cleaned_name_part = name_part.replace(":", "") 
-
-        if is_killer_portrait or not ext_part: 
-            potential_files_to_check.extend([cleaned_name_part + ".png", cleaned_name_part + ".jpg", cleaned_name_part + ".jpeg"])
-        else: 
-            potential_files_to_check.append(filename_or_basename)
-        
-        final_img_path = None
-        for fname_to_check in potential_files_to_check:
-            p_path = os.path.join(full_base_path, fname_to_check)
-            if os.path.exists(p_path): final_img_path = p_path; break
+        chave_pacote = _chave_pacote_assets(filename_or_basename, size_key, is_killer_portrait, base_folder_override)
+        if self._no_pacote_assets(chave_pacote):
+            ctk_image = ImageTk.PhotoImage(self._asset_pack.obter(chave_pacote))
+            self._image_cache.guardar(cache_key, ctk_image)
+            return ctk_image
 
+        final_img_path = _resolver_caminho_imagem(self.base_dir, filename_or_basename, is_killer_portrait, base_folder_override)
         if final_img_path:
             try:
-                pil_image = Image.open(final_img_path)
-                
-                if filename_or_basename == LOGO_FILENAME and isinstance(target_size_or_height, int):
-                    target_height_logo = target_size_or_height 
-                    original_width, original_height = pil_image.size
-                    if original_height == 0: return None 
-                    aspect_ratio = original_width / original_height
-                    new_width = int(target_height_logo * aspect_ratio)
-                    resized_image = pil_image.resize((new_width, target_height_logo), Image.Resampling.LANCZOS)
-                elif isinstance(target_size_or_height, tuple): 
-                    resized_image = pil_image.resize(target_size_or_height, Image.Resampling.LANCZOS)
-                else: 
-                    resized_image = pil_image.resize(target_size_or_height, Image.Resampling.LANCZOS)
-
-
+                resized_image = self._thumbnail_cache.obter(final_img_path, size_key)
+                if resized_image is None:
+                    self._image_cache.guardar_ausente(cache_key)
+                    return None
                 ctk_image = ImageTk.PhotoImage(resized_image)
-                self._portraits_cache[cache_key] = ctk_image
-                self._image_references.append(ctk_image)
+                self._image_cache.guardar(cache_key, ctk_image)
                 return ctk_image
             except FileNotFoundError:
                 print(f"Arquivo de imagem não encontrado: '{final_img_path}'")
@@ -599,10 +2847,11 @@ class DBDTrackerApp(ctk.CTk):
                 print(f"Erro PIL/IO ao abrir/processar imagem '{final_img_path}': {e}")
                 _log_error(f"Erro PIL/IO em _load_image para '{final_img_path}': {e}\n{traceback.format_exc()}", "ganchometro_image_errors.txt")
         else:
+            full_base_path = os.path.join(self.base_dir, base_folder_override if base_folder_override else (KILLER_PORTRAITS_PATH if is_killer_portrait else IMAGE_ASSETS_PATH))
             print(f"Caminho final da imagem não encontrado para: {filename_or_basename} em {full_base_path}")
             _log_error(f"Caminho final da imagem não encontrado para: {filename_or_basename} em {full_base_path}", "ganchometro_image_errors.txt")
 
-        self._portraits_cache[cache_key] = None
+        self._image_cache.guardar_ausente(cache_key)
         return None
 
     def criar_aba_registrar_steps_content(self, tab_registrar): 
@@ -614,6 +2863,8 @@ class DBDTrackerApp(ctk.CTk):
                                                  fg_color=COLOR_BUTTON_SECONDARY,
                                                  hover_color=COLOR_BUTTON_HOVER_SECONDARY)
 
+        self.registro_status_label = ctk.CTkLabel(self.main_registrar_frame, text="", text_color=COLOR_TEXT_SUBTLE)
+        self.registro_status_label.pack(side="bottom", pady=(0,5))
         self.steps_container_frame = ctk.CTkFrame(self.main_registrar_frame, fg_color="transparent")
         self.steps_container_frame.pack(fill="both", expand=True, padx=10, pady=(0,5)) 
         self._step_killer_frame = ctk.CTkFrame(self.steps_container_frame, fg_color="transparent")
@@ -667,16 +2918,16 @@ class DBDTrackerApp(ctk.CTk):
                 self._build_step_killer_selection() 
             elif previous_step_frame == self._step_map_frame:
                 for k in ['item_used_id', 'item_gained_id', 'item_lost_id', 'game_mode', 'teammates', 'escaped', 'survivors_escaped', 'notes', 'jhones_sedex']: self._current_match_data.pop(k, None)
-                self._create_selection_grid_step(self._step_map_frame, "Escolha o Mapa", buscar_items_genericos("maps"), self._action_select_map_item_generic, "map", back_command=lambda: self._show_step(self._step_killer_frame))
+                self._create_selection_grid_step(self._step_map_frame, "Escolha o Mapa", _catalogo_referencia.lista("maps"), self._action_select_map_item_generic, "map", back_command=lambda: self._show_step(self._step_killer_frame))
             elif previous_step_frame == self._step_item_used_frame:
                 for k in ['item_gained_id', 'item_lost_id', 'game_mode', 'teammates', 'escaped', 'survivors_escaped', 'notes', 'jhones_sedex']: self._current_match_data.pop(k, None)
-                self._create_selection_grid_step(self._step_item_used_frame, "Item Usado", buscar_items_genericos("items"), self._action_select_map_item_generic, "item_used", back_command=lambda: self._show_step(self._step_map_frame))
+                self._create_selection_grid_step(self._step_item_used_frame, "Item Usado", _catalogo_referencia.lista("items"), self._action_select_map_item_generic, "item_used", back_command=lambda: self._show_step(self._step_map_frame))
             elif previous_step_frame == self._step_item_gained_frame:
                 for k in ['item_lost_id', 'game_mode', 'teammates', 'escaped', 'survivors_escaped', 'notes', 'jhones_sedex']: self._current_match_data.pop(k, None)
-                self._create_selection_grid_step(self._step_item_gained_frame, "Item Ganho", buscar_items_genericos("items"), self._action_select_map_item_generic, "item_gained", back_command=lambda: self._show_step(self._step_item_used_frame))
+                self._create_selection_grid_step(self._step_item_gained_frame, "Item Ganho", _catalogo_referencia.lista("items"), self._action_select_map_item_generic, "item_gained", back_command=lambda: self._show_step(self._step_item_used_frame))
             elif previous_step_frame == self._step_item_lost_frame:
                 for k in ['game_mode', 'teammates', 'escaped', 'survivors_escaped', 'notes', 'jhones_sedex']: self._current_match_data.pop(k, None)
-                self._create_selection_grid_step(self._step_item_lost_frame, "Item Perdido", buscar_items_genericos("items"), self._action_select_map_item_generic, "item_lost", back_command=lambda: self._show_step(self._step_item_gained_frame))
+                self._create_selection_grid_step(self._step_item_lost_frame, "Item Perdido", _catalogo_referencia.lista("items"), self._action_select_map_item_generic, "item_lost", back_command=lambda: self._show_step(self._step_item_gained_frame))
             elif previous_step_frame == self._step_playing_mode_frame:
                 for k in ['escaped', 'survivors_escaped', 'notes', 'jhones_sedex']: self._current_match_data.pop(k, None)
                 self._build_step_playing_mode()
@@ -690,6 +2941,8 @@ class DBDTrackerApp(ctk.CTk):
 
     def reset_match_registration(self):
         self._current_match_data = {}
+        # Monta o índice de companheiros em segundo plano enquanto killer/mapa/itens são escolhidos.
+        self._executar_em_segundo_plano("Companheiros", buscar_teammates_por_prefixo, args=("",))
         self._select_killer_ui_feedback(None)
         self._registration_step_history = []
         if hasattr(self, 'teammate_nicks_comboboxes'):
@@ -722,18 +2975,29 @@ class DBDTrackerApp(ctk.CTk):
         if next_command:
             ctk.CTkButton(nav_frame, text=next_text + " >", command=next_command, width=120, fg_color=COLOR_BUTTON_PRIMARY, hover_color=COLOR_BUTTON_HOVER_PRIMARY).pack(side="right", padx=10)
 
+    def _rolar_para_o_topo(self, scroll_frame):
+        if hasattr(scroll_frame, '_parent_canvas'): scroll_frame._parent_canvas.yview_moveto(0)
+
     def _build_step_killer_selection(self):
         parent_frame = self._step_killer_frame
+        all_killers = _catalogo_referencia.lista("killers")
+        # A grade é montada uma vez; entre registros só o destaque de seleção muda. Reconstrói só se a tabela de killers mudar.
+        if self._killer_grid_assinatura == tuple(all_killers) and self._killer_buttons_ui and self._killer_scroll_frame.winfo_exists():
+            self._select_killer_ui_feedback(self._killer_buttons_ui.get(self._current_match_data.get('killer_id')))
+            self._rolar_para_o_topo(self._killer_scroll_frame)
+            return
         for widget in parent_frame.winfo_children(): widget.destroy()
         ctk.CTkLabel(parent_frame, text="Escolha o Assassino", font=ctk.CTkFont(size=18, weight="bold"), text_color=COLOR_TEXT).pack(pady=(5,5))
         
         killer_scroll_frame = ctk.CTkScrollableFrame(parent_frame, orientation="vertical", fg_color=COLOR_BACKGROUND) 
         killer_scroll_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self._killer_scroll_frame = killer_scroll_frame
+        self._killer_grid_assinatura = tuple(all_killers)
         
         if hasattr(self, '_killer_buttons_ui'): self._killer_buttons_ui.clear()
         else: self._killer_buttons_ui = {}
+        self._selected_killer_button_ui = None
         
-        all_killers = buscar_items_genericos("killers", order_by_name=True)
         cols = 10 
         row_idx, col_idx = 0, 0
         
@@ -748,6 +3012,7 @@ class DBDTrackerApp(ctk.CTk):
             img_display_text = "" if ctk_image else "S/Img"
             img_display = ctk.CTkLabel(killer_card_frame, text=img_display_text, image=ctk_image, width=PORTRAIT_SIZE_BUTTON_KILLER[0], height=PORTRAIT_SIZE_BUTTON_KILLER[1], fg_color="gray25" if not ctk_image else "transparent")
             img_display.pack(pady=(3,1), padx=3)
+            if ctk_image: self._image_cache.fixar(ctk_image, img_display)
             
             name_label = ctk.CTkLabel(killer_card_frame, text=killer_name, font=ctk.CTkFont(size=10), text_color=COLOR_TEXT, wraplength=KILLER_CARD_WIDTH - 10) 
             name_label.pack(pady=(0,3), padx=3, fill="x", expand=True)
@@ -766,10 +3031,25 @@ class DBDTrackerApp(ctk.CTk):
             killer_scroll_frame.grid_columnconfigure(i, weight=1)
     
     def _create_selection_grid_step(self, parent_frame, title, items_list, action_callback, item_type_for_callback, back_command):
+        assinatura = tuple(items_list)
+        grid = self._selection_grids.get(parent_frame)
+        if grid and grid["assinatura"] == assinatura and grid["scroll_frame"].winfo_exists():
+            grid["back_command"] = back_command
+            if grid["hover"] is not None and grid["hover"].winfo_exists():
+                grid["hover"].configure(fg_color=COLOR_BUTTON_PRIMARY, border_color=COLOR_PRIMARY_RED)
+            grid["hover"] = None
+            self._rolar_para_o_topo(grid["scroll_frame"])
+            return
         for widget in parent_frame.winfo_children(): widget.destroy()
         ctk.CTkLabel(parent_frame, text=title, font=ctk.CTkFont(size=18, weight="bold"), text_color=COLOR_TEXT).pack(pady=(5,10))
         scroll_frame = ctk.CTkScrollableFrame(parent_frame, fg_color=COLOR_BACKGROUND) 
         scroll_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        grid = {"assinatura": assinatura, "scroll_frame": scroll_frame, "back_command": back_command, "hover": None}
+        self._selection_grids[parent_frame] = grid
+        def _on_enter(frame):
+            frame.configure(fg_color=COLOR_BUTTON_HOVER_PRIMARY, border_color=COLOR_BUTTON_HOVER_PRIMARY); grid["hover"] = frame
+        def _on_leave(frame):
+            frame.configure(fg_color=COLOR_BUTTON_PRIMARY, border_color=COLOR_PRIMARY_RED); grid["hover"] = None
         cols = 3; row_idx, col_idx = 0, 0
         for item_id, item_name in items_list:
             item_card_frame = ctk.CTkFrame(scroll_frame, width=MAP_ITEM_CARD_WIDTH, height=MAP_ITEM_CARD_HEIGHT, fg_color=COLOR_BUTTON_PRIMARY, border_width=1, border_color=COLOR_PRIMARY_RED, corner_radius=6)
@@ -779,12 +3059,12 @@ class DBDTrackerApp(ctk.CTk):
             label.place(relx=0.5, rely=0.5, anchor="center")
             command = lambda event_obj, i_id=item_id, i_name=item_name, i_type=item_type_for_callback: action_callback(i_id, i_name, i_type, event_arg=event_obj)
             item_card_frame.bind("<Button-1>", command); label.bind("<Button-1>", command)
-            item_card_frame.bind("<Enter>", lambda e, frame=item_card_frame: frame.configure(fg_color=COLOR_BUTTON_HOVER_PRIMARY, border_color=COLOR_BUTTON_HOVER_PRIMARY))
-            item_card_frame.bind("<Leave>", lambda e, frame=item_card_frame: frame.configure(fg_color=COLOR_BUTTON_PRIMARY, border_color=COLOR_PRIMARY_RED))
+            item_card_frame.bind("<Enter>", lambda e, frame=item_card_frame: _on_enter(frame))
+            item_card_frame.bind("<Leave>", lambda e, frame=item_card_frame: _on_leave(frame))
             col_idx +=1
             if col_idx >= cols: col_idx = 0; row_idx += 1
         for i in range(cols): scroll_frame.grid_columnconfigure(i, weight=1)
-        self._build_navigation_buttons(parent_frame, back_command=back_command)
+        self._build_navigation_buttons(parent_frame, back_command=lambda: grid["back_command"]())
 
     def _action_select_killer(self, killer_id, killer_name, button_frame, event_arg=None):
         if not isinstance(killer_id, int):
@@ -795,7 +3075,7 @@ class DBDTrackerApp(ctk.CTk):
              self.cancel_button_header_steps.pack(in_=self.main_registrar_frame, side="top", pady=(5,10), padx=10, anchor="e", before=self.steps_container_frame)
         self._current_match_data['killer_id'] = killer_id
         self._select_killer_ui_feedback(button_frame)
-        self._create_selection_grid_step(self._step_map_frame, "Escolha o Mapa", buscar_items_genericos("maps"), self._action_select_map_item_generic, "map", back_command=lambda: self._show_step(self._step_killer_frame))
+        self._create_selection_grid_step(self._step_map_frame, "Escolha o Mapa", _catalogo_referencia.lista("maps"), self._action_select_map_item_generic, "map", back_command=lambda: self._show_step(self._step_killer_frame))
         self._show_step(self._step_map_frame)
 
     def _action_select_map_item_generic(self, item_id, item_name, item_type, event_arg=None):
@@ -806,22 +3086,20 @@ class DBDTrackerApp(ctk.CTk):
             
         self._current_match_data[item_type + '_id'] = item_id
         
-        conn_temp, cursor_temp = conectar_db()
-        nenhum_id_tuple = cursor_temp.execute("SELECT id FROM items WHERE name = 'Nenhum'").fetchone()
-        nenhum_id = nenhum_id_tuple[0] if nenhum_id_tuple else -1 
-        conn_temp.close()
+        nenhum_id = _catalogo_referencia.nenhum_item_id()
+        if nenhum_id is None: nenhum_id = -1
 
         if item_type == "map":
-            self._create_selection_grid_step(self._step_item_used_frame, "Item Usado", buscar_items_genericos("items"), self._action_select_map_item_generic, "item_used", back_command=lambda: self._show_step(self._step_map_frame))
+            self._create_selection_grid_step(self._step_item_used_frame, "Item Usado", _catalogo_referencia.lista("items"), self._action_select_map_item_generic, "item_used", back_command=lambda: self._show_step(self._step_map_frame))
             self._show_step(self._step_item_used_frame)
         elif item_type == "item_used":
             if item_id == nenhum_id: 
                 self._current_match_data['item_lost_id'] = nenhum_id 
-                self._create_selection_grid_step(self._step_item_gained_frame, "Item Ganho", buscar_items_genericos("items"), self._action_select_map_item_generic, "item_gained", back_command=lambda: self._show_step(self._step_item_used_frame))
+                self._create_selection_grid_step(self._step_item_gained_frame, "Item Ganho", _catalogo_referencia.lista("items"), self._action_select_map_item_generic, "item_gained", back_command=lambda: self._show_step(self._step_item_used_frame))
                 self._show_step(self._step_item_gained_frame)
             else: 
                 self._current_match_data['item_gained_id'] = nenhum_id 
-                self._create_selection_grid_step(self._step_item_lost_frame, "Item Perdido", buscar_items_genericos("items"), self._action_select_map_item_generic, "item_lost", back_command=lambda: self._show_step(self._step_item_used_frame))
+                self._create_selection_grid_step(self._step_item_lost_frame, "Item Perdido", _catalogo_referencia.lista("items"), self._action_select_map_item_generic, "item_lost", back_command=lambda: self._show_step(self._step_item_used_frame))
                 self._show_step(self._step_item_lost_frame)
         elif item_type == "item_gained": 
             self._build_step_playing_mode() 
@@ -841,21 +3119,18 @@ class DBDTrackerApp(ctk.CTk):
         self.teammates_frame_step.pack(pady=5)
         self.teammate_nicks_comboboxes.clear()
         
-        conn, cursor = conectar_db()
-        cursor.execute("SELECT nickname FROM teammates ORDER BY nickname COLLATE NOCASE")
-        existing_nicks = [row['nickname'] for row in cursor.fetchall()]
-        conn.close()
+        # Só as sugestões mais relevantes vão para a lista; ela é refeita a cada tecla a partir do índice de prefixos.
+        sugestoes_iniciais = buscar_teammates_por_prefixo("")
         current_teammates_data = self._current_match_data.get('teammates', [])
         for i in range(3):
-            combo = ctk.CTkComboBox(self.teammates_frame_step, width=250, values=existing_nicks, fg_color=COLOR_BACKGROUND, border_color="gray50", text_color=COLOR_TEXT, button_color=COLOR_PRIMARY_RED, dropdown_fg_color=COLOR_FRAME_BG, dropdown_hover_color=COLOR_BUTTON_HOVER_SECONDARY)
+            combo = ctk.CTkComboBox(self.teammates_frame_step, width=250, values=sugestoes_iniciais, fg_color=COLOR_BACKGROUND, border_color="gray50", text_color=COLOR_TEXT, button_color=COLOR_PRIMARY_RED, dropdown_fg_color=COLOR_FRAME_BG, dropdown_hover_color=COLOR_BUTTON_HOVER_SECONDARY)
             if i < len(current_teammates_data): combo.set(current_teammates_data[i])
+            combo.bind("<KeyRelease>", lambda event, c=combo: self._on_teammate_digitado(c))
             self.teammate_nicks_comboboxes.append(combo)
         self._update_teammate_fields_step_visibility()
         
         item_usado_id_val = self._current_match_data.get('item_used_id')
-        conn_temp, cursor_temp = conectar_db()
-        nenhum_id_val = get_id_by_name("items", "Nenhum", (conn_temp, cursor_temp))
-        conn_temp.close()
+        nenhum_id_val = _catalogo_referencia.nenhum_item_id()
         
         back_target_for_playing_mode = self._step_item_lost_frame
         if item_usado_id_val == nenhum_id_val:
@@ -863,6 +3138,10 @@ class DBDTrackerApp(ctk.CTk):
 
         self._build_navigation_buttons(parent_frame, back_command=lambda: self._show_step(back_target_for_playing_mode), next_command=self._action_confirm_playing_mode)
 
+    def _on_teammate_digitado(self, combo):
+        sugestoes = buscar_teammates_por_prefixo(combo.get())
+        if sugestoes != combo.cget("values"): combo.configure(values=sugestoes)
+
     def _update_teammate_fields_step_visibility(self, event=None):
         selected_mode = self.game_mode_var_step.get()
         num_fields_to_show = 0
@@ -1030,7 +3309,7 @@ class DBDTrackerApp(ctk.CTk):
             messagebox.showerror("Erro Interno", f"Tipo inválido para 'current_jhones_sedex_val': {type(current_jhones_sedex_val)}")
             return
 
-        success = registrar_partida(
+        partida = dict(
             killer_id=killer_id_val, map_id=map_id_val,
             item_used_id=item_used_id_val, item_gained_id=item_gained_id_val,
             item_lost_id=item_lost_id_val, escaped=escaped_val,
@@ -1038,11 +3317,41 @@ class DBDTrackerApp(ctk.CTk):
             game_mode=game_mode_val, teammates_nicks=teammates_nicks_val,
             jhones_sedex=current_jhones_sedex_val
         )
-        if success:
-            self.reset_match_registration()
-            current_tab = self.tab_view.get()
-            if current_tab == "Histórico": self.carregar_historico()
-            if current_tab == "Estatísticas": self.carregar_estatisticas_view()
+        try:
+            self._fila_gravacao.enfileirar(partida)
+        except OSError as e:
+            print(f"Erro ao enfileirar partida: {e}")
+            _log_error(f"Erro de E/S em MatchWriteQueue.enfileirar: {e}\n{traceback.format_exc()}", "ganchometro_save_error.txt")
+            messagebox.showerror("Erro ao Salvar", f"Não foi possível guardar a partida para gravação: {e}\nVerifique o console e o log 'ganchometro_save_error.txt'.")
+            return
+        # A gravação segue na thread da fila; o assistente já fica livre para a próxima partida.
+        self._mostrar_status_registro("Salvando partida...")
+        self.reset_match_registration()
+
+    def _mostrar_status_registro(self, texto, cor=COLOR_TEXT_SUBTLE, ocultar_apos_ms=None):
+        if not hasattr(self, 'registro_status_label') or not self.registro_status_label.winfo_exists(): return
+        if self._status_registro_after is not None:
+            self.after_cancel(self._status_registro_after); self._status_registro_after = None
+        self.registro_status_label.configure(text=texto, text_color=cor)
+        if ocultar_apos_ms:
+            self._status_registro_after = self.after(ocultar_apos_ms, lambda: self._mostrar_status_registro(""))
+
+    def _on_partidas_gravadas(self, resultados):
+        gravadas = sum(1 for r in resultados if r["match_id"])
+        duplicadas = sum(1 for r in resultados if r["duplicada"] and not r["recuperada"])
+        adiadas = sum(1 for r in resultados if r.get("pendente"))
+        erros = [r["erro"] for r in resultados if r["erro"] and not r.get("pendente")]
+        na_fila = self._fila_gravacao.pendentes()
+        sufixo = f" ({na_fila} na fila)" if na_fila else ""
+        if erros:
+            self._mostrar_status_registro(f"Erro ao registrar partida: {erros[0]}. Verifique o log 'ganchometro_sqlite_errors.txt'.{sufixo}", COLOR_PROGRESS_RED_BAR)
+        elif adiadas:
+            self._mostrar_status_registro(f"Banco de dados ocupado: {adiadas} partida(s) guardada(s); nova tentativa em segundo plano.{sufixo}", COLOR_PROGRESS_ORANGE)
+        elif duplicadas:
+            self._mostrar_status_registro(f"Uma partida idêntica já está registrada.{sufixo}", COLOR_PROGRESS_ORANGE, REGISTRO_STATUS_DURACAO_MS)
+        elif gravadas:
+            texto = "Partida registrada com sucesso!" if gravadas == 1 else f"{gravadas} partidas registradas com sucesso!"
+            self._mostrar_status_registro(texto + sufixo, COLOR_PROGRESS_GREEN, None if na_fila else REGISTRO_STATUS_DURACAO_MS)
 
 
     def criar_aba_historico_content(self, tab_historico): 
@@ -1061,22 +3370,118 @@ class DBDTrackerApp(ctk.CTk):
             self.history_tree.heading(col_name, text=col_name); self.history_tree.column(col_name, width=width, anchor=anchor, minwidth=max(40,width-20))
         vsb = ttk.Scrollbar(frame, orient="vertical", command=self.history_tree.yview); vsb.pack(side='right', fill='y')
         hsb = ttk.Scrollbar(frame, orient="horizontal", command=self.history_tree.xview); hsb.pack(side='bottom', fill='x')
-        self.history_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set); self.history_tree.pack(fill="both", expand=True)
+        self._history_vsb = vsb
+        self.history_tree.configure(yscrollcommand=self._on_history_yscroll, xscrollcommand=hsb.set); self.history_tree.pack(fill="both", expand=True)
+        self._history_chaves = {}
+        self._history_tem_mais_antigas = False
+        self._history_tem_mais_recentes = False
+        self._history_verificacao_agendada = False
         refresh_button = ctk.CTkButton(frame, text="Atualizar Histórico", command=self.carregar_historico, fg_color=COLOR_BUTTON_PRIMARY, hover_color=COLOR_BUTTON_HOVER_PRIMARY, text_color="#FFFFFF")
         refresh_button.pack(pady=10)
 
-    def carregar_historico(self):
+    def carregar_historico(self, pagina=None):
         if hasattr(self, 'history_tree') and self.history_tree and self.history_tree.winfo_exists():
-            for i in self.history_tree.get_children(): self.history_tree.delete(i)
-            partidas = buscar_historico_partidas()
-            for partida_row in partidas:
-                valores_formatados = []
-                for valor in partida_row:
-                    if isinstance(valor, (bytes, bytearray)):
-                        valores_formatados.append(valor.decode('utf-8', errors='replace'))
-                    else:
-                        valores_formatados.append(valor)
-                self.history_tree.insert("", "end", values=tuple(valores_formatados))
+            if pagina is None:
+                self._executar_em_segundo_plano("Histórico", buscar_pagina_historico, on_done=self.carregar_historico, indicador_em=self.history_tree.master)
+                return
+            self._paginas_desatualizadas.discard("Histórico")
+            self._remover_linhas_historico(self.history_tree.get_children())
+            self._history_tem_mais_antigas = len(pagina) == HISTORY_PAGE_SIZE
+            self._history_tem_mais_recentes = False
+            self._inserir_linhas_historico(pagina, "end")
+            self.history_tree.yview_moveto(0)
+
+    def _inserir_linhas_historico(self, partidas, posicao):
+        for partida_row in partidas:
+            iid = str(partida_row[0])
+            if self.history_tree.exists(iid): continue
+            valores_formatados = tuple(valor.decode('utf-8', errors='replace') if isinstance(valor, (bytes, bytearray)) else valor for valor in partida_row[:-1])
+            self._history_chaves[iid] = (partida_row[-1], partida_row[0])
+            self.history_tree.insert("", posicao, iid=iid, values=valores_formatados)
+            if posicao != "end": posicao += 1
+
+    def _inserir_partidas_novas_historico(self, match_ids, partidas=None):
+        if not (hasattr(self, 'history_tree') and self.history_tree.winfo_exists()): return
+        if partidas is None:
+            # Sem grupo: uma leva de partidas novas não cancela a anterior (a inserção ignora linhas já presentes).
+            self._executar_em_segundo_plano(None, buscar_partidas_historico_por_ids, args=(match_ids,), on_done=lambda partidas: self._inserir_partidas_novas_historico(match_ids, partidas))
+            return
+        if "Histórico" in self._paginas_desatualizadas: return  # a recarga completa já vai trazê-las
+        # Treeview em ordem decrescente; as chaves vão em ordem crescente para o bisect, e a posição na árvore é
+        # quantas linhas carregadas têm chave maior.
+        chaves_crescentes = [self._history_chaves[iid] for iid in reversed(self.history_tree.get_children())]
+        for partida_row in sorted(partidas, key=lambda row: (row[-1], row[0]), reverse=True):
+            if self.history_tree.exists(str(partida_row[0])): continue
+            chave = (partida_row[-1], partida_row[0])
+            indice = bisect.bisect_right(chaves_crescentes, chave)
+            posicao = len(chaves_crescentes) - indice
+            if posicao == 0 and self._history_tem_mais_recentes: continue
+            if posicao == len(chaves_crescentes) and self._history_tem_mais_antigas: continue
+            self._inserir_linhas_historico([partida_row], posicao)
+            chaves_crescentes.insert(indice, chave)
+        itens = self.history_tree.get_children()
+        if len(itens) > HISTORY_MAX_ROWS:
+            self._remover_linhas_historico(itens[HISTORY_MAX_ROWS:])
+            self._history_tem_mais_antigas = True
+
+    def _remover_linhas_historico(self, itens):
+        if not itens: return
+        self.history_tree.delete(*itens)
+        for iid in itens: self._history_chaves.pop(iid, None)
+
+    def _on_history_yscroll(self, first, last):
+        self._history_vsb.set(first, last)
+        if not self._history_verificacao_agendada:
+            self._history_verificacao_agendada = True
+            self.after_idle(self._verificar_paginas_historico)
+
+    def _verificar_paginas_historico(self):
+        # Mantém no máximo HISTORY_MAX_ROWS linhas na Treeview: carrega a página vizinha quando a rolagem chega perto
+        # de uma das bordas e descarta as linhas do lado oposto, preservando a posição visível. A página vem pelo
+        # DBWorker, no mesmo grupo da recarga completa (que a cancela).
+        self._history_verificacao_agendada = False
+        if not (hasattr(self, 'history_tree') and self.history_tree.winfo_exists()): return
+        # Com uma página ou recarga em andamento não pede outra; a rolagem provocada por ela verifica de novo.
+        if self._db_worker.has_pending("Histórico"): return
+        itens = self.history_tree.get_children()
+        if not itens: return
+        first, last = self.history_tree.yview()
+        if last >= 0.9 and self._history_tem_mais_antigas:
+            ancora = self._history_chaves[itens[-1]]
+            self._executar_em_segundo_plano("Histórico", buscar_pagina_historico, kwargs={"antes_de": ancora}, on_done=lambda pagina: self._aplicar_pagina_historico(pagina, ancora, mais_antigas=True))
+        elif first <= 0.1 and self._history_tem_mais_recentes:
+            ancora = self._history_chaves[itens[0]]
+            self._executar_em_segundo_plano("Histórico", buscar_pagina_historico, kwargs={"depois_de": ancora}, on_done=lambda pagina: self._aplicar_pagina_historico(pagina, ancora, mais_antigas=False))
+
+    def _aplicar_pagina_historico(self, pagina, ancora, mais_antigas):
+        if not (hasattr(self, 'history_tree') and self.history_tree.winfo_exists()): return
+        itens = self.history_tree.get_children()
+        if not itens: return
+        # A borda mudou enquanto a página era lida (partidas novas, corte de linhas): descarta; a próxima rolagem pede de novo.
+        if self._history_chaves.get(itens[-1 if mais_antigas else 0]) != ancora: return
+        first, last = self.history_tree.yview()
+        if mais_antigas:
+            self._history_tem_mais_antigas = len(pagina) == HISTORY_PAGE_SIZE
+            if not pagina: return
+            linha_topo = first * len(itens)
+            self._inserir_linhas_historico(pagina, "end")
+            itens = self.history_tree.get_children()
+            excedente = len(itens) - HISTORY_MAX_ROWS
+            if excedente > 0:
+                self._remover_linhas_historico(itens[:excedente])
+                self._history_tem_mais_recentes = True
+                linha_topo -= excedente
+        else:
+            self._history_tem_mais_recentes = len(pagina) == HISTORY_PAGE_SIZE
+            if not pagina: return
+            linha_topo = first * len(itens) + len(pagina)
+            self._inserir_linhas_historico(pagina, 0)
+            itens = self.history_tree.get_children()
+            excedente = len(itens) - HISTORY_MAX_ROWS
+            if excedente > 0:
+                self._remover_linhas_historico(itens[-excedente:])
+                self._history_tem_mais_antigas = True
+        self.history_tree.yview_moveto(max(0.0, linha_topo) / len(self.history_tree.get_children()))
 
     def criar_aba_estatisticas_content(self, tab_estatisticas):
         self.stats_main_frame_container = ctk.CTkFrame(tab_estatisticas, fg_color=COLOR_FRAME_BG)
@@ -1090,14 +3495,21 @@ class DBDTrackerApp(ctk.CTk):
         
         self.view_mode_button = ctk.CTkButton(self.stats_controls_frame, text="Ver Gráficos", command=self.toggle_stats_view, fg_color=COLOR_BUTTON_SECONDARY, hover_color=COLOR_BUTTON_HOVER_SECONDARY)
         self.view_mode_button.pack(side="left", padx=(0,10))
+
+        self.chart_backend_var = ctk.StringVar(value=CHART_BACKEND_PADRAO)
+        self.chart_backend_menu = ctk.CTkOptionMenu(self.stats_controls_frame, variable=self.chart_backend_var, values=list(CHART_BACKENDS), command=self._on_chart_backend_change, width=120, fg_color=COLOR_BUTTON_SECONDARY, button_color=COLOR_BUTTON_SECONDARY, button_hover_color=COLOR_BUTTON_HOVER_SECONDARY)
         
         self.stats_text_display_frame = ctk.CTkScrollableFrame(self.stats_main_frame_container, fg_color=COLOR_FRAME_BG)
         self.stats_text_display_frame.pack(fill="both", expand=True, padx=5, pady=(0,5)) 
         
         self.stats_charts_display_frame = ctk.CTkFrame(self.stats_main_frame_container, fg_color=COLOR_FRAME_BG) 
+        self._chart_renderer = None
+        self._graficos_tabview = None
+        self._graficos_abas = {}
+        self._graficos_especificacoes = {}
+        self._graficos_renderizados = {}
         
         self._build_text_stats_layout() 
-        self.carregar_estatisticas_view() 
 
     def _build_text_stats_layout(self): 
         for widget in self.stats_text_display_frame.winfo_children(): widget.destroy()
@@ -1132,12 +3544,17 @@ class DBDTrackerApp(ctk.CTk):
         ctk.CTkLabel(self.stats_text_display_frame, text="Por Assassino", font=ctk.CTkFont(size=16, weight="bold"), text_color=COLOR_TEXT).pack(pady=(15,5), padx=5, anchor="nw")
         self.killer_stats_display_frame = ctk.CTkScrollableFrame(self.stats_text_display_frame, fg_color=COLOR_FRAME_BG, height=200, border_color="gray30", border_width=1)
         self.killer_stats_display_frame.pack(pady=5, padx=5, fill="x", anchor="nw")
+        self._killer_cards = StatCardGrid(self.killer_stats_display_frame, self._criar_card_killer, self._atualizar_card_killer, "Nenhuma partida registrada.", ao_carregar_mais=lambda: self._carregar_mais_cards("killers"))
         
         teammate_stats_outer_frame = ctk.CTkFrame(self.stats_text_display_frame, fg_color="transparent")
         teammate_stats_outer_frame.pack(pady=10, padx=5, fill="x", anchor="nw")
         ctk.CTkLabel(teammate_stats_outer_frame, text="Estatísticas de Companheiro(a)s", font=ctk.CTkFont(size=16, weight="bold"), text_color=COLOR_TEXT).pack(anchor="w", pady=(0,5))
         self.teammate_cards_display_frame = ctk.CTkScrollableFrame(teammate_stats_outer_frame, fg_color=COLOR_FRAME_BG, height=150, border_color="gray30", border_width=1) 
         self.teammate_cards_display_frame.pack(fill="x", expand=True, pady=(0,5))
+        self._teammate_cards = StatCardGrid(self.teammate_cards_display_frame, self._criar_card_teammate, self._atualizar_card_teammate, "Nenhuma partida com companheiro(a)s registrada.", ao_carregar_mais=lambda: self._carregar_mais_cards("teammates"))
+        self._grades_cards = {"killers": self._killer_cards, "teammates": self._teammate_cards}
+        self._ranking_itens = {"killers": [], "teammates": []}
+        self._cards_limite = {"killers": STATS_CARDS_PAGE_SIZE, "teammates": STATS_CARDS_PAGE_SIZE}
         
         self.jhones_stats_frame = ctk.CTkFrame(self.stats_text_display_frame, fg_color="transparent") 
         ctk.CTkLabel(self.jhones_stats_frame, text="Estatísticas 'Jhones Sedex'", font=ctk.CTkFont(size=16, weight="bold"), text_color=COLOR_TEXT).pack(anchor="w", pady=(0,5))
@@ -1167,10 +3584,65 @@ class DBDTrackerApp(ctk.CTk):
         self.insights_text_area.pack(fill="x", expand=True); self.insights_text_area.insert("end", "Nenhum insight disponível no momento."); self.insights_text_area.configure(state="disabled")
 
 
-    def carregar_estatisticas_view(self): 
+    def _criar_card_killer(self, parent, killer_name):
+        card = ctk.CTkFrame(parent, fg_color=COLOR_FRAME_BG, border_width=1, border_color="gray30", corner_radius=8)
+        top_frame = ctk.CTkFrame(card, fg_color="transparent"); top_frame.pack(fill="x", padx=8, pady=(8,0))
+        image_name_base = killer_name.replace(" ", "_").replace(":", "")
+        ctk_image = self._load_image(image_name_base, PORTRAIT_SIZE_STATS, is_killer_portrait=True)
+        if ctk_image:
+            img_label = ctk.CTkLabel(top_frame, image=ctk_image, text="", fg_color="transparent"); img_label.pack(side="left", padx=(0,8))
+            self._image_cache.fixar(ctk_image, img_label)
+        else:
+            img_label = ctk.CTkLabel(top_frame, text="[S/I]", width=PORTRAIT_SIZE_STATS[0], height=PORTRAIT_SIZE_STATS[1], fg_color="gray20"); img_label.pack(side="left", padx=(0,8))
+        ctk.CTkLabel(top_frame, text=killer_name, font=ctk.CTkFont(size=14, weight="bold"), text_color=COLOR_TEXT).pack(side="left", anchor="w")
+        info_label = ctk.CTkLabel(card, text="", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUBTLE); info_label.pack(padx=8, pady=2, anchor="w")
+        progress_bar = ctk.CTkProgressBar(card, width=180, height=10, fg_color=COLOR_BACKGROUND, border_color="gray40", border_width=1)
+        progress_bar.pack(padx=8, pady=(0,8), fill="x")
+        return {"frame": card, "info_label": info_label, "progress_bar": progress_bar}
+
+    def _atualizar_card_killer(self, card, dados):
+        partidas, taxa_sobrev_killer = dados
+        card["info_label"].configure(text=f"{partidas} partida(s) – {taxa_sobrev_killer:.1f}% de escape")
+        card["progress_bar"].set(taxa_sobrev_killer / 100 if taxa_sobrev_killer else 0)
+        card["progress_bar"].configure(progress_color=_cor_barra_progresso(taxa_sobrev_killer))
+
+    def _criar_card_teammate(self, parent, nick):
+        card = ctk.CTkFrame(parent, fg_color=COLOR_FRAME_BG, border_width=1, border_color="gray30", corner_radius=8)
+        ctk.CTkLabel(card, text=nick, font=ctk.CTkFont(size=14, weight="bold"), text_color=COLOR_TEXT).pack(padx=8, pady=(8,2), anchor="w")
+        info_label = ctk.CTkLabel(card, text="", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUBTLE); info_label.pack(padx=8, pady=2, anchor="w")
+        progress_bar = ctk.CTkProgressBar(card, width=180, height=10, fg_color=COLOR_BACKGROUND, border_color="gray40", border_width=1)
+        progress_bar.pack(padx=8, pady=(0,8), fill="x")
+        return {"frame": card, "info_label": info_label, "progress_bar": progress_bar}
+
+    def _atualizar_card_teammate(self, card, dados):
+        partidas, taxa_escape = dados
+        card["info_label"].configure(text=f"{partidas} {_formatar_contagem_vezes(partidas)} juntos – {taxa_escape:.1f}% de escape")
+        card["progress_bar"].set(taxa_escape / 100 if taxa_escape else 0)
+        card["progress_bar"].configure(progress_color=_cor_barra_progresso(taxa_escape))
+
+    def _aplicar_ranking_cards(self, tipo, linhas, tem_mais):
+        self._ranking_itens[tipo] = list(linhas)
+        self._grades_cards[tipo].reconciliar([(nome, (partidas, taxa)) for nome, partidas, taxa in linhas])
+        self._grades_cards[tipo].definir_tem_mais(tem_mais)
+
+    def _carregar_mais_cards(self, tipo):
+        # Só a próxima página (LIMIT/OFFSET) é buscada; os cards já exibidos ficam como estão.
+        def _concluir(resultado):
+            linhas, tem_mais = resultado
+            exibidos = {linha[0] for linha in self._ranking_itens[tipo]}
+            linhas = self._ranking_itens[tipo] + [linha for linha in linhas if linha[0] not in exibidos]
+            self._cards_limite[tipo] = max(STATS_CARDS_PAGE_SIZE, len(linhas))
+            self._aplicar_ranking_cards(tipo, linhas, tem_mais)
+        self._grades_cards[tipo].definir_carregando()
+        self._executar_em_segundo_plano(f"Estatísticas:{tipo}", buscar_ranking_estatisticas, args=(tipo, STATS_CARDS_PAGE_SIZE, len(self._ranking_itens[tipo])), on_done=_concluir, on_error=lambda e: self._grades_cards[tipo].definir_tem_mais(True))
+
+    def carregar_estatisticas_view(self, stats=None): 
+        if stats is None:
+            for tipo in self._grades_cards: self._db_worker.cancel_group(f"Estatísticas:{tipo}")
+            self._executar_em_segundo_plano("Estatísticas", obter_estatisticas_com_rankings, args=(self._cards_limite["killers"], self._cards_limite["teammates"]), on_done=self.carregar_estatisticas_view, indicador_em=self.stats_main_frame_container, texto_indicador="Calculando estatísticas...")
+            return
+        self._paginas_desatualizadas.discard("Estatísticas")
         try:
-            stats = calcular_estatisticas_gerais()
-            self._image_references.clear()
             self.total_partidas_label.configure(text=f"Total de Partidas Jogadas: {stats['total_partidas']}")
             self.escapes_totais_label.configure(text=f"Total de partidas com escape: {stats['escapes_totais']}") 
             total_sacrificios = stats['total_partidas'] - stats['escapes_totais']
@@ -1200,66 +3672,8 @@ class DBDTrackerApp(ctk.CTk):
                 else:
                     self.mode_stats_labels[mode].configure(text=f"Partidas no modo {mode}: 0\t\t0.00% de vezes escapada.")
             
-            for widget in self.killer_stats_display_frame.winfo_children(): widget.destroy()
-            if stats["partidas_por_killer"]:
-                sorted_killers = sorted(stats["partidas_por_killer"].items(), key=lambda item: (-item[1], item[0]))
-                cols_killer_cards = 2; row_k, col_k = 0,0
-                killer_cards_parent_frame = ctk.CTkFrame(self.killer_stats_display_frame, fg_color="transparent") 
-                killer_cards_parent_frame.pack(fill="x")
-
-                for killer_name, partidas in sorted_killers:
-                    card = ctk.CTkFrame(killer_cards_parent_frame, fg_color=COLOR_FRAME_BG, border_width=1, border_color="gray30", corner_radius=8)
-                    card.grid(row=row_k, column=col_k, padx=5, pady=5, sticky="nsew")
-                    killer_cards_parent_frame.grid_columnconfigure(col_k % cols_killer_cards, weight=1) 
-
-                    top_frame = ctk.CTkFrame(card, fg_color="transparent"); top_frame.pack(fill="x", padx=8, pady=(8,0))
-                    image_name_base = killer_name.replace(" ", "_").replace(":", "")
-                    ctk_image = self._load_image(image_name_base, PORTRAIT_SIZE_STATS, is_killer_portrait=True)
-                    if ctk_image:
-                        img_label = ctk.CTkLabel(top_frame, image=ctk_image, text="", fg_color="transparent"); img_label.pack(side="left", padx=(0,8))
-                    else:
-                        img_label = ctk.CTkLabel(top_frame, text="[S/I]", width=PORTRAIT_SIZE_STATS[0], height=PORTRAIT_SIZE_STATS[1], fg_color="gray20"); img_label.pack(side="left", padx=(0,8))
-                    ctk.CTkLabel(top_frame, text=killer_name, font=ctk.CTkFont(size=14, weight="bold"), text_color=COLOR_TEXT).pack(side="left", anchor="w")
-                    taxa_sobrev_killer = stats["sobrevivencia_por_killer"].get(killer_name, 0.0)
-                    ctk.CTkLabel(card, text=f"{partidas} partida(s) – {taxa_sobrev_killer:.1f}% de escape", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUBTLE).pack(padx=8, pady=2, anchor="w")
-                    progress_bar = ctk.CTkProgressBar(card, width=180, height=10, fg_color=COLOR_BACKGROUND, border_color="gray40", border_width=1)
-                    progress_bar.set(taxa_sobrev_killer / 100 if taxa_sobrev_killer else 0)
-                    if taxa_sobrev_killer >= 60: progress_bar.configure(progress_color=COLOR_PROGRESS_GREEN)
-                    elif taxa_sobrev_killer >= 30: progress_bar.configure(progress_color=COLOR_PROGRESS_ORANGE)
-                    else: progress_bar.configure(progress_color=COLOR_PROGRESS_RED_BAR)
-                    progress_bar.pack(padx=8, pady=(0,8), fill="x")
-                    col_k += 1
-                    if col_k >= cols_killer_cards: col_k = 0; row_k += 1
-                for i in range(cols_killer_cards): 
-                    killer_cards_parent_frame.grid_columnconfigure(i, weight=1)
-            else: ctk.CTkLabel(self.killer_stats_display_frame, text="Nenhuma partida registrada.", text_color=COLOR_TEXT).pack()
-            
-            for widget in self.teammate_cards_display_frame.winfo_children(): widget.destroy()
-            if stats["sobrevivencia_com_teammate"]:
-                sorted_teammates = sorted(stats["sobrevivencia_com_teammate"].items(), key=lambda item: -item[1]["partidas"])
-                cols_teammate_cards = 2; row_t, col_t = 0,0
-                teammate_cards_parent = ctk.CTkFrame(self.teammate_cards_display_frame, fg_color="transparent")
-                teammate_cards_parent.pack(fill="x")
-                for nick, data in sorted_teammates:
-                    card = ctk.CTkFrame(teammate_cards_parent, fg_color=COLOR_FRAME_BG, border_width=1, border_color="gray30", corner_radius=8)
-                    card.grid(row=row_t, column=col_t, padx=5, pady=5, sticky="nsew")
-                    teammate_cards_parent.grid_columnconfigure(col_t % cols_teammate_cards, weight=1)
-                    
-                    ctk.CTkLabel(card, text=nick, font=ctk.CTkFont(size=14, weight="bold"), text_color=COLOR_TEXT).pack(padx=8, pady=(8,2), anchor="w")
-                    ctk.CTkLabel(card, text=f"{data['partidas']} {_formatar_contagem_vezes(data['partidas'])} juntos – {data['taxa_escape']:.1f}% de escape", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUBTLE).pack(padx=8, pady=2, anchor="w")
-                    
-                    progress_bar_teammate = ctk.CTkProgressBar(card, width=180, height=10, fg_color=COLOR_BACKGROUND, border_color="gray40", border_width=1)
-                    progress_bar_teammate.set(data['taxa_escape'] / 100 if data['taxa_escape'] else 0)
-                    if data['taxa_escape'] >= 60: progress_bar_teammate.configure(progress_color=COLOR_PROGRESS_GREEN)
-                    elif data['taxa_escape'] >=30: progress_bar_teammate.configure(progress_color=COLOR_PROGRESS_ORANGE)
-                    else: progress_bar_teammate.configure(progress_color=COLOR_PROGRESS_RED_BAR)
-                    progress_bar_teammate.pack(padx=8, pady=(0,8), fill="x")
-                    col_t += 1
-                    if col_t >= cols_teammate_cards: col_t = 0; row_t +=1
-                for i in range(cols_teammate_cards): 
-                    teammate_cards_parent.grid_columnconfigure(i, weight=1)
-            else:
-                ctk.CTkLabel(self.teammate_cards_display_frame, text="Nenhuma partida com companheiro(a)s registrada.", text_color=COLOR_TEXT).pack()
+            self._aplicar_ranking_cards("killers", *stats["ranking_killers"])
+            self._aplicar_ranking_cards("teammates", *stats["ranking_teammates"])
 
             if stats["partidas_com_jhones_respondido"] > 0:
                 self.jhones_sedex_stats_label.configure(text=f"Sim: {stats['jhones_sedex_sim']} / Não: {stats['jhones_sedex_nao']}")
@@ -1372,11 +3786,14 @@ class DBDTrackerApp(ctk.CTk):
             
             if hasattr(self, 'view_mode_button') and self.view_mode_button.winfo_exists():
                 self.view_mode_button.configure(text="Ver Gráficos")
+            if hasattr(self, 'chart_backend_menu') and self.chart_backend_menu.winfo_exists():
+                self.chart_backend_menu.pack_forget()
         except Exception as e:
             _log_error(f"Erro em show_text_stats_view: {e}\n{traceback.format_exc()}", "ganchometro_stats_error_log.txt")
 
 
     def show_charts_view(self):
+        if not self.chart_backend_menu.winfo_ismapped(): self.chart_backend_menu.pack(side="left", padx=(0,10))
         if self.stats_text_display_frame.winfo_ismapped(): 
             self.stats_text_display_frame.pack_forget()
         if not self.stats_charts_display_frame.winfo_ismapped():
@@ -1384,161 +3801,78 @@ class DBDTrackerApp(ctk.CTk):
         self.view_mode_button.configure(text="Ver Texto")
         self._populate_charts_frame()
 
-    def _populate_charts_frame(self):
+    def _populate_charts_frame(self, stats=None):
+        if stats is None:
+            self._executar_em_segundo_plano("Estatísticas", obter_estatisticas_para_graficos, on_done=self._populate_charts_frame, indicador_em=self.stats_main_frame_container, texto_indicador="Gerando gráficos...")
+            return
         try:
-            for widget in self.stats_charts_display_frame.winfo_children(): widget.destroy()
-            stats = calcular_estatisticas_gerais()
+            if self._graficos_tabview is None: self._criar_abas_graficos()
+            self._graficos_especificacoes = _especificacoes_graficos(stats)
             if not stats["total_partidas"]:
-                ctk.CTkLabel(self.stats_charts_display_frame, text="Não há dados suficientes para gerar gráficos.", font=ctk.CTkFont(size=16), text_color=COLOR_TEXT).pack(expand=True); return
-            
-            charts_internal_tab_view = ctk.CTkTabview(self.stats_charts_display_frame, fg_color=COLOR_FRAME_BG, segmented_button_selected_color=COLOR_PRIMARY_RED, text_color=COLOR_TEXT, border_color=COLOR_FRAME_BG, border_width=0)
-            charts_internal_tab_view.pack(fill="both", expand=True, padx=0, pady=0)
-            
-            def _criar_grafico_barras_horizontais(master_tab, dados, titulo, cor_barra=COLOR_SECONDARY_RED, top_n=5):
-                if not dados:
-                    ctk.CTkLabel(master_tab, text="Sem dados suficientes para este gráfico.", text_color=COLOR_TEXT).pack(expand=True)
-                    return
-                
-                nomes = [item[0] for item in dados[:top_n]]
-                contagens = [item[1] for item in dados[:top_n]]
-                
-                if not nomes: 
-                    ctk.CTkLabel(master_tab, text="Sem dados suficientes para este gráfico.", text_color=COLOR_TEXT).pack(expand=True)
-                    return
-
-                plt.style.use('dark_background')
-                fig, ax = plt.subplots(figsize=(7, max(3, len(nomes) * 0.6))) 
-                bars = ax.barh(nomes, contagens, color=cor_barra, edgecolor=COLOR_TEXT)
-                ax.set_xlabel('Contagem', color=COLOR_TEXT, fontsize=10)
-                ax.set_title(titulo, color=COLOR_TEXT, fontsize=12)
-                ax.tick_params(axis='x', colors=COLOR_TEXT, labelsize=9)
-                ax.tick_params(axis='y', colors=COLOR_TEXT, labelsize=9)
-                ax.xaxis.set_major_locator(MaxNLocator(integer=True, nbins=5, prune='both'))
-                fig.patch.set_facecolor(COLOR_BACKGROUND)
-                ax.set_facecolor(COLOR_FRAME_BG)
-                ax.invert_yaxis() 
-
-                for bar in bars:
-                    width = bar.get_width()
-                    ax.text(width + 0.1, bar.get_y() + bar.get_height()/2, f'{width}', ha='left', va='center', color=COLOR_TEXT, fontsize=8)
-                
-                plt.tight_layout(pad=1.5)
-                canvas = FigureCanvasTkAgg(fig, master=master_tab)
-                canvas.get_tk_widget().pack(fill="both", expand=True)
-                canvas.draw()
-                plt.close(fig)
-
-            tab_killer = charts_internal_tab_view.add("Por Assassino")
-            if stats["partidas_por_killer"]:
-                partidas_por_killer_sorted = sorted(stats["partidas_por_killer"].items(), key=lambda item: item[1], reverse=True)[:10]
-                killers_top = [item[0] for item in partidas_por_killer_sorted]
-                survival_rates_top = [stats["sobrevivencia_por_killer"].get(k, 0) for k in killers_top]
-                num_matches_top = [stats["partidas_por_killer"].get(k,0) for k in killers_top]
-                if killers_top:
-                    plt.style.use('dark_background'); fig1, ax1 = plt.subplots(figsize=(8, 5.5));
-                    bars1 = ax1.bar(killers_top, survival_rates_top, color=COLOR_SECONDARY_RED, edgecolor=COLOR_TEXT, width=0.6)
-                    ax1.set_ylabel('Taxa de Sobrevivência (%)', color=COLOR_TEXT, fontsize=10); ax1.set_title('Top Assassinos vs Taxa de Sobrevivência', color=COLOR_TEXT, fontsize=12)
-                    ax1.set_xticks(range(len(killers_top)))
-                    ax1.set_xticklabels(killers_top, rotation=45, ha="right", color=COLOR_TEXT, fontsize=9)
-                    ax1.tick_params(axis='y', colors=COLOR_TEXT, labelsize=9)
-                    ax1.yaxis.set_major_locator(MaxNLocator(integer=True, nbins=5, prune='both')); ax1.set_ylim(0, 100)
-                    fig1.patch.set_facecolor(COLOR_BACKGROUND); ax1.set_facecolor(COLOR_FRAME_BG)
-                    for i, bar in enumerate(bars1):
-                        yval = bar.get_height(); text_y_pos = yval / 2 if yval > 20 else yval + 3
-                        text_color_bar = 'white' if yval > 20 else COLOR_TEXT
-                        va_align = 'center' if yval > 20 else 'bottom'
-                        ax1.text(bar.get_x() + bar.get_width()/2.0, text_y_pos, f"{num_matches_top[i]}p\n{yval:.0f}%", ha='center', va=va_align, fontsize=7, color=text_color_bar, weight='bold')
-                    plt.tight_layout(pad=2.0); canvas1 = FigureCanvasTkAgg(fig1, master=tab_killer); canvas1.get_tk_widget().pack(fill="both", expand=True); canvas1.draw(); plt.close(fig1)
-                else: ctk.CTkLabel(tab_killer, text="Sem dados suficientes.", text_color=COLOR_TEXT).pack()
-            else: ctk.CTkLabel(tab_killer, text="Sem dados de partidas por assassino.", text_color=COLOR_TEXT).pack()
-
-            tab_modo = charts_internal_tab_view.add("Por 'Jogando'")
-            if stats["partidas_por_modo"]:
-                modes, counts = [], []
-                for mode_name in GAME_MODES:
-                    if mode_name in stats["partidas_por_modo"] and stats["partidas_por_modo"][mode_name] > 0:
-                        modes.append(mode_name); counts.append(stats["partidas_por_modo"][mode_name])
-                if modes and counts:
-                    plt.style.use('dark_background'); fig2, ax2 = plt.subplots(figsize=(7, 5));
-                    pie_colors = [COLOR_SECONDARY_RED, "#5A0000", "#C04000", "#777777"];
-                    wedges, texts, autotexts = ax2.pie(counts, labels=modes, autopct='%1.1f%%', startangle=90, colors=pie_colors[:len(modes)], textprops={'color': COLOR_TEXT, 'fontsize':10,'weight':'bold'})
-                    for autotext in autotexts: autotext.set_color('white'); autotext.set_fontsize(9)
-                    ax2.axis('equal'); ax2.set_title("Distribuição de Partidas por 'Jogando'", color=COLOR_TEXT, fontsize=12)
-                    fig2.patch.set_facecolor(COLOR_BACKGROUND); plt.tight_layout(pad=1.5); canvas2 = FigureCanvasTkAgg(fig2, master=tab_modo); canvas2.get_tk_widget().pack(fill="both", expand=True); canvas2.draw(); plt.close(fig2)
-                else: ctk.CTkLabel(tab_modo, text="Sem dados suficientes (modos com 0 partidas não são exibidos).", text_color=COLOR_TEXT).pack()
-            else: ctk.CTkLabel(tab_modo, text="Sem dados de partidas por modo de jogo.", text_color=COLOR_TEXT).pack()
-
-            tab_mapas = charts_internal_tab_view.add("Mapas mais jogados") 
-            mapas_ordenados = sorted(stats["jogos_por_mapa"].items(), key=lambda item: item[1], reverse=True)
-            _criar_grafico_barras_horizontais(tab_mapas, mapas_ordenados, "Top Mapas Mais Jogados", COLOR_PROGRESS_GREEN)
-
-            tab_itens_levados = charts_internal_tab_view.add("Itens Mais Levados")
-            itens_levados_ordenados = sorted(stats["itens_levados_count"].items(), key=lambda item: item[1], reverse=True)
-            _criar_grafico_barras_horizontais(tab_itens_levados, itens_levados_ordenados, "Top Itens Mais Levados", COLOR_PROGRESS_ORANGE)
-            
-            tab_itens_perdidos = charts_internal_tab_view.add("Itens Mais Perdidos")
-            itens_perdidos_ordenados = sorted(stats["itens_perdidos_count"].items(), key=lambda item: item[1], reverse=True)
-            _criar_grafico_barras_horizontais(tab_itens_perdidos, itens_perdidos_ordenados, "Top Itens Mais Perdidos", COLOR_PROGRESS_RED_BAR)
-
-            tab_companheiros = charts_internal_tab_view.add("Sobrev. c/ Companheiros")
-            if stats["sobrevivencia_com_teammate"]:
-                dados_companheiros = []
-                for nick, data in stats["sobrevivencia_com_teammate"].items():
-                    if data["partidas"] > 0 : 
-                        dados_companheiros.append((nick, data["taxa_escape"]))
-                
-                dados_companheiros_sorted = sorted(dados_companheiros, key=lambda item: item[1], reverse=True)[:10] 
-                
-                if dados_companheiros_sorted:
-                    nomes_comp = [item[0] for item in dados_companheiros_sorted]
-                    taxas_comp = [item[1] for item in dados_companheiros_sorted]
-                    
-                    plt.style.use('dark_background'); fig_comp, ax_comp = plt.subplots(figsize=(8, max(3, len(nomes_comp) * 0.5)))
-                    bars_comp = ax_comp.barh(nomes_comp, taxas_comp, color=COLOR_PROGRESS_GREEN, edgecolor=COLOR_TEXT)
-                    ax_comp.set_xlabel('Taxa de Escape (%)', color=COLOR_TEXT, fontsize=10)
-                    ax_comp.set_title('Taxa de Escape com Companheiros', color=COLOR_TEXT, fontsize=12)
-                    ax_comp.tick_params(axis='x', colors=COLOR_TEXT, labelsize=9)
-                    ax_comp.tick_params(axis='y', colors=COLOR_TEXT, labelsize=9)
-                    ax_comp.set_xlim(0, 100)
-                    ax_comp.xaxis.set_major_locator(MaxNLocator(integer=True, nbins=5, prune='both'))
-                    fig_comp.patch.set_facecolor(COLOR_BACKGROUND); ax_comp.set_facecolor(COLOR_FRAME_BG)
-                    ax_comp.invert_yaxis()
-                    for bar in bars_comp:
-                        width = bar.get_width()
-                        ax_comp.text(width + 1, bar.get_y() + bar.get_height()/2, f'{width:.1f}%', ha='left', va='center', color=COLOR_TEXT, fontsize=8)
-                    plt.tight_layout(pad=1.5)
-                    canvas_comp = FigureCanvasTkAgg(fig_comp, master=tab_companheiros)
-                    canvas_comp.get_tk_widget().pack(fill="both", expand=True); canvas_comp.draw(); plt.close(fig_comp)
-                else:
-                    ctk.CTkLabel(tab_companheiros, text="Sem dados suficientes para este gráfico.", text_color=COLOR_TEXT).pack(expand=True)
-            else:
-                ctk.CTkLabel(tab_companheiros, text="Sem dados de partidas com companheiros.", text_color=COLOR_TEXT).pack(expand=True)
-
-            tab_jhones = charts_internal_tab_view.add("Jhones Sedex")
-            if stats["partidas_com_jhones_respondido"] > 0:
-                labels_jhones = ['Sim', 'Não']
-                sizes_jhones = [stats["jhones_sedex_sim"], stats["jhones_sedex_nao"]]
-                colors_jhones = [COLOR_PROGRESS_GREEN, COLOR_PROGRESS_RED_BAR]
-                
-                if stats["jhones_sedex_sim"] > 0 or stats["jhones_sedex_nao"] > 0:
-                    plt.style.use('dark_background'); fig_j, ax_j = plt.subplots(figsize=(6, 4))
-                    wedges_j, texts_j, autotexts_j = ax_j.pie(sizes_jhones, labels=labels_jhones, autopct='%1.1f%%', startangle=90, colors=colors_jhones, textprops={'color': COLOR_TEXT, 'weight':'bold'})
-                    for autotext in autotexts_j: autotext.set_color('white')
-                    ax_j.axis('equal'); ax_j.set_title("Jhones deu Sedex?", color=COLOR_TEXT, fontsize=12)
-                    fig_j.patch.set_facecolor(COLOR_BACKGROUND)
-                    plt.tight_layout(pad=1.0); canvas_j = FigureCanvasTkAgg(fig_j, master=tab_jhones)
-                    canvas_j.get_tk_widget().pack(fill="both", expand=True); canvas_j.draw(); plt.close(fig_j)
-                else:
-                     ctk.CTkLabel(tab_jhones, text="Sem dados de 'Sim' ou 'Não' para o Jhones Sedex.", text_color=COLOR_TEXT).pack(expand=True)
-            else:
-                ctk.CTkLabel(tab_jhones, text="Nenhuma partida com informação 'Jhones Sedex' registrada.", text_color=COLOR_TEXT).pack(expand=True)
-
+                self._graficos_tabview.pack_forget()
+                self._graficos_sem_dados_label.pack(expand=True)
+                return
+            self._graficos_sem_dados_label.pack_forget()
+            if not self._graficos_tabview.winfo_ismapped(): self._graficos_tabview.pack(fill="both", expand=True, padx=0, pady=0)
+            # Só a aba visível é desenhada agora; as outras ficam com a especificação nova e são desenhadas ao serem selecionadas.
+            self._renderizar_aba_grafico(self._graficos_tabview.get())
         except Exception as e:
             error_details = f"Erro ao popular gráficos de estatísticas: {e}\n{traceback.format_exc()}"
             _log_error(error_details, "ganchometro_stats_error_log.txt")
             messagebox.showerror("Erro nos Gráficos", f"Falha ao gerar os gráficos. Verifique o log 'ganchometro_stats_error_log.txt'.\nDetalhe: {e}")
-            ctk.CTkLabel(self.stats_charts_display_frame, text=f"Erro ao gerar gráficos: {e}", text_color="orange", wraplength=self.stats_charts_display_frame.winfo_width()-20).pack(expand=True, fill="both")
 
+    def _criar_abas_graficos(self):
+        self._graficos_sem_dados_label = ctk.CTkLabel(self.stats_charts_display_frame, text="Não há dados suficientes para gerar gráficos.", font=ctk.CTkFont(size=16), text_color=COLOR_TEXT)
+        self._graficos_tabview = ctk.CTkTabview(self.stats_charts_display_frame, fg_color=COLOR_FRAME_BG, segmented_button_selected_color=COLOR_PRIMARY_RED, text_color=COLOR_TEXT, border_color=COLOR_FRAME_BG, border_width=0, command=self._on_chart_tab_change)
+        for nome_aba in ABAS_GRAFICOS:
+            aba = self._graficos_tabview.add(nome_aba)
+            self._graficos_abas[nome_aba] = {"frame": aba, "mensagem": ctk.CTkLabel(aba, text="", text_color=COLOR_TEXT), "grafico": None}
+
+    def _on_chart_tab_change(self):
+        self._renderizar_aba_grafico(self._graficos_tabview.get())
+
+    def _criar_renderizador_graficos(self):
+        backend = self.chart_backend_var.get()
+        try:
+            return CHART_BACKENDS.get(backend, CHART_BACKENDS[CHART_BACKEND_PADRAO])()
+        except ImportError as e:
+            # matplotlib é opcional: sem ele, os gráficos continuam com o renderizador simples.
+            print(f"Backend de gráficos '{backend}' indisponível: {e}")
+            _log_error(f"Backend de gráficos '{backend}' indisponível, usando '{CHART_BACKEND_PADRAO}': {e}", "ganchometro_stats_error_log.txt")
+            self.chart_backend_var.set(CHART_BACKEND_PADRAO)
+            return CHART_BACKENDS[CHART_BACKEND_PADRAO]()
+
+    def _on_chart_backend_change(self, backend):
+        if self._chart_renderer is not None and isinstance(self._chart_renderer, CHART_BACKENDS.get(backend, type(None))): return
+        for aba in self._graficos_abas.values():
+            if aba["grafico"] is not None:
+                aba["grafico"]["widget"].destroy()
+                aba["grafico"] = None
+        self._chart_renderer = None
+        self._graficos_renderizados.clear()
+        if self._graficos_tabview is not None and self._graficos_especificacoes:
+            self._renderizar_aba_grafico(self._graficos_tabview.get())
+
+    def _renderizar_aba_grafico(self, nome_aba):
+        spec = self._graficos_especificacoes.get(nome_aba)
+        if spec is None or self._graficos_renderizados.get(nome_aba) == spec: return
+        try:
+            aba = self._graficos_abas[nome_aba]
+            if "mensagem" in spec:
+                if aba["grafico"] is not None: aba["grafico"]["widget"].pack_forget()
+                aba["mensagem"].configure(text=spec["mensagem"]); aba["mensagem"].pack(expand=True)
+            else:
+                aba["mensagem"].pack_forget()
+                if aba["grafico"] is None:
+                    if self._chart_renderer is None: self._chart_renderer = self._criar_renderizador_graficos()
+                    aba["grafico"] = self._chart_renderer.criar(aba["frame"])
+                if not aba["grafico"]["widget"].winfo_ismapped(): aba["grafico"]["widget"].pack(fill="both", expand=True)
+                self._chart_renderer.desenhar(aba["grafico"], spec)
+            self._graficos_renderizados[nome_aba] = spec
+        except Exception as e:
+            self._graficos_renderizados.pop(nome_aba, None)
+            _log_error(f"Erro ao desenhar o gráfico '{nome_aba}': {e}\n{traceback.format_exc()}", "ganchometro_stats_error_log.txt")
+            messagebox.showerror("Erro nos Gráficos", f"Falha ao gerar o gráfico '{nome_aba}'. Verifique o log 'ganchometro_stats_error_log.txt'.\nDetalhe: {e}")
 
     def criar_aba_gerenciar_dados_content(self, tab_gerenciar_dados): 
         frame = ctk.CTkFrame(tab_gerenciar_dados, fg_color=COLOR_FRAME_BG)
@@ -1549,79 +3883,139 @@ class DBDTrackerApp(ctk.CTk):
         ctk.CTkLabel(frame, text="Exporta todas as partidas para um arquivo JSON.", font=ctk.CTkFont(size=12), text_color="gray60").pack(pady=(0,20), anchor="center")
         import_button = ctk.CTkButton(frame, text="Importar Dados das Partidas", command=self.importar_dados_action, width=250, fg_color=COLOR_BUTTON_PRIMARY, hover_color=COLOR_BUTTON_HOVER_PRIMARY, text_color="#FFFFFF")
         import_button.pack(pady=10, anchor="center")
-        ctk.CTkLabel(frame, text="Importa partidas de um arquivo JSON.", font=ctk.CTkFont(size=12), text_color="gray60", justify="center").pack(pady=(0,10), anchor="center")
+        ctk.CTkLabel(frame, text="Importa partidas de um arquivo JSON.", font=ctk.CTkFont(size=12), text_color="gray60", justify="center").pack(pady=(0,20), anchor="center")
+        self.dados_progress_label = ctk.CTkLabel(frame, text="", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUBTLE)
+        rebuild_stats_button = ctk.CTkButton(frame, text="Reconstruir Estatísticas", command=self.reconstruir_estatisticas_action, width=250, fg_color=COLOR_BUTTON_SECONDARY, hover_color=COLOR_BUTTON_HOVER_SECONDARY, text_color="#FFFFFF")
+        rebuild_stats_button.pack(pady=10, anchor="center")
+        ctk.CTkLabel(frame, text="Recalcula os totais das estatísticas a partir de todas as partidas registradas.", font=ctk.CTkFont(size=12), text_color="gray60", justify="center").pack(pady=(0,10), anchor="center")
+        backup_button = ctk.CTkButton(frame, text="Criar Backup Agora", command=self.criar_backup_action, width=250, fg_color=COLOR_BUTTON_SECONDARY, hover_color=COLOR_BUTTON_HOVER_SECONDARY, text_color="#FFFFFF")
+        backup_button.pack(pady=10, anchor="center")
+        ctk.CTkLabel(frame, text=f"Cópias do banco são feitas automaticamente em '{BACKUP_DIR}' (as {BACKUP_MAX_SNAPSHOTS} mais recentes são mantidas).", font=ctk.CTkFont(size=12), text_color="gray60", wraplength=450, justify="center").pack(pady=(0,10), anchor="center")
+        restore_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        restore_frame.pack(pady=10, anchor="center")
+        self.backup_var = ctk.StringVar()
+        self._backups_por_rotulo = {}
+        self.backup_option_menu = ctk.CTkOptionMenu(restore_frame, variable=self.backup_var, values=["Nenhum backup"], width=180, fg_color=COLOR_BUTTON_SECONDARY, button_color=COLOR_BUTTON_SECONDARY, button_hover_color=COLOR_BUTTON_HOVER_SECONDARY, dropdown_fg_color=COLOR_FRAME_BG, dropdown_hover_color=COLOR_BUTTON_HOVER_SECONDARY, text_color=COLOR_TEXT)
+        self.backup_option_menu.pack(side="left", padx=(0,10))
+        ctk.CTkButton(restore_frame, text="Restaurar Backup", command=self.restaurar_backup_action, width=150, fg_color=COLOR_BUTTON_PRIMARY, hover_color=COLOR_BUTTON_HOVER_PRIMARY, text_color="#FFFFFF").pack(side="left")
+        self._atualizar_lista_backups()
+
+    def _backup_agendado(self):
+        # Verificação periódica: só copia quando o snapshot mais recente passou do intervalo.
+        self.after(BACKUP_VERIFICACAO_MS, self._backup_agendado)
+        if self._db_worker.has_pending("Backup") or not backup_vencido(): return
+        def _falhar(e):
+            print(f"Erro no backup agendado: {e}")
+            _log_error(f"Erro no backup agendado: {e}", "ganchometro_backup_log.txt")
+        self._db_worker.submit(criar_backup, on_done=lambda caminho: self._atualizar_lista_backups(), on_error=_falhar, group="Backup")
+
+    def _rotulo_backup(self, momento):
+        return momento.strftime("%d/%m/%Y %H:%M:%S")
+
+    def _atualizar_lista_backups(self):
+        if not hasattr(self, 'backup_option_menu') or not self.backup_option_menu.winfo_exists(): return
+        self._backups_por_rotulo = {self._rotulo_backup(momento): caminho for caminho, momento in listar_backups()}
+        rotulos = list(self._backups_por_rotulo) or ["Nenhum backup"]
+        self.backup_option_menu.configure(values=rotulos, state="normal" if self._backups_por_rotulo else "disabled")
+        if self.backup_var.get() not in self._backups_por_rotulo: self.backup_var.set(rotulos[0])
+
+    def _progresso_backup(self, verbo):
+        def _atualizar(progresso):
+            copiadas, total = progresso
+            self.dados_progress_label.configure(text=f"{verbo}... {copiadas}/{total} páginas")
+        return _atualizar
+
+    def criar_backup_action(self):
+        if self._db_worker.has_pending("Backup"):
+            messagebox.showinfo("Backup", "Um backup já está em andamento."); return
+        if not self._iniciar_operacao_dados("Criando backup..."): return
+        def _concluir(caminho):
+            self._finalizar_operacao_dados()
+            self._atualizar_lista_backups()
+            messagebox.showinfo("Backup", f"Backup criado em:\n{caminho}")
+        def _falhar(e):
+            self._finalizar_operacao_dados()
+            _log_error(f"Erro ao criar backup: {e}", "ganchometro_backup_log.txt")
+            messagebox.showerror("Erro de Backup", f"Não foi possível criar o backup. Verifique o log 'ganchometro_backup_log.txt'.\nDetalhe: {e}")
+        self._db_worker.submit(criar_backup, on_done=_concluir, on_error=_falhar, on_progress=self._progresso_backup("Copiando"), group="Backup")
+
+    def restaurar_backup_action(self):
+        caminho = getattr(self, '_backups_por_rotulo', {}).get(self.backup_var.get())
+        if not caminho:
+            messagebox.showinfo("Restaurar Backup", "Nenhum backup selecionado."); return
+        if not messagebox.askyesno("Restaurar Backup", f"Substituir todos os dados atuais pelo backup de {self.backup_var.get()}?\nO estado atual será salvo antes como um novo backup."): return
+        if not self._iniciar_operacao_dados("Restaurando backup..."): return
+        def _concluir(caminho_seguranca):
+            self._finalizar_operacao_dados()
+            self._atualizar_lista_backups()
+            self.reset_match_registration()
+            messagebox.showinfo("Restaurar Backup", f"Backup restaurado com sucesso!\nO estado anterior foi salvo em:\n{caminho_seguranca}")
+        def _falhar(e):
+            self._finalizar_operacao_dados()
+            _log_error(f"Erro ao restaurar backup: {e}", "ganchometro_backup_log.txt")
+            messagebox.showerror("Erro de Restauração", f"Não foi possível restaurar o backup. Verifique o log 'ganchometro_backup_log.txt'.\nDetalhe: {e}")
+        self._db_worker.submit(restaurar_backup, args=(caminho,), on_done=_concluir, on_error=_falhar, on_progress=self._progresso_backup("Restaurando"), group="Backup")
+
+    def _iniciar_operacao_dados(self, texto):
+        if self._operacao_dados_em_andamento:
+            messagebox.showinfo("Operação em Andamento", "Aguarde a operação de dados atual terminar.")
+            return False
+        self._operacao_dados_em_andamento = True
+        self.dados_progress_label.configure(text=texto)
+        if not self.dados_progress_label.winfo_ismapped(): self.dados_progress_label.pack(pady=(0,10), anchor="center")
+        return True
+
+    def _finalizar_operacao_dados(self):
+        self._operacao_dados_em_andamento = False
+        self.dados_progress_label.pack_forget()
+
+    def reconstruir_estatisticas_action(self):
+        if not self._iniciar_operacao_dados("Reconstruindo estatísticas..."): return
+        def _concluir(sucesso):
+            self._finalizar_operacao_dados()
+            if sucesso:
+                notificar_partidas_invalidadas()
+                messagebox.showinfo("Reconstruir Estatísticas", "Estatísticas reconstruídas com sucesso!")
+            else:
+                messagebox.showerror("Erro de BD", "Não foi possível reconstruir as estatísticas.\nVerifique o log 'ganchometro_sqlite_errors.txt'.")
+        self._db_worker.submit(reconstruir_estatisticas, on_done=_concluir, on_error=lambda e: _concluir(False))
 
     def exportar_dados_action(self):
-        conn, cursor = conectar_db()
         try:
-            cursor.execute('''
-                SELECT m.id, m.match_date, k.name AS killer_name, mp.name AS map_name, iu.name AS item_used_name, ig.name AS item_gained_name,
-                       il.name AS item_lost_name, m.escaped, m.survivors_escaped, m.game_mode, m.notes, m.jhones_sedex
-                FROM matches m LEFT JOIN killers k ON m.killer_id = k.id LEFT JOIN maps mp ON m.map_id = mp.id
-                LEFT JOIN items iu ON m.item_used_id = iu.id LEFT JOIN items ig ON m.item_gained_id = ig.id
-                LEFT JOIN items il ON m.item_lost_id = il.id ORDER BY m.match_date ASC
-            ''')
-            column_names = [desc[0] for desc in cursor.description]
-            all_matches_data = [dict(zip(column_names, row)) for row in cursor.fetchall()]
-            if not all_matches_data: messagebox.showinfo("Exportar Dados", "Nenhuma partida para exportar."); return
-            for match_data in all_matches_data:
-                cursor.execute('SELECT t.nickname FROM teammates t JOIN match_teammates mt ON t.id = mt.teammate_id WHERE mt.match_id = ?', (match_data['id'],))
-                match_data['teammates_nicks'] = [row[0] for row in cursor.fetchall()]; del match_data['id']
-            filepath = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json"), ("All files", "*.*")], title="Salvar Dados como...")
-            if filepath:
-                with open(filepath, 'w', encoding='utf-8') as f: json.dump(all_matches_data, f, ensure_ascii=False, indent=4)
-                messagebox.showinfo("Exportar Dados", f"Dados exportados para:\n{filepath}")
-        except Exception as e: 
-            error_details = f"Erro ao exportar dados: {e}\n{traceback.format_exc()}"
-            _log_error(error_details, "ganchometro_export_error.txt")
+            with db_leitura() as (conn, cursor):
+                cursor.execute("SELECT 1 FROM matches LIMIT 1")
+                if cursor.fetchone() is None: messagebox.showinfo("Exportar Dados", "Nenhuma partida para exportar."); return
+        except sqlite3.Error as e:
+            _log_error(f"Erro ao exportar dados: {e}\n{traceback.format_exc()}", "ganchometro_export_error.txt")
+            messagebox.showerror("Erro de Exportação", f"Ocorreu um erro. Verifique o log 'ganchometro_export_error.txt'.\nDetalhe: {e}"); return
+        filepath = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json"), ("NDJSON files", "*.ndjson"), ("NDJSON compactado", "*.ndjson.gz"), ("All files", "*.*")], title="Salvar Dados como...")
+        if not filepath or not self._iniciar_operacao_dados("Exportando partidas..."): return
+        def _concluir(total):
+            self._finalizar_operacao_dados()
+            messagebox.showinfo("Exportar Dados", f"{total} partidas exportadas para:\n{filepath}")
+        def _falhar(e):
+            self._finalizar_operacao_dados()
+            _log_error(f"Erro ao exportar dados: {e}", "ganchometro_export_error.txt")
             messagebox.showerror("Erro de Exportação", f"Ocorreu um erro. Verifique o log 'ganchometro_export_error.txt'.\nDetalhe: {e}")
-        finally: 
-            if conn:
-                conn.close()
+        self._db_worker.submit(exportar_partidas, args=(filepath,), on_done=_concluir, on_error=_falhar)
 
     def importar_dados_action(self):
-        filepath = filedialog.askopenfilename(filetypes=[("JSON files", "*.json"), ("All files", "*.*")], title="Abrir Arquivo de Dados...")
-        if not filepath: return
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f: partidas_importadas = json.load(f)
-        except Exception as e: 
-            error_details = f"Erro ao ler arquivo de importação: {e}\n{traceback.format_exc()}"
-            _log_error(error_details, "ganchometro_import_error.txt")
-            messagebox.showerror("Erro de Importação", f"Não foi possível ler o arquivo. Verifique o log 'ganchometro_import_error.txt'.\nDetalhe: {e}"); return
-        if not isinstance(partidas_importadas, list): 
-            _log_error(f"Formato de arquivo de importação inválido. Esperado: lista JSON. Recebido: {type(partidas_importadas)}", "ganchometro_import_error.txt")
-            messagebox.showerror("Erro de Importação", "Formato de arquivo inválido."); return
-        
-        conn, cursor = conectar_db()
-        importadas_count, puladas_count, erros_count = 0,0,0
-        killer_id_cache = {k_name: k_id for k_id, k_name in buscar_items_genericos("killers")}
-        map_id_cache = {m_name: m_id for m_id, m_name in buscar_items_genericos("maps")} 
-        item_id_cache = {i_name: i_id for i_id, i_name in buscar_items_genericos("items")}
-        
-        for partida_data in partidas_importadas:
-            try:
-                killer_name=partida_data.get("killer_name"); map_name=partida_data.get("map_name"); item_used_name=partida_data.get("item_used_name")
-                item_gained_name=partida_data.get("item_gained_name"); item_lost_name=partida_data.get("item_lost_name"); game_mode=partida_data.get("game_mode")
-                teammates_nicks_import = partida_data.get("teammates_nicks", []); jhones_sedex = partida_data.get("jhones_sedex")
-                if game_mode not in GAME_MODES and game_mode is not None: game_mode = None
-                killer_id=killer_id_cache.get(killer_name); map_id=map_id_cache.get(map_name); item_used_id=item_id_cache.get(item_used_name)
-                item_gained_id=item_id_cache.get(item_gained_name); item_lost_id=item_id_cache.get(item_lost_name)
-                if None in [killer_id, map_id, item_used_id, item_gained_id, item_lost_id]: puladas_count += 1; continue
-                escaped_val = partida_data.get("escaped");
-                escaped = escaped_val.lower() == 'true' if isinstance(escaped_val, str) else bool(escaped_val)
-                success = registrar_partida(killer_id, map_id, item_used_id, item_gained_id, item_lost_id, escaped,
-                                        int(partida_data.get("survivors_escaped",0)), partida_data.get("notes",""), game_mode,
-                                        teammates_nicks_import, jhones_sedex, match_date_str=partida_data.get("match_date"))
-                if success: importadas_count += 1
-                else: erros_count += 1
-            except Exception as e: 
-                error_details = f"Erro ao importar partida: {e} - Dados: {partida_data}\n{traceback.format_exc()}"
-                _log_error(error_details, "ganchometro_import_error.txt")
-                erros_count += 1; continue
-        if conn: conn.close()
-        messagebox.showinfo("Resultado Importação", f"Importadas: {importadas_count}\nPuladas: {puladas_count}\nCom Erro: {erros_count}\nVerifique 'ganchometro_import_error.txt' para detalhes dos erros.")
-        if self._current_page_name == "Histórico": self.carregar_historico()
-        if self._current_page_name == "Estatísticas": self.carregar_estatisticas_view()
+        filepath = filedialog.askopenfilename(filetypes=[("JSON files", "*.json"), ("NDJSON files", "*.ndjson *.jsonl"), ("NDJSON compactado", "*.gz"), ("All files", "*.*")], title="Abrir Arquivo de Dados...")
+        if not filepath or not self._iniciar_operacao_dados("Importando partidas..."): return
+        def _atualizar_progresso(processadas):
+            self.dados_progress_label.configure(text=f"Importando... {processadas} partidas processadas")
+        def _concluir(resultado):
+            self._finalizar_operacao_dados()
+            resumo = f"Novas: {resultado['importadas']}\nDuplicadas (já registradas): {resultado['duplicadas']}\nPuladas: {resultado['puladas']}\nCom Erro: {resultado['erros']}"
+            if resultado.get("erro_leitura"):
+                messagebox.showerror("Erro de Importação", f"Não foi possível ler o arquivo até o fim. Verifique o log 'ganchometro_import_error.txt'.\nDetalhe: {resultado['erro_leitura']}\n\nPartidas lidas antes do erro:\n{resumo}")
+            else:
+                messagebox.showinfo("Resultado Importação", f"{resumo}\nVerifique 'ganchometro_import_error.txt' para detalhes dos erros.")
+        def _falhar(e):
+            self._finalizar_operacao_dados()
+            _log_error(f"Erro ao importar dados: {e}", "ganchometro_import_error.txt")
+            messagebox.showerror("Erro de Importação", f"Não foi possível importar o arquivo. Verifique o log 'ganchometro_import_error.txt'.\nDetalhe: {e}")
+        self._db_worker.submit(importar_partidas_em_lote, args=(iterar_partidas_arquivo(filepath),), on_done=_concluir, on_error=_falhar, on_progress=_atualizar_progresso)
 
     def criar_aba_sobre_content(self, tab_sobre): 
         frame = ctk.CTkFrame(tab_sobre, fg_color=COLOR_FRAME_BG)
@@ -1660,10 +4054,11 @@ class DBDTrackerApp(ctk.CTk):
             else:
                 log_messages.append(f"  stats_charts_display_frame não existe ou foi destruído.")
 
-            stats_data = calcular_estatisticas_gerais() 
+            stats_data = obter_estatisticas()
             log_messages.append(f"\nDados calculados em calcular_estatisticas_gerais():")
             for key, value in stats_data.items():
                 log_messages.append(f"  {key}: {value}")
+            log_messages.append(f"\n{self._image_cache.resumo()}")
 
         except Exception as e:
             log_messages.append(f"\nERRO ao gerar log de status: {e}\n{traceback.format_exc()}")
@@ -1673,6 +4068,13 @@ class DBDTrackerApp(ctk.CTk):
 
 
 if __name__ == "__main__":
+    if "--build-asset-pack" in sys.argv:
+        # Uso: python Ganchômetro.py --build-asset-pack [destino]
+        indice_argumento = sys.argv.index("--build-asset-pack")
+        destino_pacote = sys.argv[indice_argumento + 1] if len(sys.argv) > indice_argumento + 1 else None
+        caminho_pacote, total_imagens = construir_pacote_assets(os.path.dirname(os.path.abspath(__file__)), destino_pacote)
+        print(f"Pacote de assets gerado em '{caminho_pacote}' com {total_imagens} imagens.")
+        sys.exit(0)
     try:
         ctk.set_appearance_mode("Dark")
         app = DBDTrackerApp()